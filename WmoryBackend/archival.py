@@ -0,0 +1,71 @@
+# archival.py
+import os
+from datetime import datetime
+from dotenv import load_dotenv
+
+from s3_helpers import request_object_restore
+
+load_dotenv()
+
+# Archival tier for old originals.
+# archive_worker.py moves originals whose every photo row is older than ARCHIVE_AFTER_DAYS to
+# ARCHIVE_STORAGE_CLASS and records it on the rows (photos.storage_class / archived_at). Thumbnails and
+# previews stay in STANDARD, so galleries keep rendering; only the original needs a restore before it
+# can be read again. Restores are requested through /request-restore; the worker notices finished ones
+# and records photos.restored_until. All times are UTC, like photos.upload_date.
+# Rows sharing an object (blobs.py) always carry the same state: every update matches on file_name.
+
+# --- ARCHIVE CONFIGURATION ---
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '365'))
+ARCHIVE_STORAGE_CLASS = os.getenv('ARCHIVE_STORAGE_CLASS', 'GLACIER')
+RESTORE_DAYS = int(os.getenv('RESTORE_DAYS', '7'))
+RESTORE_TIER = os.getenv('RESTORE_TIER', 'Standard')  # Expedited | Standard | Bulk
+
+STANDARD_STORAGE_CLASS = 'STANDARD'
+
+
+def restore_status(photo, now=None):
+    """
+    'available' (readable now), 'restoring' or 'archived' for a row with archived_at,
+    restore_requested_at and restored_until.
+    """
+    if not photo.get('archived_at'):
+        return 'available'
+    now = now or datetime.utcnow()
+    if photo.get('restored_until') and photo['restored_until'] > now:
+        return 'available'
+    if photo.get('restore_requested_at'):
+        return 'restoring'
+    return 'archived'
+
+
+def original_available(photo, now=None):
+    """Whether the row's original can be signed and downloaded."""
+    return restore_status(photo, now) == 'available'
+
+
+def request_restores(cursor, photos):
+    """
+    Starts restores for the archived originals of the rows (dictionary cursor, caller commits).
+    :return: dict of photo id -> restore status after the request
+    """
+    now = datetime.utcnow()
+    statuses = {}
+    requested = {}
+    for photo in photos:
+        status = restore_status(photo, now)
+        if status == 'archived':
+            key = photo['file_name']
+            if key not in requested:
+                requested[key] = request_object_restore(key, RESTORE_DAYS, RESTORE_TIER)
+            status = 'restoring' if requested[key] else 'archived'
+        statuses[photo['id']] = status
+
+    started = [key for key, ok in requested.items() if ok]
+    if started:
+        format_strings = ','.join(['%s'] * len(started))
+        cursor.execute(f"""
+            UPDATE photos SET restore_requested_at = %s
+            WHERE file_name IN ({format_strings}) AND archived_at IS NOT NULL
+        """, (now, *started))
+    return statuses
@@ -0,0 +1,215 @@
+# archive_worker.py
+import os
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from db import get_db_connection
+from s3_helpers import change_storage_class, get_restore_expiry
+from archival import ARCHIVE_AFTER_DAYS, ARCHIVE_STORAGE_CLASS, RESTORE_DAYS
+from group_versions import bump_group_version
+from events import publish_event
+
+load_dotenv()
+
+# Moves old originals to the archive storage class and records finished restores (archival.py).
+# Run as a separate process: python archive_worker.py
+
+# --- WORKER CONFIGURATION ---
+ARCHIVE_WORKER_POLL = int(os.getenv('ARCHIVE_WORKER_POLL', '300'))  # seconds between scans when idle
+ARCHIVE_BATCH = 20
+MAX_ARCHIVE_ATTEMPTS = 3  # an original that failed this often is left in its storage class
+# A restore that has not finished after this long is dropped, so the original can be requested again
+RESTORE_GIVE_UP_HOURS = 48
+
+
+# ==========================================
+# ARCHIVING
+# ==========================================
+def fetch_archive_candidates(cursor, cutoff, limit=ARCHIVE_BATCH):
+    """
+    Original keys whose every photo row was uploaded before cutoff (a blob shared into a group
+    recently stays hot). Rows without a thumbnail are skipped: their grid tile is the original.
+    Originals that failed MAX_ARCHIVE_ATTEMPTS times are skipped so they cannot fill every batch.
+    """
+    cursor.execute("""
+        SELECT DISTINCT p.file_name FROM photos p
+        WHERE p.archived_at IS NULL AND p.upload_date < %s AND p.has_thumbnail = 1
+        AND p.archive_attempts < %s
+        AND NOT EXISTS (
+            SELECT 1 FROM photos newer
+            WHERE newer.file_name = p.file_name AND (newer.upload_date >= %s OR newer.has_thumbnail = 0)
+        )
+        LIMIT %s
+    """, (cutoff, MAX_ARCHIVE_ATTEMPTS, cutoff, limit))
+    return [row['file_name'] for row in cursor.fetchall()]
+
+
+def archive_object(conn, cursor, key, cutoff):
+    """
+    Archives one original in three steps, so the blob row is never locked during the S3 copy:
+    the blob is marked archiving (acquire_blobs and merge_blob then leave it alone) and committed,
+    the object is rewritten, and a second short transaction records the result and clears the mark.
+    :return: ids of the groups showing it, or None if it was not archived
+    """
+    try:
+        cursor.execute("SELECT id FROM media_blobs WHERE object_key = %s FOR UPDATE", (key,))
+        blob = cursor.fetchone()
+        cursor.execute("""
+            SELECT MAX(upload_date) as newest, MIN(has_thumbnail) as has_thumbnail, MAX(archived_at) as archived_at
+            FROM photos WHERE file_name = %s
+        """, (key,))
+        state = cursor.fetchone()
+        if not state['newest'] or state['newest'] >= cutoff or not state['has_thumbnail'] or state['archived_at']:
+            conn.rollback()
+            return None
+        if blob:
+            cursor.execute("UPDATE media_blobs SET archiving_since = %s WHERE id = %s", (datetime.utcnow(), blob['id']))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    try:
+        archived = change_storage_class(key, ARCHIVE_STORAGE_CLASS)
+    except Exception:
+        finish_archiving(conn, cursor, key, False)
+        raise
+    if not archived:
+        finish_archiving(conn, cursor, key, False)
+        record_archive_failure(conn, cursor, key)
+        return None
+    return finish_archiving(conn, cursor, key, True)
+
+
+def finish_archiving(conn, cursor, key, archived):
+    """
+    Records the outcome of the copy and clears the archiving mark (own transaction).
+    :return: ids of the groups showing the original if it was archived, otherwise None
+    """
+    try:
+        cursor.execute("UPDATE media_blobs SET archiving_since = NULL WHERE object_key = %s", (key,))
+        if not archived:
+            conn.commit()
+            return None
+        cursor.execute("""
+            UPDATE photos
+            SET storage_class = %s, archived_at = %s, restore_requested_at = NULL, restored_until = NULL
+            WHERE file_name = %s
+        """, (ARCHIVE_STORAGE_CLASS, datetime.utcnow(), key))
+        cursor.execute("SELECT DISTINCT group_id FROM photos WHERE file_name = %s", (key,))
+        group_ids = [row['group_id'] for row in cursor.fetchall()]
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return group_ids
+
+
+def record_archive_failure(conn, cursor, key):
+    """Counts a failed attempt on every row of the original (own transaction)."""
+    cursor.execute("UPDATE photos SET archive_attempts = archive_attempts + 1 WHERE file_name = %s", (key,))
+    conn.commit()
+
+
+def archive_batch():
+    """Archives one batch of old originals. :return: number of originals archived"""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=ARCHIVE_AFTER_DAYS)
+        keys = fetch_archive_candidates(cursor, cutoff)
+        conn.commit()
+        if not keys:
+            return 0
+
+        archived = 0
+        changed_groups = set()
+        for key in keys:
+            try:
+                group_ids = archive_object(conn, cursor, key, cutoff)
+            except Exception as e:
+                print(f"❌ Archive Worker Error ({key}): {e}")
+                record_archive_failure(conn, cursor, key)
+                continue
+            if group_ids is not None:
+                archived += 1
+                changed_groups.update(group_ids)
+
+        # Archived items lose their original URL in the listings (one bump per group for the batch)
+        if changed_groups:
+            bump_group_version(cursor, changed_groups)
+            conn.commit()
+        if archived:
+            print(f"Archive Worker: archived {archived} original(s)")
+        return archived
+    finally:
+        cursor.close(); conn.close()
+
+
+# ==========================================
+# RESTORES
+# ==========================================
+def check_restores(limit=ARCHIVE_BATCH * 5):
+    """
+    Records restores that finished since the last check and tells the groups (media_restored).
+    :return: number of restores that finished
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT file_name, MIN(restore_requested_at) as requested_at FROM photos
+            WHERE restore_requested_at IS NOT NULL
+            GROUP BY file_name
+            LIMIT %s
+        """, (limit,))
+        pending = cursor.fetchall()
+        if not pending:
+            return 0
+
+        now = datetime.utcnow()
+        restored = []
+        for row in pending:
+            finished, expiry = get_restore_expiry(row['file_name'])
+            if finished:
+                cursor.execute("""
+                    UPDATE photos SET restored_until = %s, restore_requested_at = NULL
+                    WHERE file_name = %s
+                """, (expiry or now + timedelta(days=RESTORE_DAYS), row['file_name']))
+                restored.append(row['file_name'])
+            elif row['requested_at'] < now - timedelta(hours=RESTORE_GIVE_UP_HOURS):
+                cursor.execute("UPDATE photos SET restore_requested_at = NULL WHERE file_name = %s", (row['file_name'],))
+
+        if restored:
+            format_strings = ','.join(['%s'] * len(restored))
+            cursor.execute(f"SELECT id, group_id FROM photos WHERE file_name IN ({format_strings})", tuple(restored))
+            by_group = {}
+            for photo in cursor.fetchall():
+                by_group.setdefault(photo['group_id'], []).append(photo['id'])
+            bump_group_version(cursor, list(by_group))
+            for group_id, photo_ids in by_group.items():
+                publish_event(cursor, group_id, 'media_restored', {"photo_ids": photo_ids})
+        conn.commit()
+        if restored:
+            print(f"Archive Worker: {len(restored)} restore(s) finished")
+        return len(restored)
+    finally:
+        cursor.close(); conn.close()
+
+
+def run_worker():
+    while True:
+        try:
+            archived = archive_batch()
+            check_restores()
+            if archived:
+                continue
+        except Exception as e:
+            print(f"❌ Archive Worker Error: {e}")
+        time.sleep(ARCHIVE_WORKER_POLL)
+
+
+if __name__ == '__main__':
+    print(f"Archive worker started (originals older than {ARCHIVE_AFTER_DAYS} days -> {ARCHIVE_STORAGE_CLASS})")
+    run_worker()
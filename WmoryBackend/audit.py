@@ -0,0 +1,120 @@
+# audit.py
+import os
+import atexit
+import threading
+from db import get_db_connection
+
+# --- AUDIT BUFFER CONFIGURATION ---
+# Events are flushed when the buffer reaches AUDIT_BATCH_SIZE rows
+# or every AUDIT_FLUSH_INTERVAL seconds, whichever comes first.
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '50'))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '2'))
+
+# Upper bound on rows kept in memory while the database is unreachable
+AUDIT_MAX_BUFFERED = int(os.getenv('AUDIT_MAX_BUFFERED', '5000'))
+
+
+def write_events(events):
+    """Inserts audit events with a single multi-row INSERT on its own connection."""
+    if not events:
+        return
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        placeholders = ','.join(['(%s, %s, %s, %s)'] * len(events))
+        sql = f"INSERT INTO audit_logs (actor_id, action_type, target_id, metadata) VALUES {placeholders}"
+        cursor.execute(sql, tuple(value for event in events for value in event))
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+class AuditBuffer:
+    """
+    In-process buffer for audit events, flushed by a background thread.
+    Each worker process has its own buffer; the thread is (re)started lazily so it survives gunicorn forks.
+    """
+
+    def __init__(self, batch_size=AUDIT_BATCH_SIZE, flush_interval=AUDIT_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._events = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._pid != os.getpid():
+            # Forked after events were buffered: the parent flushes its own copy
+            self._reset()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="audit-flusher", daemon=True)
+            self._thread.start()
+
+    def add(self, events):
+        with self._lock:
+            self._ensure_thread()
+            self._events.extend(events)
+            should_wake = len(self._events) >= self.batch_size
+        if should_wake:
+            self._wake.set()
+
+    def flush(self):
+        """Writes all buffered events. Safe to call from any thread."""
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+            if not events:
+                return
+            written = 0
+            try:
+                while written < len(events):
+                    write_events(events[written:written + self.batch_size])
+                    written += self.batch_size
+            except Exception as e:
+                print(f"[AUDIT LOG ERROR]: {e}")
+                # Put unwritten events back (bounded) so a DB blip does not lose them
+                with self._lock:
+                    self._events = (events[written:] + self._events)[-AUDIT_MAX_BUFFERED:]
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stops the background thread and flushes what is left (called at worker shutdown)."""
+        self._stopped = True
+        self._wake.set()
+        self.flush()
+
+
+audit_buffer = AuditBuffer()
+
+# Guaranteed flush when the worker process exits (gunicorn graceful stop, SIGTERM, sys.exit)
+atexit.register(audit_buffer.close)
+
+
+def record(events, sync=False):
+    """
+    Records audit events given as (actor_id, action_type, target_id, metadata) tuples.
+    sync=True writes them immediately (critical actions), otherwise they are buffered.
+    """
+    events = list(events)
+    if not events:
+        return
+    if sync:
+        try:
+            write_events(events)
+        except Exception as e:
+            print(f"[AUDIT LOG ERROR]: {e}")
+        return
+    audit_buffer.add(events)
@@ -0,0 +1,106 @@
+"""
+Micro-benchmark and compatibility check for the local SigV4 presigner.
+
+    python benchmarks/bench_presign.py                 # compare against boto3 with dummy credentials
+    python benchmarks/bench_presign.py --keys 5000
+    python benchmarks/bench_presign.py --endpoint http://localhost:9000 --bucket wmory-test
+        # also PUT/GET through a local S3 stand-in (MinIO, or `moto_server`) using credentials from the environment
+
+Run from the WmoryBackend directory.
+"""
+import os
+import sys
+import time
+import uuid
+import argparse
+import datetime
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3
+import requests
+from botocore.credentials import ReadOnlyCredentials
+from presigner import SigV4Presigner
+
+SAMPLE_KEYS = ['media/x.jpg', 'thumbs/x.jpg', 'pp_media/a b+c~ü.png', "media/(1)!*'.mp4", 'thumb_legacy.JPG']
+
+
+def _signed_at(url):
+    amz_date = parse_qs(urlsplit(url).query)['X-Amz-Date'][0]
+    return datetime.datetime.strptime(amz_date, '%Y%m%dT%H%M%SZ')
+
+
+def check_compatibility(client, presigner, bucket):
+    """Every local URL must be byte-identical to boto3's for the same timestamp."""
+    failures = 0
+    for key in SAMPLE_KEYS:
+        for method, content_type in (('GET', None), ('PUT', 'image/jpeg')):
+            params = {'Bucket': bucket, 'Key': key}
+            if content_type:
+                params['ContentType'] = content_type
+            expected = client.generate_presigned_url('get_object' if method == 'GET' else 'put_object', Params=params, ExpiresIn=900)
+            actual = presigner.presign(key, 900, method, content_type, now=_signed_at(expected))
+            if actual != expected:
+                failures += 1
+                print(f"MISMATCH {method} {key}\n  boto3: {expected}\n  local: {actual}")
+    print(f"Compatibility: {len(SAMPLE_KEYS) * 2 - failures}/{len(SAMPLE_KEYS) * 2} identical")
+    return failures == 0
+
+
+def benchmark(client, presigner, bucket, count):
+    keys = [f"media/{uuid.uuid4()}.jpg" for _ in range(count)]
+
+    start = time.perf_counter()
+    for key in keys:
+        client.generate_presigned_url('get_object', Params={'Bucket': bucket, 'Key': key}, ExpiresIn=900)
+    boto_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    presigner.presign_many(keys, 900)
+    local_time = time.perf_counter() - start
+
+    print(f"boto3 : {count} URLs in {boto_time * 1000:.1f} ms ({count / boto_time:,.0f}/s)")
+    print(f"local : {count} URLs in {local_time * 1000:.1f} ms ({count / local_time:,.0f}/s)")
+    print(f"speedup: {boto_time / local_time:.1f}x")
+
+
+def round_trip(presigner, bucket):
+    """PUT then GET an object through locally signed URLs against a real endpoint."""
+    key = f"media/presign-check-{uuid.uuid4()}.jpg"
+    body = b'presign round trip'
+    put = requests.put(presigner.presign(key, 300, 'PUT', 'image/jpeg'), data=body, headers={'Content-Type': 'image/jpeg'})
+    get = requests.get(presigner.presign(key, 300))
+    ok = put.status_code == 200 and get.status_code == 200 and get.content == body
+    print(f"Round trip against {presigner.host}: PUT {put.status_code}, GET {get.status_code} -> {'OK' if ok else 'FAILED'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keys', type=int, default=2000)
+    parser.add_argument('--bucket', default='wmory-bench')
+    parser.add_argument('--region', default='eu-north-1')
+    parser.add_argument('--endpoint', help='local S3 stand-in for the round-trip check')
+    args = parser.parse_args()
+
+    if args.endpoint:
+        session = boto3.session.Session(region_name=args.region)
+        client = session.client('s3', endpoint_url=args.endpoint)
+        provider = session.get_credentials().get_frozen_credentials
+    else:
+        client = boto3.client('s3', region_name=args.region,
+                              aws_access_key_id='AKIDEXAMPLE', aws_secret_access_key='bench-secret')
+        provider = lambda: ReadOnlyCredentials('AKIDEXAMPLE', 'bench-secret', None)
+
+    presigner = SigV4Presigner(args.bucket, args.region, provider, endpoint_url=args.endpoint)
+
+    ok = check_compatibility(client, presigner, args.bucket)
+    benchmark(client, presigner, args.bucket, args.keys)
+    if args.endpoint:
+        ok = round_trip(presigner, args.bucket) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
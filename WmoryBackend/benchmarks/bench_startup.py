@@ -0,0 +1,103 @@
+"""
+Cold-start benchmark: how long importing the app takes and where the time goes.
+
+    python benchmarks/bench_startup.py                  # import app (create_app), 5 cold runs
+    python benchmarks/bench_startup.py --target routes.photos --top 30
+    python benchmarks/bench_startup.py --strict         # exit 1 if a heavy library is loaded at startup
+
+Every run is a fresh interpreter (python -X importtime), so nothing is cached between runs
+apart from the OS page cache. Run from the WmoryBackend directory with the app's .env available.
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries that must only be imported on first use (see create_app)
+HEAVY_MODULES = ['boto3', 'botocore.client', 'firebase_admin', 'PIL.Image', 'requests', 'numpy', 'cv2']
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {target}
+elapsed = time.perf_counter() - start
+print('ELAPSED', elapsed)
+print('LOADED', ','.join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def run_once(target):
+    """Imports target in a fresh interpreter. :return: (seconds, loaded heavy modules, importtime rows)"""
+    code = PROBE.format(target=target, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=BACKEND_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"Importing {target} failed:\n{result.stderr[-2000:]}")
+
+    elapsed, loaded = 0.0, []
+    for line in result.stdout.splitlines():
+        if line.startswith('ELAPSED '):
+            elapsed = float(line.split()[1])
+        elif line.startswith('LOADED '):
+            loaded = [m for m in line[len('LOADED '):].split(',') if m]
+    return elapsed, loaded, parse_importtime(result.stderr)
+
+
+def parse_importtime(stderr):
+    """Rows of (module, self_us, cumulative_us, depth) from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def report(target, runs, top):
+    timings, loaded, rows = [], [], []
+    for _ in range(runs):
+        elapsed, loaded, rows = run_once(target)
+        timings.append(elapsed)
+
+    print(f"import {target}: median {statistics.median(timings) * 1000:.0f} ms, "
+          f"min {min(timings) * 1000:.0f} ms over {runs} cold runs")
+
+    # Time per top-level package (self time, so nested imports are not counted twice)
+    packages = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        packages[name.split('.')[0]] += self_us
+    print(f"\nTop {top} packages by self time (last run):")
+    for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    # Modules of this repo: cumulative time including what each one pulls in
+    local = {os.path.splitext(f)[0] for f in os.listdir(BACKEND_DIR) if f.endswith('.py')} | {'routes'}
+    print("\nApp modules by cumulative time (last run):")
+    for name, _, cumulative_us, _ in sorted(rows, key=lambda r: -r[2]):
+        if name.split('.')[0] in local:
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    print(f"\nHeavy libraries loaded at startup: {', '.join(loaded) if loaded else 'none'}")
+    return loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', default='app', help='module to import (default: app)')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--strict', action='store_true', help='fail if a heavy library is imported at startup')
+    args = parser.parse_args()
+
+    loaded = report(args.target, args.runs, args.top)
+    sys.exit(1 if args.strict and loaded else 0)
+
+
+if __name__ == '__main__':
+    main()
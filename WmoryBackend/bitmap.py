@@ -0,0 +1,172 @@
+# bitmap.py
+import sys
+import struct
+from array import array
+from bisect import bisect_left
+
+# Compact sets of 32-bit ids (roaring-style), used for hidden items (hidden_sets.py).
+# Ids are split into a 16-bit key (high bits) and a 16-bit value (low bits). Each key holds a container:
+#   - sorted array of values (2 bytes per id) while it has at most ARRAY_MAX_SIZE of them,
+#   - 8 KB bitset (65536 bits) once it is denser than that.
+# Photo ids of one group are mostly close together, so a set usually has a handful of containers.
+# Membership is a dict lookup plus a binary search or a bit test; nothing is expanded into Python ints.
+
+ARRAY_MAX_SIZE = 4096                 # an array container larger than this is bigger than a bitset
+BITSET_BYTES = 65536 // 8
+FORMAT_VERSION = 1
+
+ARRAY_CONTAINER = 0
+BITSET_CONTAINER = 1
+
+_HEADER = struct.Struct('<BI')        # version, container count
+_CONTAINER = struct.Struct('<HBH')    # key, kind, array length - 1 (0 for bitsets)
+
+
+def _le_array(values):
+    """array('H') in little-endian byte order (the serialized form)."""
+    if sys.byteorder == 'big':
+        values = array('H', values)
+        values.byteswap()
+    return values
+
+
+class IdBitmap:
+    """Set of non-negative 32-bit ints supporting in, add, discard, len and iteration in ascending order."""
+
+    __slots__ = ('_containers',)
+
+    def __init__(self, ids=()):
+        self._containers = {}         # key -> array('H') (sorted) or bytearray(BITSET_BYTES)
+        self.update(ids)
+
+    def __contains__(self, value):
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            return False
+        if not 0 <= value <= 0xFFFFFFFF:
+            return False
+        container = self._containers.get(value >> 16)
+        if container is None:
+            return False
+        low = value & 0xFFFF
+        if isinstance(container, bytearray):
+            return bool(container[low >> 3] & (1 << (low & 7)))
+        i = bisect_left(container, low)
+        return i < len(container) and container[i] == low
+
+    def add(self, value):
+        value = int(value)
+        if not 0 <= value <= 0xFFFFFFFF:
+            raise ValueError(f"Id out of range: {value}")
+        key, low = value >> 16, value & 0xFFFF
+        container = self._containers.get(key)
+        if container is None:
+            self._containers[key] = array('H', [low])
+        elif isinstance(container, bytearray):
+            container[low >> 3] |= 1 << (low & 7)
+        else:
+            i = bisect_left(container, low)
+            if i < len(container) and container[i] == low:
+                return
+            container.insert(i, low)
+            if len(container) > ARRAY_MAX_SIZE:
+                self._containers[key] = self._to_bitset(container)
+
+    def update(self, ids):
+        for value in ids:
+            self.add(value)
+
+    def discard(self, value):
+        if value not in self:
+            return
+        value = int(value)
+        key, low = value >> 16, value & 0xFFFF
+        container = self._containers[key]
+        if isinstance(container, bytearray):
+            container[low >> 3] &= ~(1 << (low & 7)) & 0xFF
+            if not any(container):
+                del self._containers[key]
+        else:
+            container.pop(bisect_left(container, low))
+            if not container:
+                del self._containers[key]
+
+    def __len__(self):
+        return sum(self._cardinality(c) for c in self._containers.values())
+
+    def __bool__(self):
+        return bool(self._containers)
+
+    def __iter__(self):
+        for key in sorted(self._containers):
+            high = key << 16
+            for low in self._values(self._containers[key]):
+                yield high | low
+
+    def __eq__(self, other):
+        return isinstance(other, IdBitmap) and list(self) == list(other)
+
+    def __repr__(self):
+        return f"IdBitmap({len(self)} ids, {len(self._containers)} containers)"
+
+    # --- SERIALIZATION ---
+    def to_bytes(self):
+        """Serialized form; each container is written in whichever representation is smaller."""
+        parts = [_HEADER.pack(FORMAT_VERSION, len(self._containers))]
+        for key in sorted(self._containers):
+            container = self._containers[key]
+            size = self._cardinality(container)
+            if size > ARRAY_MAX_SIZE:
+                bitset = container if isinstance(container, bytearray) else self._to_bitset(container)
+                parts.append(_CONTAINER.pack(key, BITSET_CONTAINER, 0))
+                parts.append(bytes(bitset))
+            else:
+                values = container if isinstance(container, array) else array('H', self._values(container))
+                parts.append(_CONTAINER.pack(key, ARRAY_CONTAINER, size - 1))
+                parts.append(_le_array(values).tobytes())
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Decodes to_bytes output (bytes-like; empty or None is the empty set)."""
+        bitmap = cls()
+        if not data:
+            return bitmap
+        view = memoryview(data)
+        version, count = _HEADER.unpack_from(view, 0)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported bitmap format: {version}")
+        offset = _HEADER.size
+        for _ in range(count):
+            key, kind, size = _CONTAINER.unpack_from(view, offset)
+            offset += _CONTAINER.size
+            if kind == BITSET_CONTAINER:
+                bitmap._containers[key] = bytearray(view[offset:offset + BITSET_BYTES])
+                offset += BITSET_BYTES
+            else:
+                values = array('H')
+                values.frombytes(view[offset:offset + (size + 1) * 2])
+                bitmap._containers[key] = _le_array(values)
+                offset += (size + 1) * 2
+        return bitmap
+
+    # --- CONTAINERS ---
+    @staticmethod
+    def _cardinality(container):
+        if isinstance(container, bytearray):
+            return int.from_bytes(container, 'little').bit_count()
+        return len(container)
+
+    @staticmethod
+    def _values(container):
+        if not isinstance(container, bytearray):
+            return container
+        return [i * 8 + bit for i, byte in enumerate(container) if byte for bit in range(8) if byte >> bit & 1]
+
+    @staticmethod
+    def _to_bitset(values):
+        bitset = bytearray(BITSET_BYTES)
+        for low in values:
+            bitset[low >> 3] |= 1 << (low & 7)
+        return bitset
@@ -0,0 +1,153 @@
+# blobs.py
+from collections import Counter
+from group_versions import bump_group_version
+
+# Content-addressed media storage with reference counting.
+# Every photo row points at a media_blobs row (photos.blob_id). Identical bytes share one blob, so
+# one S3 object and one set of renditions serve every group the file was shared into.
+# A blob is identified by its SHA-256 once the media worker has hashed it; at confirm time the
+# single-part ETag (MD5) and size are used. The physical key is the first upload's key, so no copy is made.
+# Photos must be released (release_photos) in the same transaction that deletes them, and read with
+# SELECT ... FOR UPDATE first: a concurrent delete of the same rows then waits and finds nothing to release.
+# Archived blobs (archival.py) are not shared with new uploads: a fresh copy stays readable. Neither are
+# blobs the archive worker is copying (media_blobs.archiving_since), which it does without holding a lock.
+
+
+def acquire_blobs(cursor, metadata_by_key):
+    """
+    Finds or creates the blob of each newly uploaded object and adds one reference per object.
+    Existing blobs are locked (FOR UPDATE) so a concurrent release cannot drop them in between.
+    :param metadata_by_key: dict of uploaded key -> {'size_bytes', 'etag', ...} (dictionary cursor)
+    :return: dict of uploaded key -> {'blob_id', 'object_key'}; object_key differs from the uploaded key when reused
+    """
+    if not metadata_by_key:
+        return {}
+
+    # 1. Existing blobs with the same bytes (multipart ETags are not content hashes)
+    comparable = {k: m for k, m in metadata_by_key.items() if m.get('etag') and '-' not in m['etag']}
+    existing = {}
+    if comparable:
+        signatures = list({(m['etag'], m['size_bytes']) for m in comparable.values()})
+        conditions = ' OR '.join(['(etag = %s AND size_bytes = %s)'] * len(signatures))
+        cursor.execute(f"""
+            SELECT id, object_key, etag, size_bytes FROM media_blobs
+            WHERE ({conditions}) AND archiving_since IS NULL
+            AND NOT EXISTS (SELECT 1 FROM photos WHERE photos.blob_id = media_blobs.id AND photos.archived_at IS NOT NULL)
+            ORDER BY id
+            FOR UPDATE
+        """, tuple(v for sig in signatures for v in sig))
+        for row in cursor.fetchall():
+            existing.setdefault((row['etag'], row['size_bytes']), row)
+
+    # 2. New blobs for the rest (the first upload of each signature becomes the physical object)
+    result = {}
+    to_create = {}
+    for key, metadata in metadata_by_key.items():
+        signature = (metadata['etag'], metadata['size_bytes']) if key in comparable else ('key', key)
+        row = existing.get(signature)
+        if row:
+            result[key] = {"blob_id": row['id'], "object_key": row['object_key']}
+        else:
+            to_create.setdefault(signature, []).append(key)
+
+    if to_create:
+        first_keys = [keys[0] for keys in to_create.values()]
+        placeholders = ','.join(['(%s, %s, %s, 0)'] * len(first_keys))
+        cursor.execute(f"INSERT INTO media_blobs (object_key, etag, size_bytes, ref_count) VALUES {placeholders}",
+                       tuple(v for k in first_keys for v in (k, metadata_by_key[k].get('etag'), metadata_by_key[k]['size_bytes'])))
+        format_strings = ','.join(['%s'] * len(first_keys))
+        cursor.execute(f"SELECT id, object_key FROM media_blobs WHERE object_key IN ({format_strings})", tuple(first_keys))
+        ids = {row['object_key']: row['id'] for row in cursor.fetchall()}
+        for keys in to_create.values():
+            for key in keys:
+                result[key] = {"blob_id": ids[keys[0]], "object_key": keys[0]}
+
+    # 3. One reference per uploaded object
+    refs = Counter(entry['blob_id'] for entry in result.values())
+    cursor.executemany("UPDATE media_blobs SET ref_count = ref_count + %s WHERE id = %s",
+                       [(count, blob_id) for blob_id, count in refs.items()])
+    return result
+
+
+def inherit_blob_renditions(cursor, blob_ids):
+    """New photos of an existing blob get the renditions (and real dimensions) the blob already has."""
+    blob_ids = list(set(blob_ids))
+    if not blob_ids:
+        return
+    format_strings = ','.join(['%s'] * len(blob_ids))
+    sql = f"""
+        UPDATE photos p
+        JOIN (
+            SELECT blob_id, MAX(has_thumbnail) as has_thumbnail, MAX(has_preview) as has_preview,
+                   MAX(width) as width, MAX(height) as height, MAX(duration_ms) as duration_ms
+            FROM photos
+            WHERE blob_id IN ({format_strings})
+            GROUP BY blob_id
+        ) src ON src.blob_id = p.blob_id
+        SET p.has_thumbnail = src.has_thumbnail, p.has_preview = src.has_preview,
+            p.width = COALESCE(src.width, p.width), p.height = COALESCE(src.height, p.height),
+            p.duration_ms = COALESCE(src.duration_ms, p.duration_ms)
+        WHERE p.blob_id IN ({format_strings})
+    """
+    cursor.execute(sql, tuple(blob_ids) * 2)
+
+
+def release_photos(cursor, photos):
+    """
+    Drops one reference per photo row (rows need 'file_name' and 'blob_id') and deletes the blobs
+    that are no longer referenced. Rows from before media_blobs (blob_id NULL) own their object.
+    Only pass rows this transaction locked (FOR UPDATE) and deletes, so each row is released once.
+    :return: object keys whose S3 objects (and renditions) can be deleted after the commit
+    """
+    refs = Counter(p['blob_id'] for p in photos if p.get('blob_id'))
+    keys = [p['file_name'] for p in photos if not p.get('blob_id') and p.get('file_name')]
+    if not refs:
+        return keys
+
+    cursor.executemany("UPDATE media_blobs SET ref_count = ref_count - %s WHERE id = %s",
+                       [(count, blob_id) for blob_id, count in refs.items()])
+
+    format_strings = ','.join(['%s'] * len(refs))
+    cursor.execute(f"SELECT id, object_key FROM media_blobs WHERE id IN ({format_strings}) AND ref_count <= 0",
+                   tuple(refs))
+    released = cursor.fetchall()
+    if released:
+        format_strings = ','.join(['%s'] * len(released))
+        cursor.execute(f"DELETE FROM media_blobs WHERE id IN ({format_strings})", tuple(r['id'] for r in released))
+        keys += [r['object_key'] for r in released]
+    return keys
+
+
+def merge_blob(cursor, blob_id, sha256):
+    """
+    Records a blob's SHA-256 (media worker). If another blob already has the same content, all references
+    move to that older blob and this one is dropped.
+    :return: object key of the dropped blob (its S3 objects can be deleted after the commit), or None
+    """
+    cursor.execute("""
+        SELECT id, object_key, archiving_since FROM media_blobs WHERE sha256 = %s AND id != %s ORDER BY id LIMIT 1 FOR UPDATE
+    """, (sha256, blob_id))
+    canonical = cursor.fetchone()
+    if canonical:
+        cursor.execute("SELECT 1 FROM photos WHERE blob_id = %s AND archived_at IS NOT NULL LIMIT 1", (canonical['id'],))
+        if cursor.fetchall() or canonical['archiving_since']:
+            # The older copy is (being) archived: keep this one (its sha256 stays unset, the column is unique)
+            return None
+    else:
+        cursor.execute("UPDATE media_blobs SET sha256 = %s WHERE id = %s AND sha256 IS NULL", (sha256, blob_id))
+        return None
+
+    cursor.execute("SELECT object_key, ref_count, archiving_since FROM media_blobs WHERE id = %s FOR UPDATE", (blob_id,))
+    duplicate = cursor.fetchone()
+    if not duplicate or duplicate['archiving_since']:
+        return None  # Gone, or its object is being copied to the archive tier
+
+    # Every group showing the duplicate gets new media URLs
+    cursor.execute("SELECT DISTINCT group_id FROM photos WHERE blob_id = %s", (blob_id,))
+    bump_group_version(cursor, [row['group_id'] for row in cursor.fetchall()])
+    cursor.execute("UPDATE photos SET blob_id = %s, file_name = %s WHERE blob_id = %s",
+                   (canonical['id'], canonical['object_key'], blob_id))
+    cursor.execute("UPDATE media_blobs SET ref_count = ref_count + %s WHERE id = %s",
+                   (duplicate['ref_count'], canonical['id']))
+    cursor.execute("DELETE FROM media_blobs WHERE id = %s", (blob_id,))
+    return duplicate['object_key']
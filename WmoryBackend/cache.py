@@ -0,0 +1,224 @@
+# cache.py
+import os
+import json
+import math
+import time
+import random
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Two-level cache for read-mostly payloads (group details, member lists, block sets).
+#   1. Per-worker LRU: decoded values, no I/O.
+#   2. Shared Redis (optional, REDIS_URL): JSON, so a miss in one worker is filled by another.
+# Keys carry the version of what they were built from (groups_table.content_version,
+# users.block_version), so writers never delete entries: a bump makes the old key unreachable and
+# it ages out. Values are shared between requests: copy before changing them.
+# Misses are coalesced per worker (SingleFlight) and hot entries are refreshed early (XFetch), so a
+# notification storm on one group runs its query once per worker instead of once per client.
+# Signed URLs are cached with the payloads, so CACHE_TTL must stay well below their 15 minute expiry.
+
+# --- CACHE CONFIGURATION ---
+CACHE_SIZE = int(os.getenv('CACHE_SIZE', '5000'))
+CACHE_TTL = int(os.getenv('CACHE_TTL', '300'))
+REDIS_URL = os.getenv('REDIS_URL')
+
+# A failing Redis is skipped for this long instead of slowing every request down
+REDIS_RETRY_SECONDS = 30
+
+# Early refresh eagerness (XFetch beta: 1 is the usual choice, higher refreshes earlier)
+XFETCH_BETA = float(os.getenv('XFETCH_BETA', '1'))
+# Requests waiting on another request's computation give up and compute themselves after this long
+SINGLE_FLIGHT_TIMEOUT = 10
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one execution (per worker): the first caller runs fn,
+    the others wait for its result instead of repeating the work.
+    """
+
+    def __init__(self, wait_timeout=SINGLE_FLIGHT_TIMEOUT):
+        self.wait_timeout = wait_timeout
+        self._calls = {}                 # key -> [done event, value, error]
+        self._lock = threading.Lock()
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = [threading.Event(), None, None]
+
+        if not leader:
+            # A stuck leader must not stall everyone behind it: compute independently after the timeout
+            if not call[0].wait(self.wait_timeout):
+                return fn()
+            if call[2] is not None:
+                raise call[2]
+            return call[1]
+
+        try:
+            call[1] = fn()
+        except Exception as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call[0].set()
+        return call[1]
+
+
+class ResponseCache:
+
+    def __init__(self, size=CACHE_SIZE, ttl=CACHE_TTL, redis_url=REDIS_URL, beta=XFETCH_BETA, max_bytes=None):
+        """
+        size bounds the number of local entries; max_bytes (optional) also bounds their approximate
+        total size, measured as the JSON length of each value. A value larger than max_bytes is not
+        kept locally. redis_url=None keeps the cache local to the worker.
+        """
+        self.size = size
+        self.ttl = ttl
+        self.beta = beta
+        self.redis_url = redis_url
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()    # key -> (value, compute seconds, expires_at)
+        self._weights = {}               # key -> approximate bytes (only with max_bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self._redis = None
+        self._redis_lock = threading.Lock()
+        self._redis_down_until = 0.0
+
+    def _get_redis(self):
+        """Shared backend, created on first use (None when not configured or unavailable)."""
+        if not self.redis_url or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            with self._redis_lock:
+                if self._redis is None:
+                    try:
+                        import redis  # optional dependency, only needed with REDIS_URL
+                    except ImportError:
+                        print("[CACHE]: REDIS_URL is set but the redis package is not installed; using the local cache only")
+                        self.redis_url = None
+                        return None
+                    self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        return self._redis
+
+    def _redis_failed(self, e):
+        print(f"[CACHE REDIS ERROR]: {e}")
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+    def _get_entry(self, key):
+        """(value, compute seconds, expires_at) from the nearest level, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[2] > now:
+                self._entries.move_to_end(key)
+                return entry
+
+        client = self._get_redis()
+        if client is None:
+            return None
+        try:
+            raw = client.get(key)
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+        if raw is None:
+            return None
+        envelope = json.loads(raw)
+        entry = (envelope['v'], envelope['d'], envelope['e'])
+        if entry[2] <= now:
+            return None
+        self._store(key, entry)
+        return entry
+
+    def _should_refresh(self, entry):
+        """
+        Probabilistic early expiration (XFetch): the closer an entry is to expiring and the longer it
+        took to compute, the likelier a request refreshes it early, so a hot key is rebuilt by one
+        request ahead of time instead of by every request at the moment it expires.
+        """
+        _, delta, expires_at = entry
+        return time.time() - delta * self.beta * math.log(1.0 - random.random()) >= expires_at
+
+    def get(self, key):
+        """Cached value or None."""
+        entry = self._get_entry(key)
+        return entry[0] if entry else None
+
+    def set(self, key, value, ttl=None, delta=0.0):
+        """Caches a JSON-serializable value in both levels."""
+        ttl = ttl or self.ttl
+        entry = (value, delta, time.time() + ttl)
+        self._store(key, entry)
+        client = self._get_redis()
+        if client is None:
+            return
+        try:
+            envelope = {"v": value, "d": delta, "e": entry[2]}
+            client.set(key, json.dumps(envelope, separators=(',', ':'), default=str), ex=ttl)
+        except Exception as e:
+            self._redis_failed(e)
+
+    def get_or_load(self, key, loader, ttl=None):
+        """
+        Cached value, or loader() stored under key (a loader returning None is not cached).
+        Concurrent misses of a key in this worker run loader once; an entry picked for early refresh
+        keeps being served to everyone else while one request rebuilds it.
+        """
+        entry = self._get_entry(key)
+        if entry and not self._should_refresh(entry):
+            return entry[0]
+        if entry and self._flights.in_flight(key):
+            return entry[0]
+
+        def load():
+            if entry is None:
+                # Filled by a computation that finished just before this one started (or by another worker)
+                cached = self._get_entry(key)
+                if cached:
+                    return cached[0]
+            start = time.monotonic()
+            value = loader()
+            if value is not None:
+                self.set(key, value, ttl, delta=time.monotonic() - start)
+            return value
+
+        try:
+            return self._flights.do(key, load)
+        except Exception:
+            if entry:
+                # The early refresh failed: the current entry is still valid
+                return entry[0]
+            raise
+
+    def _store(self, key, entry):
+        weight = 0
+        if self.max_bytes:
+            weight = len(json.dumps(entry[0], separators=(',', ':'), default=str))
+            if weight > self.max_bytes:
+                return
+        with self._lock:
+            self._bytes += weight - self._weights.pop(key, 0)
+            if self.max_bytes:
+                self._weights[key] = weight
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size or (self.max_bytes and self._bytes > self.max_bytes):
+                evicted, _ = self._entries.popitem(last=False)
+                self._bytes -= self._weights.pop(evicted, 0)
+
+
+response_cache = ResponseCache()
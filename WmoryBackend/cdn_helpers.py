@@ -0,0 +1,108 @@
+# cdn_helpers.py
+import os
+import json
+import time
+import base64
+import threading
+from urllib.parse import quote
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CDN ACCESS MODE CONFIGURATION ---
+# 'presigned' (default): every listing returns per-object presigned S3 URLs.
+# 'cdn_cookie': group media is served through CloudFront; a member gets signed cookies scoped to
+# the group's key prefixes and listings return plain CDN URLs.
+# The distribution must not forward (or cache on) query strings: a policy wildcard matches any
+# characters, so access is only as narrow as the path the policy is checked against.
+MEDIA_ACCESS_MODE = os.getenv('MEDIA_ACCESS_MODE', 'presigned')
+CDN_DOMAIN = os.getenv('CDN_DOMAIN')  # e.g. media.wmory.app (CloudFront distribution in front of the bucket)
+CDN_COOKIE_DOMAIN = os.getenv('CDN_COOKIE_DOMAIN')  # parent domain shared by the API and the CDN, e.g. .wmory.app
+CLOUDFRONT_KEY_PAIR_ID = os.getenv('CLOUDFRONT_KEY_PAIR_ID')
+CLOUDFRONT_PRIVATE_KEY = os.getenv('CLOUDFRONT_PRIVATE_KEY').replace('\\n', '\n') if os.getenv('CLOUDFRONT_PRIVATE_KEY') else None
+CDN_GRANT_TTL = int(os.getenv('CDN_GRANT_TTL', '3600'))
+
+_private_key = None
+_private_key_lock = threading.Lock()
+
+
+def is_cdn_mode():
+    return MEDIA_ACCESS_MODE == 'cdn_cookie' and bool(CDN_DOMAIN and CLOUDFRONT_KEY_PAIR_ID and CLOUDFRONT_PRIVATE_KEY)
+
+
+# --- GROUP-SHARDED KEY LAYOUT ---
+# Top-level prefixes holding a group shard: originals, thumbnails/posters and video previews
+GROUP_SHARD_PREFIXES = ('media', 'thumbs', 'previews')
+
+
+def group_media_key(group_id, file_name):
+    """New uploads live under a per-group segment: 'media/g<group_id>/<file_name>'."""
+    return f"media/g{group_id}/{file_name}"
+
+
+def is_group_media_key(object_name, group_id):
+    """True for originals and renditions inside the group's shard (e.g. media/g12/..., thumbs/g12/...)."""
+    return any(object_name.startswith(f"{prefix}/g{group_id}/") for prefix in GROUP_SHARD_PREFIXES)
+
+
+def cdn_url(object_name):
+    """Plain (unsigned) CDN URL; access is granted by the group cookie."""
+    return f"https://{CDN_DOMAIN}/{quote(object_name, safe='/~')}"
+
+
+# --- CLOUDFRONT SIGNED COOKIES ---
+def _cloudfront_b64(data):
+    # CloudFront's URL-safe base64 variant
+    return base64.b64encode(data).decode('utf-8').replace('+', '-').replace('=', '_').replace('/', '~')
+
+
+def _rsa_sign(message):
+    global _private_key
+    # Imported on first use: only needed in cdn_cookie mode
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+
+    if _private_key is None:
+        with _private_key_lock:
+            if _private_key is None:
+                _private_key = serialization.load_pem_private_key(CLOUDFRONT_PRIVATE_KEY.encode('utf-8'), password=None)
+    return _private_key.sign(message, padding.PKCS1v15(), hashes.SHA1())
+
+
+def _signed_policy_cookies(resource, expires):
+    policy = json.dumps({
+        "Statement": [{
+            "Resource": resource,
+            "Condition": {"DateLessThan": {"AWS:EpochTime": expires}}
+        }]
+    }, separators=(',', ':')).encode('utf-8')
+    return {
+        "CloudFront-Policy": _cloudfront_b64(policy),
+        "CloudFront-Signature": _cloudfront_b64(_rsa_sign(policy)),
+        "CloudFront-Key-Pair-Id": CLOUDFRONT_KEY_PAIR_ID
+    }
+
+
+def create_group_grant(group_id, ttl=CDN_GRANT_TTL):
+    """
+    Creates time-bounded CloudFront custom policies for the group's shard, one per prefix
+    ('https://<cdn>/media/g<group_id>/*', thumbs/..., previews/...). A policy holds a single resource,
+    so each prefix gets its own cookies, scoped to the prefix path.
+    :return: (list of {'path', 'cookies'}, expires epoch seconds)
+    """
+    group_id = int(group_id)
+    expires = int(time.time()) + ttl
+    grants = []
+    for prefix in GROUP_SHARD_PREFIXES:
+        path = f"/{prefix}/g{group_id}/"
+        grants.append({"path": path, "cookies": _signed_policy_cookies(f"https://{CDN_DOMAIN}{path}*", expires)})
+    return grants, expires
+
+
+def attach_grant_cookies(response, grants, expires):
+    """Sets the grant cookies on a Flask response (each set on its own prefix path)."""
+    for grant in grants:
+        for name, value in grant['cookies'].items():
+            response.set_cookie(name, value, expires=expires, domain=CDN_COOKIE_DOMAIN, path=grant['path'],
+                                secure=True, httponly=True, samesite='None')
+    return response
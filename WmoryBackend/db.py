@@ -1,5 +1,8 @@
 import mysql.connector
+from mysql.connector import pooling
 import os
+import time
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -13,6 +16,190 @@ db_config = {
     'database': os.getenv('DB_NAME')
 }
 
+# --- READ REPLICA CONFIGURATION ---
+# Optional read-only endpoint (e.g. an RDS read replica). When it is not set,
+# read connections simply go to the primary.
+REPLICA_HOST = os.getenv('DB_REPLICA_HOST')
+
+replica_config = dict(db_config, host=REPLICA_HOST) if REPLICA_HOST else None
+
+# Seconds after a user's own write during which their reads stay on the primary,
+# so replication lag never hides something they just changed.
+# The last write is kept in the worker that handled it and, with REDIS_URL, in a Redis key that
+# expires with the window, so every worker sees it. Reads outside the window never touch the primary.
+READ_YOUR_WRITES_WINDOW = float(os.getenv('READ_YOUR_WRITES_WINDOW', '5'))
+REDIS_URL = os.getenv('REDIS_URL')
+
+# A failing Redis is skipped for this long (marks stay local to the worker meanwhile)
+REDIS_RETRY_SECONDS = 30
+
+_recent_writes = {}  # user_id -> monotonic time the window ends (this worker's marks)
+_recent_writes_lock = threading.Lock()
+_redis = None
+_redis_lock = threading.Lock()
+_redis_down_until = 0.0
+
+# --- CONNECTION POOLS ---
+# One for the primary and one for the replica (when configured), per worker process, created on
+# first use (after gunicorn forks) or by lifecycle.warm_up.
+# close() on a pooled connection returns it to the pool. Connections opened while handling a request
+# are also closed when the request ends (init_app), so an error path that skips close() does not keep
+# a pool slot. When every pooled connection is checked out, a direct connection is opened instead of
+# failing the request; that is logged and counted (pool_stats, shown by /readyz). 0 disables pooling.
+DB_POOL_SIZE = min(int(os.getenv('DB_POOL_SIZE', '5')), 32)  # mysql.connector caps pools at 32
+
+_pools = {}  # name -> (pool, pid that created it)
+_pool_lock = threading.Lock()
+_stats = {"pool_exhausted": 0, "closed_at_teardown": 0}
+_stats_lock = threading.Lock()
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+        return _stats[name]
+
+def pool_stats():
+    """Direct connections opened because the pool was empty, and connections requests left open."""
+    with _stats_lock:
+        return dict(_stats, pool_size=DB_POOL_SIZE)
+
+def _get_pool(name, config):
+    """This process's pool for config (opening its connections on first call), or None if disabled."""
+    if DB_POOL_SIZE <= 0 or not config:
+        return None
+    entry = _pools.get(name)
+    if entry is None or entry[1] != os.getpid():
+        with _pool_lock:
+            entry = _pools.get(name)
+            if entry is None or entry[1] != os.getpid():
+                pool = pooling.MySQLConnectionPool(
+                    pool_name=f"wmory-{name}-{os.getpid()}",
+                    pool_size=DB_POOL_SIZE,
+                    pool_reset_session=True,
+                    **config
+                )
+                entry = _pools[name] = (pool, os.getpid())
+    return entry[0]
+
+def get_pool():
+    """Returns this process's primary connection pool, or None if disabled."""
+    return _get_pool('primary', db_config)
+
+def get_replica_pool():
+    """Returns this process's replica connection pool, or None if disabled or no replica is configured."""
+    return _get_pool('replica', replica_config)
+
+def _track(conn):
+    """Registers a connection opened during a request, so the request's teardown can close it."""
+    from flask import g, has_request_context
+    if has_request_context():
+        g.setdefault('_db_connections', []).append(conn)
+    return conn
+
+def _is_returned(conn):
+    # PooledMySQLConnection drops its inner connection once close() gave it back (no public flag)
+    return isinstance(conn, pooling.PooledMySQLConnection) and conn._cnx is None
+
+def close_request_connections(exc=None):
+    """teardown_request handler: returns connections the request did not close to the pool."""
+    from flask import g
+    for conn in g.pop('_db_connections', []):
+        if _is_returned(conn):
+            continue
+        try:
+            if isinstance(conn, pooling.PooledMySQLConnection) or conn.is_connected():
+                _count("closed_at_teardown")
+                conn.close()
+        except mysql.connector.Error as e:
+            print(f"[DB TEARDOWN ERROR]: {e}")
+
+def init_app(app):
+    app.teardown_request(close_request_connections)
+
+def _connect(pool_getter, config):
+    """A pooled connection when possible, else a direct one (both closed at request teardown if left open)."""
+    try:
+        pool = pool_getter()
+        if pool:
+            return _track(pool.get_connection())
+    except mysql.connector.errors.PoolError:
+        # Pool exhausted: serve the request from a direct connection, but make it visible
+        print(f"[DB POOL EXHAUSTED]: opening a direct connection to {config['host']} ({_count('pool_exhausted')} so far)")
+    except mysql.connector.Error as e:
+        print(f"[DB POOL ERROR]: {e}")
+    return _track(mysql.connector.connect(**config))
+
 def get_db_connection():
-    """Establishes and returns a connection to the MySQL database."""
-    return mysql.connector.connect(**db_config)
\ No newline at end of file
+    """Establishes and returns a connection to the MySQL database (pooled when possible)."""
+    return _connect(get_pool, db_config)
+
+def _get_redis():
+    """Shared store for write marks, created on first use (None when not configured or unavailable)."""
+    global _redis, REDIS_URL
+    if not REDIS_URL or time.monotonic() < _redis_down_until:
+        return None
+    if _redis is None:
+        with _redis_lock:
+            if _redis is None:
+                try:
+                    import redis  # optional dependency, only needed with REDIS_URL
+                except ImportError:
+                    print("[DB]: REDIS_URL is set but the redis package is not installed; write marks stay per worker")
+                    REDIS_URL = None
+                    return None
+                _redis = redis.Redis.from_url(REDIS_URL, socket_timeout=0.2, socket_connect_timeout=0.2)
+    return _redis
+
+def _redis_failed(e):
+    global _redis_down_until
+    print(f"[DB RECENT WRITE ERROR]: {e}")
+    _redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+
+def mark_user_write(user_id):
+    """Records that a user just wrote, pinning their reads to the primary for a short window."""
+    if not user_id or not replica_config:
+        return  # Without a replica every read already goes to the primary
+    now = time.monotonic()
+    with _recent_writes_lock:
+        # Drop expired marks so the map only holds users inside the window
+        for uid in [uid for uid, until in _recent_writes.items() if until <= now]:
+            del _recent_writes[uid]
+        _recent_writes[str(user_id)] = now + READ_YOUR_WRITES_WINDOW
+
+    client = _get_redis()
+    if client is not None:
+        try:
+            client.set(f"ryw:{user_id}", 1, px=int(READ_YOUR_WRITES_WINDOW * 1000))
+        except Exception as e:
+            _redis_failed(e)
+
+def _wrote_recently(user_id):
+    """Whether the user wrote within the window (this worker's marks first, then Redis)."""
+    with _recent_writes_lock:
+        until = _recent_writes.get(str(user_id))
+    if until and until > time.monotonic():
+        return True
+
+    client = _get_redis()
+    if client is None:
+        return False
+    try:
+        return bool(client.exists(f"ryw:{user_id}"))
+    except Exception as e:
+        _redis_failed(e)
+        return False
+
+def get_read_connection(user_id=None):
+    """
+    Returns a connection for read-only queries.
+    Uses the replica unless none is configured or the user wrote within the read-your-writes window.
+    Falls back to the primary if the replica is unreachable.
+    """
+    if not replica_config or (user_id and _wrote_recently(user_id)):
+        return get_db_connection()
+
+    try:
+        return _connect(get_replica_pool, replica_config)
+    except mysql.connector.Error as e:
+        print(f"[DB REPLICA ERROR]: {e}")
+        return get_db_connection()
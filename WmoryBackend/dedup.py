@@ -0,0 +1,174 @@
+# dedup.py
+import io
+import math
+import hashlib
+
+# Duplicate detection for group media.
+# Exact duplicates: S3 ETag at confirm time (see find_exact_duplicate), SHA-256 when the worker hashes the bytes.
+# Near duplicates (re-encoded, resized, screenshots of the same shot): 64-bit pHash + dHash, compared
+# against every earlier photo of the group in one vectorized numpy pass.
+
+# Both distances must be within their threshold to call two images near-duplicates
+PHASH_DISTANCE = 8
+DHASH_DISTANCE = 10
+
+_np = None
+_dct = None
+
+def _get_numpy():
+    global _np
+    if _np is None:
+        import numpy
+        _np = numpy
+    return _np
+
+
+def _dct_matrix(n=32):
+    """Orthonormal DCT-II matrix, built once: the 2D DCT is then two matrix products."""
+    global _dct
+    if _dct is None:
+        np = _get_numpy()
+        k = np.arange(n)
+        matrix = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n)) * math.sqrt(2.0 / n)
+        matrix[0] /= math.sqrt(2)
+        _dct = matrix
+    return _dct
+
+
+def _bits_to_int(bits):
+    np = _get_numpy()
+    return int.from_bytes(np.packbits(bits.astype(np.uint8).ravel()).tobytes(), 'big')
+
+
+# ==========================================
+# HASHES
+# ==========================================
+def sha256_hex(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def phash(image):
+    """DCT perceptual hash of a grayscale PIL image (low 8x8 frequencies vs. their median)."""
+    from PIL import Image
+    np = _get_numpy()
+    pixels = np.asarray(image.resize((32, 32), Image.LANCZOS), dtype=np.float64)
+    matrix = _dct_matrix()
+    low = (matrix @ pixels @ matrix.T)[:8, :8]
+    median = np.median(low.ravel()[1:])  # the DC term would dominate the median
+    return _bits_to_int(low > median)
+
+
+def dhash(image):
+    """Difference hash of a grayscale PIL image (horizontal gradient signs on a 9x8 grid)."""
+    from PIL import Image
+    np = _get_numpy()
+    pixels = np.asarray(image.resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def image_hashes(data):
+    """Returns {'sha256', 'phash', 'dhash'} for image bytes."""
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as img:
+        gray = img.convert('L')
+        return {"sha256": sha256_hex(data), "phash": phash(gray), "dhash": dhash(gray)}
+
+
+def hamming_distances(target, hashes):
+    """Bit distances between one 64-bit hash and an array of them (vectorized popcount)."""
+    np = _get_numpy()
+    values = np.asarray(hashes, dtype=np.uint64)
+    xor = np.bitwise_xor(values, np.uint64(target))
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+# ==========================================
+# DATABASE
+# ==========================================
+def find_exact_duplicates(cursor, group_id, metadata_by_key):
+    """
+    Confirm-time check for a batch of new objects: earlier photos of the group with the same
+    single-part ETag (MD5 of the bytes) and size, plus repeats inside the batch itself.
+    Multipart ETags depend on the part size, so they are not compared.
+    :return: dict of new object key -> {'id', 'file_name'} of the photo it duplicates
+             (id is None when the original is an earlier key of the same batch)
+    """
+    candidates = {k: m for k, m in metadata_by_key.items() if m.get('etag') and '-' not in m['etag']}
+    if not candidates:
+        return {}
+
+    signatures = list({(m['etag'], m['size_bytes']) for m in candidates.values()})
+    conditions = ' OR '.join(['(mm.etag = %s AND mm.size_bytes = %s)'] * len(signatures))
+    # A photo stored under one of the new keys is that key itself (an already confirmed upload), not a duplicate
+    key_strings = ','.join(['%s'] * len(candidates))
+    sql = f"""
+        SELECT mm.etag, mm.size_bytes, MIN(p.id) as id
+        FROM media_metadata mm
+        JOIN photos p ON p.file_name = mm.object_key
+        WHERE p.group_id = %s AND p.file_name NOT IN ({key_strings}) AND ({conditions})
+        GROUP BY mm.etag, mm.size_bytes
+    """
+    cursor.execute(sql, (group_id,) + tuple(candidates) + tuple(v for sig in signatures for v in sig))
+    existing = {(row['etag'], row['size_bytes']): row['id'] for row in cursor.fetchall()}
+
+    if existing:
+        format_strings = ','.join(['%s'] * len(existing))
+        cursor.execute(f"SELECT id, file_name FROM photos WHERE id IN ({format_strings})", tuple(existing.values()))
+        file_names = {row['id']: row['file_name'] for row in cursor.fetchall()}
+
+    duplicates = {}
+    first_in_batch = {}
+    for key, metadata in candidates.items():
+        signature = (metadata['etag'], metadata['size_bytes'])
+        if signature in existing:
+            photo_id = existing[signature]
+            duplicates[key] = {"id": photo_id, "file_name": file_names.get(photo_id)}
+        elif signature in first_in_batch:
+            duplicates[key] = {"id": None, "file_name": first_in_batch[signature]}
+        else:
+            first_in_batch[signature] = key
+    return duplicates
+
+
+def find_exact_duplicate(cursor, group_id, object_key, metadata):
+    """Single-object variant of find_exact_duplicates. :return: {'id', 'file_name'} or None"""
+    return find_exact_duplicates(cursor, group_id, {object_key: metadata}).get(object_key)
+
+
+def find_duplicate(cursor, photo_id, group_id, hashes):
+    """
+    Returns the id of the earliest photo of the group this one duplicates (exact SHA-256 match first,
+    then the nearest perceptual match), or None.
+    Uses idx_media_hashes_group, which covers the whole scan.
+    """
+    cursor.execute("""
+        SELECT photo_id, sha256, phash, dhash
+        FROM media_hashes
+        WHERE group_id = %s AND photo_id < %s AND duplicate_of IS NULL AND phash IS NOT NULL
+        ORDER BY photo_id
+    """, (group_id, photo_id))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+
+    for row in rows:
+        if row['sha256'] == hashes['sha256']:
+            return row['photo_id']
+
+    np = _get_numpy()
+    p_dist = hamming_distances(hashes['phash'], [r['phash'] for r in rows])
+    d_dist = hamming_distances(hashes['dhash'], [r['dhash'] for r in rows])
+    matches = np.flatnonzero((p_dist <= PHASH_DISTANCE) & (d_dist <= DHASH_DISTANCE))
+    if not len(matches):
+        return None
+    best = matches[np.argmin(p_dist[matches] + d_dist[matches])]
+    return rows[int(best)]['photo_id']
+
+
+def record_hashes(cursor, photo_id, group_id, hashes, duplicate_of=None):
+    """Stores a photo's hashes (hashes=None records that the photo could not be decoded)."""
+    hashes = hashes or {}
+    cursor.execute("""
+        INSERT IGNORE INTO media_hashes (photo_id, group_id, sha256, phash, dhash, duplicate_of)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, (photo_id, group_id, hashes.get('sha256'), hashes.get('phash'), hashes.get('dhash'), duplicate_of))
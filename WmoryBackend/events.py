@@ -0,0 +1,245 @@
+# events.py
+import os
+import json
+import time
+import queue
+import random
+import threading
+from dotenv import load_dotenv
+from db import get_db_connection
+
+load_dotenv()
+
+# Live group events for /group-events (server-sent events, routes/events.py).
+# Writers call publish_event in the transaction of the change. group_events is both the broker shared by
+# all workers and the replay log for reconnecting clients (Last-Event-ID). Each worker runs one poller
+# thread that reads new rows and fans them out to its in-process subscribers, so the database sees one
+# query per worker per EVENTS_POLL_INTERVAL however many clients are connected.
+# Events are hints ("something changed"); clients fetch the data itself through the regular endpoints.
+
+# --- EVENTS CONFIGURATION ---
+EVENTS_POLL_INTERVAL = float(os.getenv('EVENTS_POLL_INTERVAL', '1'))
+EVENTS_RETENTION_HOURS = int(os.getenv('EVENTS_RETENTION_HOURS', '24'))
+EVENTS_BATCH_SIZE = 1000
+
+# Events a subscriber can fall behind by before its stream is told to resync
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+# Ids skipped by the poller (a transaction still running, or rolled back) are re-read for this long
+GAP_WAIT_SECONDS = 10
+
+EVENT_TYPES = {'photo_added', 'photo_removed', 'media_restored', 'member_joined', 'member_left', 'request_pending'}
+
+
+def publish_event(cursor, group_ids, event_type, data=None):
+    """
+    Records an event for one group (id) or several (list) in the caller's transaction.
+    Subscribers receive it once the transaction commits.
+    """
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"Unknown event type: {event_type}")
+    if not isinstance(group_ids, (list, tuple, set)):
+        group_ids = [group_ids]
+    group_ids = sorted({int(g) for g in group_ids if g})
+    if not group_ids:
+        return
+    payload = json.dumps(data or {}, separators=(',', ':'))
+    cursor.executemany("INSERT INTO group_events (group_id, event_type, payload) VALUES (%s, %s, %s)",
+                       [(group_id, event_type, payload) for group_id in group_ids])
+
+
+def publish_photos_removed(cursor, photos):
+    """photo_removed events for deleted photo rows ('id' and 'group_id'), one per group."""
+    by_group = {}
+    for photo in photos:
+        by_group.setdefault(photo['group_id'], []).append(photo['id'])
+    for group_id, photo_ids in by_group.items():
+        publish_event(cursor, group_id, 'photo_removed', {"photo_ids": photo_ids})
+
+
+def _event(row):
+    return {"id": row['id'], "group_id": row['group_id'], "type": row['event_type'], "data": json.loads(row['payload'])}
+
+
+def fetch_events_since(cursor, group_ids, last_event_id, limit):
+    """
+    Events of the groups after last_event_id, oldest first (dictionary cursor).
+    :return: (events, complete) - complete is False when the client missed more than the log can replay
+    """
+    if not group_ids:
+        return [], True
+    cursor.execute("SELECT MIN(id) as first_id FROM group_events")
+    first_id = cursor.fetchone()['first_id']
+    if first_id is not None and last_event_id < first_id - 1:
+        # Pruned since the client's last event
+        return [], False
+
+    format_strings = ','.join(['%s'] * len(group_ids))
+    cursor.execute(f"""
+        SELECT id, group_id, event_type, payload FROM group_events
+        WHERE id > %s AND group_id IN ({format_strings})
+        ORDER BY id
+        LIMIT %s
+    """, (last_event_id, *group_ids, limit + 1))
+    rows = cursor.fetchall()
+    return [_event(row) for row in rows[:limit]], len(rows) <= limit
+
+
+# ==========================================
+# IN-PROCESS FAN-OUT
+# ==========================================
+class Subscription:
+    """One connected stream: the groups it follows and the events waiting to be sent."""
+
+    def __init__(self, group_ids):
+        self.group_ids = set(group_ids)
+        self.events = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def get(self, timeout):
+        """Next event, or None after timeout seconds without one."""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain_last_id(self, last_id):
+        """Empties the queue after an overflow. :return: the newest event id it held (or last_id)"""
+        while True:
+            try:
+                last_id = max(last_id, self.events.get_nowait()['id'])
+            except queue.Empty:
+                return last_id
+
+
+class LocalBroker:
+    """
+    Per-worker pub/sub over group_events. The poller thread is started with the first subscriber and
+    (re)started lazily, so it survives gunicorn forks like the audit buffer.
+    """
+
+    def __init__(self, poll_interval=EVENTS_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._subscribers = {}          # group_id -> set of Subscription
+        self._streams = set()           # every open Subscription (also those following no group)
+        self._thread = None
+        self._scan_from = None          # every id <= this has been delivered (or given up on)
+        self._delivered = set()         # ids > _scan_from already delivered
+        self._gaps = {}                 # missing id -> time.monotonic() first noticed
+
+    def _ensure_thread(self):
+        if self._pid != os.getpid():
+            self._reset()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="group-events", daemon=True)
+            self._thread.start()
+
+    def subscribe(self, group_ids, cursor, max_streams=None):
+        """
+        Registers a stream for the groups (dictionary cursor). An idle poller starts at the newest event,
+        read here before the caller replays, so every event is either replayed or delivered live.
+        The cap is checked under the same lock, so concurrent requests cannot both take the last slot.
+        :return: the Subscription, or None if max_streams streams are already open
+        """
+        subscription = Subscription(group_ids)
+        with self._lock:
+            self._ensure_thread()
+            if max_streams is not None and len(self._streams) >= max_streams:
+                return None
+            self._streams.add(subscription)
+            if self._scan_from is None:
+                cursor.execute("SELECT COALESCE(MAX(id), 0) as last_id FROM group_events")
+                self._scan_from = cursor.fetchone()['last_id']
+            for group_id in subscription.group_ids:
+                self._subscribers.setdefault(group_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription, group_ids=None):
+        """Stops delivering the given groups (default: all of them, closing the stream) to the subscription."""
+        with self._lock:
+            if group_ids is None:
+                self._streams.discard(subscription)
+            for group_id in list(group_ids if group_ids is not None else subscription.group_ids):
+                subscription.group_ids.discard(group_id)
+                subscribers = self._subscribers.get(group_id)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[group_id]
+
+    def publish_local(self, event):
+        """Delivers one event to this worker's subscribers of its group."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(event['group_id'], ()))
+        for subscription in subscribers:
+            try:
+                subscription.events.put_nowait(event)
+            except queue.Full:
+                # A stream this far behind resyncs instead of replaying
+                subscription.overflowed = True
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                if not self._subscribers:
+                    # Nobody to deliver to: the next subscriber restarts from the newest event
+                    self._scan_from = None
+                    self._delivered, self._gaps = set(), {}
+                    continue
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"[GROUP EVENTS POLL ERROR]: {e}")
+
+    def poll(self):
+        """Reads events committed since the last poll and fans them out."""
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("""
+                SELECT id, group_id, event_type, payload FROM group_events
+                WHERE id > %s
+                ORDER BY id
+                LIMIT %s
+            """, (self._scan_from, EVENTS_BATCH_SIZE))
+            rows = cursor.fetchall()
+
+            # Occasional cleanup keeps the log at EVENTS_RETENTION_HOURS
+            if random.random() < 0.001:
+                cursor.execute("DELETE FROM group_events WHERE created_at < NOW(6) - INTERVAL %s HOUR",
+                               (EVENTS_RETENTION_HOURS,))
+                conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+
+        self._advance(rows)
+
+    def _advance(self, rows):
+        """
+        Delivers new rows and moves the scan position. Auto-increment ids commit out of order, so an id
+        missing below a delivered one is re-read until it shows up or GAP_WAIT_SECONDS have passed.
+        """
+        now = time.monotonic()
+        expected = self._scan_from + 1
+        for row in rows:
+            for missing in range(expected, row['id']):
+                self._gaps.setdefault(missing, now)
+            expected = max(expected, row['id'] + 1)
+            self._gaps.pop(row['id'], None)
+            if row['id'] not in self._delivered:
+                self._delivered.add(row['id'])
+                self.publish_local(_event(row))
+
+        self._gaps = {gap: seen for gap, seen in self._gaps.items() if now - seen < GAP_WAIT_SECONDS}
+        self._scan_from = min(self._gaps) - 1 if self._gaps else expected - 1
+        self._delivered = {event_id for event_id in self._delivered if event_id > self._scan_from}
+
+
+broker = LocalBroker()
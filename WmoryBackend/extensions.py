@@ -1,6 +1,40 @@
 # extensions.py
+import os
+import threading
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
 # Initialize Limiter with IP address as the key function
-limiter = Limiter(key_func=get_remote_address)
\ No newline at end of file
+limiter = Limiter(key_func=get_remote_address)
+
+
+# =====================================================
+# FIREBASE (initialized on first use)
+# =====================================================
+# firebase_admin pulls in the Google auth/HTTP stack; only token verification needs it,
+# so it is imported and initialized the first time a token is checked.
+_firebase_lock = threading.Lock()
+
+def get_firebase_auth():
+    """Returns the firebase_admin.auth module, initializing the default app once per process."""
+    import firebase_admin
+    from firebase_admin import auth, credentials
+
+    if not firebase_admin._apps:
+        with _firebase_lock:
+            if not firebase_admin._apps:
+                firebase_creds = {
+                    "type": "service_account",
+                    "project_id": os.getenv("FIREBASE_PROJECT_ID"),
+                    "private_key_id": os.getenv("FIREBASE_PRIVATE_KEY_ID"),
+                    "private_key": os.getenv("FIREBASE_PRIVATE_KEY").replace('\\n', '\n') if os.getenv("FIREBASE_PRIVATE_KEY") else None,
+                    "client_email": os.getenv("FIREBASE_CLIENT_EMAIL"),
+                    "client_id": os.getenv("FIREBASE_CLIENT_ID"),
+                    "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+                    "token_uri": "https://oauth2.googleapis.com/token",
+                    "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
+                    "client_x509_cert_url": os.getenv("FIREBASE_CLIENT_CERT_URL")
+                }
+                cred = credentials.Certificate(firebase_creds)
+                firebase_admin.initialize_app(cred)
+    return auth
@@ -0,0 +1,80 @@
+# group_codes.py
+import os
+import hmac
+import string
+import hashlib
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Invite codes are a keyed permutation of a sequence number, so two groups can never get the same code
+# and creating a group needs no "is this code taken?" lookups.
+#   sequence (group_code_sequence) -> Feistel network over 42 bits -> 8 characters of A-Z0-9
+# Without the key, consecutive groups' codes look unrelated and cannot be enumerated.
+# Keep GROUP_CODE_SECRET stable: a new key starts a different permutation.
+
+ALPHABET = string.ascii_uppercase + string.digits
+CODE_LENGTH = 8
+CODE_SPACE = len(ALPHABET) ** CODE_LENGTH   # 36^8 ~ 2.8e12
+
+HALF_BITS = 21                              # 2^42 ~ 4.4e12 is the smallest even-bit domain covering CODE_SPACE
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 6
+
+# Required to create groups: a key derived from another secret would change (and reshuffle every future
+# code) whenever that secret is rotated, and would be guessable wherever that secret leaks.
+# Checked when the first code is generated, so the app still boots (and serves everything else) without it.
+GROUP_CODE_SECRET = os.getenv('GROUP_CODE_SECRET')
+
+_round_keys = None
+
+
+def _get_round_keys():
+    global _round_keys
+    if _round_keys is None:
+        if not GROUP_CODE_SECRET:
+            raise RuntimeError("GROUP_CODE_SECRET must be set (key of the invite-code permutation)")
+        secret = GROUP_CODE_SECRET.encode('utf-8')
+        _round_keys = [hmac.new(secret, f"round-{i}".encode(), hashlib.sha256).digest() for i in range(ROUNDS)]
+    return _round_keys
+
+
+def _feistel(value):
+    round_keys = _get_round_keys()
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for key in round_keys:
+        digest = hmac.new(key, right.to_bytes(4, 'big'), hashlib.sha256).digest()
+        left, right = right, left ^ (int.from_bytes(digest[:4], 'big') & HALF_MASK)
+    return (left << HALF_BITS) | right
+
+
+def permute(n):
+    """Bijection on [0, CODE_SPACE): the Feistel network is re-applied until the value lands in range (cycle walking)."""
+    if not 0 <= n < CODE_SPACE:
+        raise ValueError("sequence number out of range")
+    value = _feistel(n)
+    while value >= CODE_SPACE:
+        value = _feistel(value)
+    return value
+
+
+def encode(n):
+    chars = []
+    for _ in range(CODE_LENGTH):
+        n, digit = divmod(n, len(ALPHABET))
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def code_for_sequence(n):
+    return encode(permute(n))
+
+
+def next_group_code(cursor):
+    """
+    Reserves the next sequence number (one statement, no retry loop) and returns its code.
+    The row lock on the sequence is held until the caller's transaction ends.
+    """
+    _get_round_keys()  # fail before reserving a number when the key is missing
+    cursor.execute("UPDATE group_code_sequence SET next_value = LAST_INSERT_ID(next_value + 1)")
+    return code_for_sequence(cursor.lastrowid)
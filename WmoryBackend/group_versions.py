@@ -0,0 +1,64 @@
+# group_versions.py
+
+# groups_table.content_version changes whenever anything a member sees in the group changes
+# (media, members, roles, requests, settings). Clients poll /group-versions and refetch only the groups
+# whose version moved; server-side caches (cache.py) use it in their keys.
+# Bump in the same transaction as the change, as late as possible: the UPDATE holds the group row lock
+# until the commit.
+
+
+def bump_group_version(cursor, group_ids):
+    """Increments the version of one group (id) or several (list)."""
+    if not isinstance(group_ids, (list, tuple, set)):
+        group_ids = [group_ids]
+    group_ids = sorted({int(g) for g in group_ids if g})  # fixed order: concurrent bumps never deadlock
+    if not group_ids:
+        return
+    format_strings = ','.join(['%s'] * len(group_ids))
+    cursor.execute(f"UPDATE groups_table SET content_version = content_version + 1 WHERE id IN ({format_strings})",
+                   tuple(group_ids))
+
+
+def bump_user_groups(cursor, user_ids):
+    """
+    Increments the version of every group the users belong to (profile changes, departures).
+    Expects a dictionary cursor. :return: the memberships read, [{'user_id', 'group_id'}]
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return []
+    format_strings = ','.join(['%s'] * len(user_ids))
+    cursor.execute(f"SELECT user_id, group_id FROM groups_members WHERE user_id IN ({format_strings})", tuple(user_ids))
+    memberships = cursor.fetchall()
+    bump_group_version(cursor, [row['group_id'] for row in memberships])
+    return memberships
+
+
+def bump_block_version(cursor, user_ids):
+    """users.block_version keys the cached block sets of a viewer: bump it for both sides of a (un)block."""
+    user_ids = sorted({int(u) for u in user_ids if u})
+    if not user_ids:
+        return
+    format_strings = ','.join(['%s'] * len(user_ids))
+    cursor.execute(f"UPDATE users SET block_version = block_version + 1 WHERE id IN ({format_strings})", tuple(user_ids))
+
+
+def get_cache_versions(cursor, group_id, user_id):
+    """(group content_version, viewer block_version) in one round trip (dictionary cursor); None when missing."""
+    cursor.execute("""
+        SELECT (SELECT content_version FROM groups_table WHERE id = %s) as group_version,
+               (SELECT block_version FROM users WHERE id = %s) as block_version
+    """, (group_id, user_id))
+    row = cursor.fetchone()
+    return row['group_version'], row['block_version']
+
+
+def get_group_versions(cursor, user_id):
+    """{group_id: content_version} for every group of the user (dictionary cursor, served by idx_members_user_group)."""
+    cursor.execute("""
+        SELECT g.id, g.content_version
+        FROM groups_members gm
+        JOIN groups_table g ON g.id = gm.group_id
+        WHERE gm.user_id = %s
+    """, (user_id,))
+    return {row['id']: row['content_version'] for row in cursor.fetchall()}
@@ -0,0 +1,54 @@
+# gunicorn.conf.py
+import os
+
+# Used by the Dockerfile: gunicorn -c gunicorn.conf.py app:app
+
+bind = [os.getenv('GUNICORN_BIND', '0.0.0.0:5000')]
+# Container-specific address for deploy readiness checks (the public port may be shared, see reuse_port)
+if os.getenv('GUNICORN_HEALTH_BIND'):
+    bind.append(os.getenv('GUNICORN_HEALTH_BIND'))
+
+workers = int(os.getenv('GUNICORN_WORKERS', '3'))
+# Threaded workers: an open /group-events stream holds a thread, not a whole process.
+# Keep MAX_STREAMS_PER_WORKER (routes/events.py) below this so regular requests always find a thread.
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '64'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+# Import the app once in the master and fork the workers from it: the imported modules are shared
+# copy-on-write instead of being loaded again by every worker, and a broken import fails the deploy
+# before any worker is started. Clients (S3, Firebase, DB connections) are created lazily in each
+# worker after the fork, so nothing with a socket or thread is inherited.
+preload_app = True
+
+# --- ZERO-DOWNTIME LIFECYCLE ---
+# During a deploy the old and the new container listen on the same port (SO_REUSEPORT) until the
+# old one has drained, so no connection is refused in between.
+reuse_port = True
+
+# On SIGTERM workers fail /readyz for DRAIN_DELAY_SECONDS (lifecycle.py) while still serving, then stop
+# accepting; they get this long in total to finish in-flight requests (uploads, confirms)
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '60'))
+
+# Recycle workers after a number of requests (jittered so they do not all restart together);
+# replacements warm up in post_fork before they accept anything.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '500'))
+
+
+def post_fork(server, worker):
+    # Runs in the new worker before it accepts connections
+    from lifecycle import warm_up
+    warm_up()
+
+
+def post_worker_init(worker):
+    # Runs after gunicorn installed the worker's signal handlers: SIGTERM fails readiness before serving stops
+    from lifecycle import install_drain_handler
+    install_drain_handler(worker.handle_exit)
+
+
+def worker_exit(server, worker):
+    # Runs after the worker stopped serving: flush buffered background work
+    from lifecycle import drain
+    drain()
@@ -0,0 +1,113 @@
+# hidden_sets.py
+from collections import defaultdict
+
+from db import get_db_connection
+from bitmap import IdBitmap
+
+# Items a user hid ("remove for me"), stored as one compact id set per (user, group) in hidden_sets
+# (bitmap.py) instead of one hidden_photos row per item. Readers decode the set once per request and
+# filter in process (visibility.load_hidden_ids). Ids of deleted photos may stay in a set: they never
+# match a row again.
+# Blocks are not written here: blocked uploaders are filtered by the block itself (visibility.py).
+# Existing hidden_photos rows are compacted once with: python hidden_sets.py
+
+EMPTY_SET = IdBitmap().to_bytes()
+COMPACT_BATCH_USERS = 500
+
+
+def load_hidden_set(cursor, user_id, group_id):
+    """The user's hidden ids in the group as an IdBitmap (dictionary cursor)."""
+    cursor.execute("SELECT bitmap FROM hidden_sets WHERE user_id = %s AND group_id = %s", (user_id, group_id))
+    row = cursor.fetchone()
+    return IdBitmap.from_bytes(row['bitmap'] if row else None)
+
+
+def add_to_hidden_sets(cursor, user_id, ids_by_group):
+    """
+    Adds ids to the user's sets ({group_id: [photo ids]}, dictionary cursor, caller commits).
+    The rows are created first and then locked, so concurrent writers merge instead of overwriting.
+    """
+    ids_by_group = {int(g): ids for g, ids in ids_by_group.items() if ids}
+    if not ids_by_group:
+        return
+    groups = sorted(ids_by_group)
+    cursor.executemany("INSERT IGNORE INTO hidden_sets (user_id, group_id, bitmap, item_count) VALUES (%s, %s, %s, 0)",
+                       [(user_id, group_id, EMPTY_SET) for group_id in groups])
+    format_strings = ','.join(['%s'] * len(groups))
+    cursor.execute(f"""
+        SELECT group_id, bitmap FROM hidden_sets
+        WHERE user_id = %s AND group_id IN ({format_strings})
+        FOR UPDATE
+    """, (user_id, *groups))
+    updates = []
+    for row in cursor.fetchall():
+        hidden = IdBitmap.from_bytes(row['bitmap'])
+        hidden.update(ids_by_group[row['group_id']])
+        updates.append((hidden.to_bytes(), len(hidden), user_id, row['group_id']))
+    cursor.executemany("UPDATE hidden_sets SET bitmap = %s, item_count = %s WHERE user_id = %s AND group_id = %s", updates)
+
+
+def hide_photos(cursor, user_id, photo_ids):
+    """Hides photos for the user, whatever groups they are in (unknown ids are ignored)."""
+    photo_ids = list({int(pid) for pid in photo_ids})
+    if not photo_ids:
+        return
+    format_strings = ','.join(['%s'] * len(photo_ids))
+    cursor.execute(f"SELECT id, group_id FROM photos WHERE id IN ({format_strings})", tuple(photo_ids))
+    ids_by_group = defaultdict(list)
+    for row in cursor.fetchall():
+        ids_by_group[row['group_id']].append(row['id'])
+    add_to_hidden_sets(cursor, user_id, ids_by_group)
+
+
+# ==========================================
+# ONE-OFF COMPACTION OF hidden_photos
+# ==========================================
+def compact_hidden_photos(batch_users=COMPACT_BATCH_USERS):
+    """
+    Folds hidden_photos rows into hidden_sets, one transaction per batch of users (safe to re-run).
+    Rows that only existed because of a block (the uploader and the user block each other in either
+    direction) are dropped: the block already hides them, and unblocking used to delete them.
+    :return: number of rows folded in
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    folded = 0
+    last_user = 0
+    try:
+        while True:
+            cursor.execute("""
+                SELECT DISTINCT user_id FROM hidden_photos
+                WHERE user_id > %s ORDER BY user_id LIMIT %s
+            """, (last_user, batch_users))
+            users = [row['user_id'] for row in cursor.fetchall()]
+            if not users:
+                return folded
+
+            format_strings = ','.join(['%s'] * len(users))
+            cursor.execute(f"""
+                SELECT hp.user_id, p.group_id, hp.photo_id
+                FROM hidden_photos hp
+                JOIN photos p ON p.id = hp.photo_id
+                WHERE hp.user_id IN ({format_strings})
+                AND NOT EXISTS (
+                    SELECT 1 FROM blocked_users b
+                    WHERE (b.blocker_id = hp.user_id AND b.blocked_id = p.user_id)
+                    OR (b.blocker_id = p.user_id AND b.blocked_id = hp.user_id)
+                )
+            """, tuple(users))
+            by_user = defaultdict(lambda: defaultdict(list))
+            for row in cursor.fetchall():
+                by_user[row['user_id']][row['group_id']].append(row['photo_id'])
+                folded += 1
+            for user_id, ids_by_group in by_user.items():
+                add_to_hidden_sets(cursor, user_id, ids_by_group)
+            conn.commit()
+            last_user = users[-1]
+            print(f"Hidden sets: compacted users up to {last_user} ({folded} rows so far)")
+    finally:
+        cursor.close(); conn.close()
+
+
+if __name__ == '__main__':
+    print(f"Compacted {compact_hidden_photos()} hidden_photos rows into hidden_sets")
@@ -0,0 +1,109 @@
+# lifecycle.py
+import os
+import time
+import signal
+import threading
+
+from db import get_db_connection, get_pool
+from s3_helpers import get_s3_client, get_presigned_url
+
+# Worker lifecycle: warm-up before serving, readiness checks, and draining at shutdown.
+# gunicorn.conf.py calls warm_up() in post_fork, install_drain_handler() in post_worker_init and drain()
+# in worker_exit; /readyz (routes/health.py) reports whether this worker is warm and not shutting down.
+
+_ready = threading.Event()
+_draining = threading.Event()
+_warm_lock = threading.Lock()
+
+# Key presigned during warm-up: caches credentials and the day's signing key (no request is sent)
+WARMUP_KEY = 'media/warmup'
+
+# Seconds a worker keeps serving after SIGTERM with /readyz failing, so the load balancer stops
+# sending it traffic before it stops accepting connections. Keep it below graceful_timeout.
+DRAIN_DELAY = float(os.getenv('DRAIN_DELAY_SECONDS', '5'))
+
+
+def warm_up():
+    """
+    Opens the DB pool, creates the S3 client and signs one URL, so the first real requests of a
+    fresh (or recycled) worker do not pay for connection handshakes and credential lookups.
+    :return: True when everything is warm
+    """
+    with _warm_lock:
+        if _ready.is_set():
+            return True
+        start = time.monotonic()
+        try:
+            get_pool()
+            check_database()
+            get_s3_client()
+            if not get_presigned_url(WARMUP_KEY):
+                raise RuntimeError("presigning failed")
+        except Exception as e:
+            print(f"[WARM-UP ERROR]: {e}")
+            return False
+        _ready.set()
+        print(f"Worker warm in {(time.monotonic() - start) * 1000:.0f} ms")
+        return True
+
+
+def check_database():
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def readiness():
+    """
+    Checks used by /readyz. A worker that failed to warm up retries here.
+    :return: (ready, checks dict)
+    """
+    if _draining.is_set():
+        return False, {"draining": True}
+    if not _ready.is_set():
+        warm_up()
+
+    checks = {"warm": _ready.is_set()}
+    try:
+        check_database()
+        checks["database"] = True
+    except Exception as e:
+        print(f"[READINESS DB ERROR]: {e}")
+        checks["database"] = False
+    checks["storage"] = bool(get_presigned_url(WARMUP_KEY))
+    return all(checks.values()), checks
+
+
+def install_drain_handler(worker_exit_handler):
+    """
+    Wraps the worker's SIGTERM handler: readiness turns false at once, and the worker's own handler
+    (which stops accepting connections) runs DRAIN_DELAY seconds later.
+    Must be installed after gunicorn set up the worker's signals (post_worker_init).
+    """
+    def handle_term(signum, frame):
+        if _draining.is_set():
+            return
+        _draining.set()
+        print(f"SIGTERM received: failing readiness, stopping in {DRAIN_DELAY:g} s")
+        timer = threading.Timer(DRAIN_DELAY, worker_exit_handler, (signum, frame))
+        timer.daemon = True
+        timer.start()
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+
+def drain():
+    """
+    Called when the worker stops (after in-flight requests finished): readiness stays false and
+    buffered background work is written out before the process exits.
+    The audit buffer is the only queue: push notifications and mails are sent inside the request
+    that triggers them, so they finish with the in-flight requests (graceful_timeout).
+    """
+    _draining.set()
+    from audit import audit_buffer
+    audit_buffer.close()
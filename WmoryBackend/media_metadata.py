@@ -0,0 +1,272 @@
+# media_metadata.py
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote_plus
+from dotenv import load_dotenv
+
+from db import get_db_connection
+from s3_helpers import head_object_metadata
+
+load_dotenv()
+
+# --- MEDIA EVENTS CONFIGURATION ---
+# Source of S3 ObjectCreated/ObjectRemoved notifications:
+#   unset -> no consumer, confirm-upload verifies with a HEAD request
+#   URL   -> SQS queue subscribed to the bucket's event notifications
+MEDIA_EVENTS_QUEUE = os.getenv('MEDIA_EVENTS_QUEUE')
+MEDIA_EVENTS_WAIT = int(os.getenv('MEDIA_EVENTS_WAIT', '20'))  # SQS long-poll seconds
+
+# Only objects under these prefixes are tracked
+TRACKED_PREFIXES = ('media/',)
+
+# Renditions written by the thumbnail Lambda / media worker: prefix -> photos flag it sets.
+# A rendition keeps the original's path after the prefix ('thumbs/g1/x.jpg' belongs to 'media/g1/x.jpg').
+RENDITION_FLAGS = {'thumbs/': 'has_thumbnail', 'previews/': 'has_preview'}
+
+# Concurrent HEAD requests when a batch confirm verifies unknown keys
+HEAD_WORKERS = 8
+
+# Metadata rows with no photo after this many hours belong to abandoned or deleted uploads
+ORPHAN_AFTER_HOURS = int(os.getenv('MEDIA_ORPHAN_AFTER_HOURS', '24'))
+
+
+# ==========================================
+# METADATA TABLE
+# ==========================================
+def get_media_metadata(cursor, object_key):
+    """Returns the recorded metadata of an object (dictionary cursor), or None."""
+    cursor.execute("SELECT object_key, size_bytes, content_type, etag, verified_at FROM media_metadata WHERE object_key = %s", (object_key,))
+    return cursor.fetchone()
+
+
+# A missing content type (S3 events do not carry one) never overwrites a known one
+UPSERT_METADATA_SQL = """
+    INSERT INTO media_metadata (object_key, size_bytes, content_type, etag, verified_at)
+    VALUES (%s, %s, %s, %s, UTC_TIMESTAMP())
+    ON DUPLICATE KEY UPDATE
+        size_bytes = VALUES(size_bytes),
+        content_type = COALESCE(VALUES(content_type), content_type),
+        etag = VALUES(etag),
+        verified_at = VALUES(verified_at)
+"""
+
+def save_media_metadata(cursor, object_key, size_bytes, content_type=None, etag=None):
+    """Inserts or refreshes an object's metadata."""
+    cursor.execute(UPSERT_METADATA_SQL, (object_key, size_bytes, content_type, etag))
+
+
+def verify_upload(cursor, object_key):
+    """
+    Returns the authoritative metadata of an uploaded object.
+    Uses the row written by the event consumer when there is one, otherwise issues a single HEAD and records the result.
+    :return: dict with size_bytes, content_type, etag; None if the object does not exist in S3
+    """
+    metadata = get_media_metadata(cursor, object_key)
+    if metadata:
+        return metadata
+
+    metadata = head_object_metadata(object_key)
+    if metadata is None:
+        return None
+    save_media_metadata(cursor, object_key, metadata['size_bytes'], metadata['content_type'], metadata['etag'])
+    return metadata
+
+
+def verify_uploads(cursor, object_keys):
+    """
+    Batch variant of verify_upload: one SELECT for recorded keys, concurrent HEADs for the rest.
+    :return: dict of object_key -> metadata (keys missing from S3 are left out)
+    """
+    keys = list(dict.fromkeys(object_keys))
+    if not keys:
+        return {}
+
+    format_strings = ','.join(['%s'] * len(keys))
+    cursor.execute(f"SELECT object_key, size_bytes, content_type, etag FROM media_metadata WHERE object_key IN ({format_strings})", tuple(keys))
+    found = {row['object_key']: row for row in cursor.fetchall()}
+
+    unknown = [k for k in keys if k not in found]
+    if unknown:
+        with ThreadPoolExecutor(max_workers=min(HEAD_WORKERS, len(unknown))) as executor:
+            heads = dict(zip(unknown, executor.map(head_object_metadata, unknown)))
+        rows = [(k, m['size_bytes'], m['content_type'], m['etag']) for k, m in heads.items() if m]
+        if rows:
+            cursor.executemany(UPSERT_METADATA_SQL, rows)
+        found.update({k: m for k, m in heads.items() if m})
+    return found
+
+
+def mark_rendition(cursor, rendition_key, prefix):
+    """Sets the photo's has_thumbnail/has_preview flag once its rendition exists in S3."""
+    source_key = 'media/' + rendition_key[len(prefix):]
+    cursor.execute(f"UPDATE photos SET {RENDITION_FLAGS[prefix]} = 1 WHERE file_name = %s", (source_key,))
+
+
+def sync_rendition_flags(cursor, file_names):
+    """
+    Called right after photo rows are inserted: picks up renditions whose events arrived first.
+    Without an event queue nothing reports renditions, so the Lambda thumbnail is assumed for images
+    (video posters are written by media_worker.py, which sets the flags itself).
+    """
+    if not file_names:
+        return
+    format_strings = ','.join(['%s'] * len(file_names))
+    if not MEDIA_EVENTS_QUEUE:
+        cursor.execute(f"UPDATE photos SET has_thumbnail = 1 WHERE file_name IN ({format_strings}) AND media_type = 'image'", tuple(file_names))
+        return
+    for prefix, flag in RENDITION_FLAGS.items():
+        sql = f"""
+            UPDATE photos p
+            JOIN media_metadata mm ON mm.object_key = CONCAT(%s, SUBSTRING(p.file_name, %s))
+            SET p.{flag} = 1
+            WHERE p.file_name IN ({format_strings})
+        """
+        cursor.execute(sql, (prefix, len('media/') + 1) + tuple(file_names))
+
+
+def purge_orphaned_metadata(cursor):
+    """Deletes metadata of objects that never got (or no longer have) a photo row."""
+    sql = """
+        DELETE mm FROM media_metadata mm
+        LEFT JOIN photos p ON p.file_name = mm.object_key
+        WHERE p.id IS NULL AND mm.verified_at < UTC_TIMESTAMP() - INTERVAL %s HOUR
+    """
+    cursor.execute(sql, (ORPHAN_AFTER_HOURS,))
+    return cursor.rowcount
+
+
+# ==========================================
+# EVENT QUEUES
+# ==========================================
+class SQSEventQueue:
+    """SQS queue receiving the bucket's event notifications. Messages are S3 notification bodies (JSON strings)."""
+
+    def __init__(self, queue_url):
+        import boto3
+        self.queue_url = queue_url
+        self._client = boto3.client('sqs', region_name=os.getenv('AWS_REGION', 'eu-north-1'))
+
+    def receive(self, max_messages=10, wait_seconds=MEDIA_EVENTS_WAIT):
+        """Returns a list of (receipt, body) pairs."""
+        response = self._client.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=max_messages,
+            WaitTimeSeconds=wait_seconds
+        )
+        return [(m['ReceiptHandle'], m['Body']) for m in response.get('Messages', [])]
+
+    def ack(self, receipt):
+        self._client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=receipt)
+
+
+_event_queue = None
+
+def get_event_queue():
+    """Returns the configured event queue, or None when no queue is configured."""
+    global _event_queue
+    if _event_queue is None and MEDIA_EVENTS_QUEUE:
+        _event_queue = SQSEventQueue(MEDIA_EVENTS_QUEUE)
+    return _event_queue
+
+
+# ==========================================
+# EVENT CONSUMER
+# ==========================================
+def parse_s3_event(body):
+    """
+    Extracts (event, key, size, etag) tuples from an S3 event notification body.
+    event is 'created', 'removed' or 'rendition' (size then holds the rendition prefix);
+    test events and untracked prefixes are skipped.
+    """
+    payload = json.loads(body)
+    records = []
+    for record in payload.get('Records', []):
+        event_name = record.get('eventName', '')
+        obj = record.get('s3', {}).get('object', {})
+        key = unquote_plus(obj.get('key', ''))
+        rendition = next((p for p in RENDITION_FLAGS if key.startswith(p)), None)
+        if rendition:
+            if event_name.startswith('ObjectCreated'):
+                records.append(('rendition', key, rendition, None))
+            continue
+        if not key.startswith(TRACKED_PREFIXES):
+            continue
+        if event_name.startswith('ObjectCreated'):
+            records.append(('created', key, obj.get('size', 0), obj.get('eTag')))
+        elif event_name.startswith('ObjectRemoved'):
+            records.append(('removed', key, None, None))
+    return records
+
+
+def consume_events(event_queue, max_messages=10, wait_seconds=None):
+    """
+    Receives one batch of notifications and applies it to media_metadata in one transaction.
+    Messages are acknowledged only after the commit.
+    :return: number of records applied
+    """
+    kwargs = {'max_messages': max_messages}
+    if wait_seconds is not None:
+        kwargs['wait_seconds'] = wait_seconds
+    messages = event_queue.receive(**kwargs)
+    if not messages:
+        return 0
+
+    applied = 0
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        for _, body in messages:
+            try:
+                records = parse_s3_event(body)
+            except ValueError as e:
+                print(f"Media Event Parse Error: {e}")
+                continue
+            for event, key, size, etag in records:
+                if event == 'created':
+                    save_media_metadata(cursor, key, size, None, etag)
+                elif event == 'rendition':
+                    # Also recorded in media_metadata in case the photo row does not exist yet
+                    save_media_metadata(cursor, key, 0, None, None)
+                    mark_rendition(cursor, key, size)
+                else:
+                    cursor.execute("DELETE FROM media_metadata WHERE object_key = %s", (key,))
+                applied += 1
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+    for receipt, _ in messages:
+        event_queue.ack(receipt)
+    return applied
+
+
+def run_consumer(event_queue, purge_interval=3600):
+    """Consumes notifications forever; purges orphaned rows every purge_interval seconds."""
+    last_purge = 0
+    while True:
+        try:
+            consume_events(event_queue)
+            if time.time() - last_purge > purge_interval:
+                conn = get_db_connection()
+                cursor = conn.cursor()
+                purged = purge_orphaned_metadata(cursor)
+                conn.commit()
+                cursor.close(); conn.close()
+                last_purge = time.time()
+                if purged:
+                    print(f"🗑️ Purged {purged} orphaned media metadata rows")
+        except Exception as e:
+            print(f"Media Event Consumer Error: {e}")
+            time.sleep(5)
+
+
+if __name__ == '__main__':
+    # Standalone consumer process: python media_metadata.py
+    event_queue = get_event_queue()
+    if event_queue is None:
+        raise SystemExit("MEDIA_EVENTS_QUEUE must be set to an SQS queue URL")
+    print(f"Consuming media events from {MEDIA_EVENTS_QUEUE}")
+    run_consumer(event_queue)
@@ -0,0 +1,367 @@
+# media_worker.py
+import os
+import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+from db import get_db_connection
+from s3_helpers import get_presigned_url, upload_bytes_to_s3, upload_file_to_s3, download_bytes_from_s3, get_thumbnail_key, get_preview_key
+from s3_helpers import delete_media_from_s3
+from dedup import image_hashes, find_duplicate, record_hashes
+from blobs import merge_blob
+from group_versions import bump_group_version
+
+load_dotenv()
+
+# Video renditions: a poster frame written to the thumbnail key and a short low-bitrate preview.
+# Images: exact/perceptual hashes for duplicate detection (dedup.py).
+# Frames are read straight from a presigned URL; OpenCV (FFmpeg) seeks with range requests,
+# so only the frames around the sampled positions are downloaded and decoded.
+# Run as a separate process: python media_worker.py
+
+# --- WORKER CONFIGURATION ---
+MEDIA_WORKER_THREADS = int(os.getenv('MEDIA_WORKER_THREADS', '2'))
+MEDIA_WORKER_POLL = int(os.getenv('MEDIA_WORKER_POLL', '10'))  # seconds between scans when idle
+MEDIA_WORKER_BATCH = 20
+MAX_RENDER_ATTEMPTS = 3
+MAX_HASH_ATTEMPTS = 3
+
+# Poster: candidate positions (fraction of duration), first one that is not (near) black wins
+POSTER_POSITIONS = (0.1, 0.25, 0.5, 0.75, 0.02)
+BLACK_MEAN_THRESHOLD = 20     # mean luma (0-255) below this is a black/fade frame
+FLAT_STD_THRESHOLD = 8        # nearly uniform frames (title cards, lens cap) are skipped too
+POSTER_SIZE = 300             # same box as the image thumbnails
+POSTER_QUALITY = 85
+
+# Preview: a few seconds from the poster position, small and at a low frame rate
+PREVIEW_SECONDS = 3
+PREVIEW_WIDTH = 320
+PREVIEW_FPS = 12
+
+_cv2 = None
+
+def _get_cv2():
+    """OpenCV is heavy to import and only this worker needs it."""
+    global _cv2
+    if _cv2 is None:
+        import cv2
+        _cv2 = cv2
+    return _cv2
+
+
+# ==========================================
+# FRAME HELPERS
+# ==========================================
+def is_blank_frame(frame):
+    cv2 = _get_cv2()
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    mean, std = cv2.meanStdDev(gray)
+    return mean[0][0] < BLACK_MEAN_THRESHOLD or std[0][0] < FLAT_STD_THRESHOLD
+
+
+def fit_within(frame, max_side):
+    cv2 = _get_cv2()
+    h, w = frame.shape[:2]
+    scale = max_side / float(max(h, w))
+    if scale >= 1:
+        return frame
+    return cv2.resize(frame, (max(2, int(w * scale)) // 2 * 2, max(2, int(h * scale)) // 2 * 2), interpolation=cv2.INTER_AREA)
+
+
+def read_frame_at(cap, position_ms):
+    """Seeks to position_ms and decodes a single frame (None if the seek/decode fails)."""
+    cv2 = _get_cv2()
+    cap.set(cv2.CAP_PROP_POS_MSEC, position_ms)
+    ok, frame = cap.read()
+    return frame if ok else None
+
+
+def pick_poster_frame(cap, duration_ms):
+    """
+    Returns (frame, position_ms) of the first non-blank candidate position.
+    Falls back to the brightest candidate when every sample is dark.
+    """
+    cv2 = _get_cv2()
+    fallback = None
+    for fraction in POSTER_POSITIONS:
+        position = duration_ms * fraction
+        frame = read_frame_at(cap, position)
+        if frame is None:
+            continue
+        if not is_blank_frame(frame):
+            return frame, position
+        brightness = sum(cv2.mean(frame)[:3])
+        if fallback is None or brightness > fallback[2]:
+            fallback = (frame, position, brightness)
+    if fallback:
+        return fallback[0], fallback[1]
+    # Unknown duration or failed seeks: first decodable frame
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    ok, frame = cap.read()
+    return (frame, 0) if ok else (None, 0)
+
+
+def write_preview(cap, start_ms, source_fps, path):
+    """
+    Writes PREVIEW_SECONDS of video from start_ms to path at PREVIEW_FPS / PREVIEW_WIDTH.
+    Frames that are dropped to reach the target rate are only grabbed, not decoded into images.
+    :return: True if at least one frame was written
+    """
+    cv2 = _get_cv2()
+    cap.set(cv2.CAP_PROP_POS_MSEC, start_ms)
+    step = max(1, int(round((source_fps or PREVIEW_FPS) / PREVIEW_FPS)))
+    frames_needed = PREVIEW_SECONDS * PREVIEW_FPS
+
+    writer = None
+    written = 0
+    try:
+        while written < frames_needed:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frame = fit_within(frame, PREVIEW_WIDTH)
+            if writer is None:
+                h, w = frame.shape[:2]
+                writer = _open_writer(path, (w, h))
+                if writer is None:
+                    return False
+            writer.write(frame)
+            written += 1
+            for _ in range(step - 1):
+                if not cap.grab():
+                    break
+    finally:
+        if writer is not None:
+            writer.release()
+    return written > 0
+
+
+def _open_writer(path, size):
+    # H.264 plays everywhere; wheels without an H.264 encoder fall back to MPEG-4 Part 2
+    cv2 = _get_cv2()
+    for codec in ('avc1', 'mp4v'):
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), PREVIEW_FPS, size)
+        if writer.isOpened():
+            return writer
+        writer.release()
+    print("❌ Media Worker: no usable video encoder")
+    return None
+
+
+# ==========================================
+# RENDERING
+# ==========================================
+def render_video(photo):
+    """
+    Renders the poster frame and preview of one video row.
+    :return: dict of photo columns to update, or None if the video could not be decoded
+    """
+    cv2 = _get_cv2()
+    file_name = photo['file_name']
+    url = get_presigned_url(file_name, expiration=600)
+    if not url:
+        return None
+
+    cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG)
+    try:
+        if not cap.isOpened():
+            print(f"❌ Media Worker: cannot open {file_name}")
+            return None
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0
+        frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or None
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or None
+        duration_ms = int(frame_count / fps * 1000) if fps and frame_count else None
+
+        frame, position = pick_poster_frame(cap, duration_ms or 0)
+        if frame is None:
+            print(f"❌ Media Worker: no decodable frame in {file_name}")
+            return None
+
+        result = {"width": width, "height": height, "duration_ms": duration_ms, "has_thumbnail": 0, "has_preview": 0}
+
+        ok, jpeg = cv2.imencode('.jpg', fit_within(frame, POSTER_SIZE), [cv2.IMWRITE_JPEG_QUALITY, POSTER_QUALITY])
+        if ok and upload_bytes_to_s3(jpeg.tobytes(), get_thumbnail_key(file_name), 'image/jpeg'):
+            result['has_thumbnail'] = 1
+
+        # Start the preview a little before the poster so it leads into the tile image
+        start_ms = max(0, position - 1000)
+        if duration_ms:
+            start_ms = min(start_ms, max(0, duration_ms - PREVIEW_SECONDS * 1000))
+        fd, tmp_path = tempfile.mkstemp(suffix='.mp4')
+        os.close(fd)
+        try:
+            if write_preview(cap, start_ms, fps, tmp_path):
+                if upload_file_to_s3(tmp_path, get_preview_key(file_name), content_type='video/mp4'):
+                    result['has_preview'] = 1
+        finally:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+
+        return result
+    finally:
+        cap.release()
+
+
+def fetch_pending_videos(cursor, limit=MEDIA_WORKER_BATCH):
+    """Videos that are missing a poster or preview and have attempts left."""
+    sql = """
+        SELECT id, file_name, blob_id
+        FROM photos
+        WHERE media_type = 'video'
+        AND (has_thumbnail = 0 OR has_preview = 0)
+        AND render_attempts < %s
+        AND archived_at IS NULL
+        ORDER BY id
+        LIMIT %s
+    """
+    cursor.execute(sql, (MAX_RENDER_ATTEMPTS, limit))
+    return cursor.fetchall()
+
+
+def process_batch(executor):
+    """Renders one batch of pending videos concurrently. :return: number of videos processed"""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        photos = fetch_pending_videos(cursor)
+        if not photos:
+            return 0
+
+        # Count the attempt up front so a video that crashes the decoder is not retried forever
+        format_strings = ','.join(['%s'] * len(photos))
+        cursor.execute(f"UPDATE photos SET render_attempts = render_attempts + 1 WHERE id IN ({format_strings})",
+                       tuple(p['id'] for p in photos))
+        conn.commit()
+
+        # Photos sharing a blob share its renditions: render each object once, flag every row of the blob
+        unique = list({p['file_name']: p for p in photos}.values())
+        rendered = []
+        for photo, result in zip(unique, executor.map(_render_safely, unique)):
+            if not result:
+                continue
+            rendered.append(photo)
+            cursor.execute("""
+                UPDATE photos
+                SET has_thumbnail = GREATEST(has_thumbnail, %s), has_preview = GREATEST(has_preview, %s),
+                    width = COALESCE(%s, width), height = COALESCE(%s, height), duration_ms = COALESCE(%s, duration_ms)
+                WHERE id = %s OR blob_id = %s
+            """, (result['has_thumbnail'], result['has_preview'], result['width'], result['height'],
+                  result['duration_ms'], photo['id'], photo['blob_id']))
+        if rendered:
+            # Posters and previews are part of what the groups show
+            format_strings = ','.join(['%s'] * len(rendered))
+            cursor.execute(f"""
+                SELECT DISTINCT group_id FROM photos
+                WHERE id IN ({format_strings}) OR blob_id IN ({format_strings})
+            """, tuple(p['id'] for p in rendered) + tuple(p['blob_id'] or 0 for p in rendered))
+            bump_group_version(cursor, [row['group_id'] for row in cursor.fetchall()])
+        conn.commit()
+        return len(photos)
+    finally:
+        cursor.close(); conn.close()
+
+
+# ==========================================
+# DUPLICATE DETECTION
+# ==========================================
+# Highest photo id already scanned by this process; the first scan starts from 0.
+# Once a scan finds nothing past it, it goes back to 0 so images whose download or decode
+# failed are retried (up to MAX_HASH_ATTEMPTS) on the next pass.
+_hash_cursor = 0
+
+def hash_batch(executor):
+    """
+    Hashes one batch of new images and flags duplicates of earlier photos in the same group.
+    Rows are compared in id order, so duplicates inside one batch are found as well.
+    Blobs whose SHA-256 matches an older blob are merged into it and their objects deleted.
+    An image that fails is left unrecorded until its last attempt, then recorded without hashes.
+    :return: number of images processed
+    """
+    global _hash_cursor
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT p.id, p.group_id, p.file_name, p.blob_id, p.hash_attempts
+            FROM photos p
+            LEFT JOIN media_hashes mh ON mh.photo_id = p.id
+            WHERE p.id > %s AND p.media_type = 'image' AND mh.photo_id IS NULL AND p.archived_at IS NULL
+            AND p.hash_attempts < %s
+            ORDER BY p.id
+            LIMIT %s
+        """, (_hash_cursor, MAX_HASH_ATTEMPTS, MEDIA_WORKER_BATCH))
+        photos = cursor.fetchall()
+        if not photos:
+            _hash_cursor = 0
+            return 0
+
+        # Count the attempt up front so an image that crashes the decoder is not retried forever
+        format_strings = ','.join(['%s'] * len(photos))
+        cursor.execute(f"UPDATE photos SET hash_attempts = hash_attempts + 1 WHERE id IN ({format_strings})",
+                       tuple(p['id'] for p in photos))
+        conn.commit()
+
+        flagged = 0
+        flagged_groups = set()
+        dropped_keys = []
+        for photo, hashes in zip(photos, executor.map(_hash_safely, photos)):
+            if hashes is None and photo['hash_attempts'] + 1 < MAX_HASH_ATTEMPTS:
+                continue  # Retried on the next pass
+            duplicate_of = find_duplicate(cursor, photo['id'], photo['group_id'], hashes) if hashes else None
+            record_hashes(cursor, photo['id'], photo['group_id'], hashes, duplicate_of)
+            if duplicate_of:
+                flagged += 1
+                flagged_groups.add(photo['group_id'])
+            if hashes and photo['blob_id']:
+                dropped = merge_blob(cursor, photo['blob_id'], hashes['sha256'])
+                if dropped:
+                    dropped_keys.append(dropped)
+        # Flagged duplicates disappear from views that hide them
+        bump_group_version(cursor, flagged_groups)
+        conn.commit()
+        _hash_cursor = photos[-1]['id']
+        if dropped_keys:
+            delete_media_from_s3(dropped_keys)
+            print(f"Media Worker: merged {len(dropped_keys)} identical blob(s)")
+        if flagged:
+            print(f"Media Worker: flagged {flagged} duplicate(s)")
+        return len(photos)
+    finally:
+        cursor.close(); conn.close()
+
+
+def _hash_safely(photo):
+    try:
+        data = download_bytes_from_s3(photo['file_name'])
+        return image_hashes(data) if data else None
+    except Exception as e:
+        print(f"❌ Media Worker Hash Error ({photo['file_name']}): {e}")
+        return None
+
+
+def _render_safely(photo):
+    try:
+        return render_video(photo)
+    except Exception as e:
+        print(f"❌ Media Worker Error ({photo['file_name']}): {e}")
+        return None
+
+
+def run_worker():
+    with ThreadPoolExecutor(max_workers=MEDIA_WORKER_THREADS) as executor:
+        while True:
+            try:
+                rendered = process_batch(executor)
+                hashed = hash_batch(executor)
+                if rendered or hashed:
+                    continue
+            except Exception as e:
+                print(f"❌ Media Worker Error: {e}")
+            time.sleep(MEDIA_WORKER_POLL)
+
+
+if __name__ == '__main__':
+    print(f"Media worker started ({MEDIA_WORKER_THREADS} threads)")
+    run_worker()
@@ -0,0 +1,239 @@
+# membership.py
+import os
+import time
+import random
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from db import get_db_connection
+
+load_dotenv()
+
+# Per-worker cache of (user, group) -> membership and role for authorization checks.
+# Writers call invalidate_membership in the transaction that changes groups_members; it evicts the local
+# entries and appends a row to membership_changes. Every worker replays the changelog rows it has not
+# applied yet (by id) at most once per MEMBERSHIP_SYNC_INTERVAL, so other workers see a change within
+# that interval. Entries are indexed by group and by user, so an eviction touches only its own keys.
+# Misses and the replay always read the primary (on a pooled connection of their own), even when the
+# caller holds a replica cursor: a lagging replica would show a removed member, or a changelog row too
+# late for the scan. Workers run many threads, so shared state is only touched under the locks, and a
+# lookup that overlapped an eviction of its own key does not cache what it read.
+
+# --- MEMBERSHIP CACHE CONFIGURATION ---
+MEMBERSHIP_CACHE_SIZE = int(os.getenv('MEMBERSHIP_CACHE_SIZE', '20000'))
+MEMBERSHIP_CACHE_TTL = float(os.getenv('MEMBERSHIP_CACHE_TTL', '60'))
+MEMBERSHIP_SYNC_INTERVAL = float(os.getenv('MEMBERSHIP_SYNC_INTERVAL', '1'))
+
+# Auto-increment ids commit out of order: an id missing below an applied one is re-read for this long,
+# so a row committed late by a long transaction is not missed (rolled back ids are given up on)
+SYNC_OVERLAP_SECONDS = 10
+# Changelog rows older than this are no longer needed by any worker
+CHANGES_RETENTION_HOURS = 1
+
+# (user_id, group_id) -> ((is_admin, notifications) or None for "not a member", cached_at)
+_cache = OrderedDict()
+_by_group = {}               # group_id -> set of cached keys (under _lock)
+_by_user = {}                # user_id -> set of cached keys (under _lock)
+_lock = threading.Lock()
+_lookups = {}                # token -> key of a miss being read from the primary (under _lock)
+_stale_lookups = set()       # tokens whose key was evicted while they read (under _lock)
+_sync_lock = threading.Lock()
+_scan_from = None            # every changelog id <= this has been applied (under _sync_lock)
+_applied = set()             # ids > _scan_from already applied (under _sync_lock)
+_gaps = {}                   # missing id -> time.monotonic() first noticed (under _sync_lock)
+_last_sync_check = 0.0       # time.monotonic() of the last scan (under _sync_lock)
+
+
+def _key(user_id, group_id):
+    return (str(user_id), str(group_id))
+
+
+# ==========================================
+# LOOKUPS
+# ==========================================
+def get_membership(cursor, user_id, group_id):
+    """
+    Returns {'is_admin': bool, 'notifications': 0/1} if the user is a member of the group, otherwise None.
+    Served from memory in the common case; a miss costs one indexed lookup on the primary.
+    cursor is the caller's (possibly replica) cursor; authorization never reads through it.
+    """
+    if not user_id or not group_id:
+        return None
+    _sync()
+
+    key = _key(user_id, group_id)
+    now = time.monotonic()
+    token = object()
+    with _lock:
+        entry = _cache.get(key)
+        if entry and now - entry[1] < MEMBERSHIP_CACHE_TTL:
+            _cache.move_to_end(key)
+            return _membership(entry[0])
+        _lookups[token] = key
+
+    try:
+        row = _query_primary("SELECT is_admin, notifications FROM groups_members WHERE user_id = %s AND group_id = %s",
+                             (user_id, group_id))
+    except Exception:
+        with _lock:
+            _lookups.pop(token, None)
+            _stale_lookups.discard(token)
+        raise
+    value = (bool(row[0][0]), row[0][1]) if row else None
+
+    with _lock:
+        del _lookups[token]
+        # An eviction of this key while the row was read may have been for exactly this change: do not cache it
+        if token in _stale_lookups:
+            _stale_lookups.discard(token)
+        else:
+            _store(key, (value, now))
+    return _membership(value)
+
+
+def _store(key, entry):
+    """Adds or refreshes an entry and its index links, dropping the least recently used beyond the size (under _lock)."""
+    _cache[key] = entry
+    _cache.move_to_end(key)
+    _by_user.setdefault(key[0], set()).add(key)
+    _by_group.setdefault(key[1], set()).add(key)
+    while len(_cache) > MEMBERSHIP_CACHE_SIZE:
+        _drop(next(iter(_cache)))
+
+
+def _drop(key):
+    """Removes one entry and its index links (under _lock)."""
+    if _cache.pop(key, None) is None:
+        return
+    for index, value in ((_by_user, key[0]), (_by_group, key[1])):
+        keys = index.get(value)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del index[value]
+
+
+def _query_primary(sql, params=()):
+    """Rows (tuples) of one query on a pooled primary connection."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+    finally:
+        conn.close()
+
+
+def _membership(value):
+    return None if value is None else {"is_admin": value[0], "notifications": value[1]}
+
+
+def is_member(cursor, user_id, group_id):
+    return get_membership(cursor, user_id, group_id) is not None
+
+
+def is_group_admin(cursor, user_id, group_id):
+    membership = get_membership(cursor, user_id, group_id)
+    return bool(membership and membership['is_admin'])
+
+
+# ==========================================
+# INVALIDATION
+# ==========================================
+def _evict(group_id=None, user_id=None):
+    """Drops the cached entries of one membership, a whole group or a whole user (index lookups, no scan)."""
+    with _lock:
+        if group_id is not None and user_id is not None:
+            def matches(key): return key == _key(user_id, group_id)
+            keys = [_key(user_id, group_id)]
+        elif group_id is not None:
+            def matches(key): return key[1] == str(group_id)
+            keys = list(_by_group.get(str(group_id), ()))
+        else:
+            def matches(key): return key[0] == str(user_id)
+            keys = list(_by_user.get(str(user_id), ()))
+        for key in keys:
+            _drop(key)
+        _stale_lookups.update(token for token, key in _lookups.items() if matches(key))
+
+
+def invalidate_membership(cursor, group_id=None, user_id=None):
+    """
+    Records a membership change in the caller's transaction and evicts the local entries.
+    group_id only: every member of the group (role changes, group deletion).
+    user_id only: every group of the user (account deletion, bans).
+    """
+    if group_id is None and user_id is None:
+        return
+    cursor.execute("INSERT INTO membership_changes (group_id, user_id) VALUES (%s, %s)", (group_id, user_id))
+    _evict(group_id, user_id)
+    # Occasional cleanup keeps the changelog at a few rows per active minute
+    if random.random() < 0.01:
+        cursor.execute("DELETE FROM membership_changes WHERE changed_at < NOW(6) - INTERVAL %s HOUR", (CHANGES_RETENTION_HOURS,))
+
+
+def invalidate_memberships(cursor, group_ids=(), user_ids=()):
+    """Bulk variant of invalidate_membership for whole groups and/or whole users."""
+    rows = [(g, None) for g in group_ids] + [(None, u) for u in user_ids]
+    if not rows:
+        return
+    cursor.executemany("INSERT INTO membership_changes (group_id, user_id) VALUES (%s, %s)", rows)
+    for group_id, user_id in rows:
+        _evict(group_id, user_id)
+
+
+def _sync():
+    """
+    Replays changes written by other workers that this worker has not applied yet (at most once per
+    interval, by one thread; the others keep serving from the cache meanwhile).
+    """
+    global _scan_from, _last_sync_check
+    if time.monotonic() - _last_sync_check < MEMBERSHIP_SYNC_INTERVAL:
+        return
+    if not _sync_lock.acquire(blocking=False):
+        return
+    try:
+        now = time.monotonic()
+        if now - _last_sync_check < MEMBERSHIP_SYNC_INTERVAL:
+            return
+        _last_sync_check = now
+
+        if _scan_from is None:
+            # First scan of this worker: nothing is cached yet, so older changes do not matter
+            rows = _query_primary("SELECT COALESCE(MAX(id), 0) FROM membership_changes")
+            _scan_from = rows[0][0]
+            with _lock:
+                _cache.clear()
+                _by_group.clear()
+                _by_user.clear()
+                _stale_lookups.update(_lookups)
+            return
+
+        rows = _query_primary("SELECT id, group_id, user_id FROM membership_changes WHERE id > %s ORDER BY id",
+                              (_scan_from,))
+        _advance(rows, now)
+    finally:
+        _sync_lock.release()
+
+
+def _advance(rows, now):
+    """
+    Applies changelog rows not applied before and moves the scan position (under _sync_lock).
+    An id missing below an applied one stays in the scan until it shows up or SYNC_OVERLAP_SECONDS pass.
+    """
+    global _scan_from, _applied, _gaps
+    expected = _scan_from + 1
+    for change_id, group_id, user_id in rows:
+        for missing in range(expected, change_id):
+            _gaps.setdefault(missing, now)
+        expected = max(expected, change_id + 1)
+        _gaps.pop(change_id, None)
+        if change_id not in _applied:
+            _applied.add(change_id)
+            _evict(group_id, user_id)
+
+    _gaps = {gap: seen for gap, seen in _gaps.items() if now - seen < SYNC_OVERLAP_SECONDS}
+    _scan_from = min(_gaps) - 1 if _gaps else expected - 1
+    _applied = {change_id for change_id in _applied if change_id > _scan_from}
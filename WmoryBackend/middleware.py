@@ -1,7 +1,7 @@
 from functools import wraps
 from flask import request, jsonify, g
-from firebase_admin import auth
 from db import get_db_connection
+from extensions import get_firebase_auth
 
 def login_required(f):
     """
@@ -23,7 +23,7 @@ def login_required(f):
                 token = token_header
                 
             # 3. Verify Token with Firebase Admin SDK
-            decoded_token = auth.verify_id_token(token)
+            decoded_token = get_firebase_auth().verify_id_token(token)
             
             # 4. Attach data to global request context (g)
             g.firebase_uid = decoded_token['uid']
@@ -0,0 +1,18 @@
+--Run once on existing databases (new databases get this from schema.sql)
+--Per-photo summary of the moderation queue (report_queue.py), paged by /admin/get-reports
+
+CREATE TABLE IF NOT EXISTS report_queue (
+    photo_id INT PRIMARY KEY,
+    report_count INT NOT NULL,
+    last_report_id INT NOT NULL,
+    last_reported_at TIMESTAMP NOT NULL,
+    INDEX idx_report_queue_recent (last_reported_at, photo_id),
+    FOREIGN KEY (photo_id) REFERENCES photos(id) ON DELETE CASCADE
+);
+
+INSERT INTO report_queue (photo_id, report_count, last_report_id, last_reported_at)
+SELECT photo_id, COUNT(*), MAX(id), MAX(created_at)
+FROM content_reports
+GROUP BY photo_id
+ON DUPLICATE KEY UPDATE report_count = VALUES(report_count), last_report_id = VALUES(last_report_id),
+                        last_reported_at = VALUES(last_reported_at);
@@ -0,0 +1,14 @@
+--Run once on existing databases (new databases get this from schema.sql)
+--Authoritative size/content type/ETag of uploaded objects (filled by confirm-upload HEADs and the S3 event consumer)
+
+CREATE TABLE IF NOT EXISTS media_metadata (
+    object_key VARCHAR(255) PRIMARY KEY,
+    size_bytes BIGINT NOT NULL,
+    content_type VARCHAR(100),
+    etag VARCHAR(64),
+    verified_at DATETIME NOT NULL
+);
+
+--Lets the orphan purge and key lookups join photos by object key
+ALTER TABLE photos
+    ADD INDEX idx_photos_file_name (file_name);
@@ -0,0 +1,25 @@
+--Run once on existing databases (new databases get this from schema.sql)
+--Media type and metadata stored per photo, so listings filter by type in SQL instead of parsing extensions
+
+ALTER TABLE photos
+    ADD COLUMN media_type ENUM('image', 'video') NOT NULL DEFAULT 'image',
+    ADD COLUMN mime_type VARCHAR(100),
+    ADD COLUMN size_bytes BIGINT,
+    ADD COLUMN width INT,
+    ADD COLUMN height INT,
+    ADD COLUMN duration_ms INT,
+    ADD COLUMN has_thumbnail TINYINT(1) NOT NULL DEFAULT 0,
+    ADD COLUMN has_preview TINYINT(1) NOT NULL DEFAULT 0,
+    ADD INDEX idx_photos_group_type_date (group_id, media_type, upload_date);
+
+--Backfill: type from the extension (same list the API used), size/mime from verified uploads
+UPDATE photos
+SET media_type = 'video'
+WHERE LOWER(SUBSTRING_INDEX(file_name, '.', -1)) IN ('mp4', 'mov', 'avi', 'm4v');
+
+UPDATE photos p
+JOIN media_metadata mm ON mm.object_key = p.file_name
+SET p.size_bytes = mm.size_bytes, p.mime_type = mm.content_type;
+
+--Existing uploads already went through the thumbnail Lambda
+UPDATE photos SET has_thumbnail = 1;
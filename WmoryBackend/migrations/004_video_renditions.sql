@@ -0,0 +1,8 @@
+--Run once on existing databases (new databases get this from schema.sql)
+--Video posters/previews are rendered by media_worker.py; the Lambda never produced thumbnails for videos
+
+ALTER TABLE photos
+    ADD COLUMN render_attempts TINYINT NOT NULL DEFAULT 0,
+    ADD INDEX idx_photos_render_queue (media_type, has_preview, render_attempts);
+
+UPDATE photos SET has_thumbnail = 0 WHERE media_type = 'video' AND has_preview = 0;
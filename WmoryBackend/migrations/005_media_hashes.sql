@@ -0,0 +1,19 @@
+--Run once on existing databases (new databases get this from schema.sql)
+--Exact/perceptual hashes per image for duplicate detection (filled by media_worker.py)
+
+CREATE TABLE IF NOT EXISTS media_hashes (
+    photo_id INT PRIMARY KEY,
+    group_id INT NOT NULL,
+    sha256 CHAR(64),
+    phash BIGINT UNSIGNED,
+    dhash BIGINT UNSIGNED,
+    duplicate_of INT,
+    hashed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (photo_id) REFERENCES photos(id) ON DELETE CASCADE,
+    FOREIGN KEY (duplicate_of) REFERENCES photos(id) ON DELETE SET NULL,
+    INDEX idx_media_hashes_group (group_id, photo_id, duplicate_of, sha256, phash, dhash)
+);
+
+--Confirm-time exact duplicate lookup (same ETag and size)
+ALTER TABLE media_metadata
+    ADD INDEX idx_media_metadata_etag (etag, size_bytes);
@@ -0,0 +1,29 @@
+--Run once on existing databases (new databases get this from schema.sql)
+--Content-addressed media: identical uploads share one reference-counted blob (see blobs.py)
+
+CREATE TABLE IF NOT EXISTS media_blobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    object_key VARCHAR(255) NOT NULL UNIQUE,
+    sha256 CHAR(64) UNIQUE,
+    etag VARCHAR(64),
+    size_bytes BIGINT,
+    ref_count INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_media_blobs_etag (etag, size_bytes)
+);
+
+ALTER TABLE photos
+    ADD COLUMN blob_id INT AFTER file_name,
+    ADD FOREIGN KEY (blob_id) REFERENCES media_blobs(id) ON DELETE SET NULL;
+
+--Backfill: one blob per existing object, referenced by every photo row that points at it
+INSERT IGNORE INTO media_blobs (object_key, etag, size_bytes, ref_count)
+SELECT p.file_name, MAX(mm.etag), MAX(COALESCE(mm.size_bytes, p.size_bytes)), COUNT(*)
+FROM photos p
+LEFT JOIN media_metadata mm ON mm.object_key = p.file_name
+GROUP BY p.file_name;
+
+UPDATE photos p
+JOIN media_blobs b ON b.object_key = p.file_name
+SET p.blob_id = b.id
+WHERE p.blob_id IS NULL;
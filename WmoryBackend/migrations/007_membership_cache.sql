@@ -0,0 +1,13 @@
+--Run once on existing databases (new databases get this from schema.sql)
+--Membership lookups (membership.py) and the changelog that keeps every worker's cache in sync
+
+ALTER TABLE groups_members
+    ADD INDEX idx_members_user_group (user_id, group_id, is_admin);
+
+CREATE TABLE IF NOT EXISTS membership_changes (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    group_id INT,
+    user_id INT,
+    changed_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    INDEX idx_membership_changes_time (changed_at)
+);
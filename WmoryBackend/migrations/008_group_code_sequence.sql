@@ -0,0 +1,10 @@
+--Run once on existing databases (new databases get this from schema.sql)
+--Sequence behind the collision-free invite codes (group_codes.py). Existing random codes stay valid;
+--a new code that happens to equal one of them is skipped by create_group.
+
+CREATE TABLE IF NOT EXISTS group_code_sequence (
+    next_value BIGINT NOT NULL
+);
+
+INSERT INTO group_code_sequence (next_value)
+SELECT 0 FROM DUAL WHERE NOT EXISTS (SELECT 1 FROM group_code_sequence);
@@ -0,0 +1,5 @@
+--Run once on existing databases (new databases get this from schema.sql)
+--Per-group content version polled by clients via /group-versions (group_versions.py)
+
+ALTER TABLE groups_table
+    ADD COLUMN content_version BIGINT NOT NULL DEFAULT 0;
@@ -0,0 +1,11 @@
+--Run once on existing databases (new databases get this from schema.sql)
+--Live group events for /group-events (events.py)
+
+CREATE TABLE IF NOT EXISTS group_events (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    group_id INT NOT NULL,
+    event_type VARCHAR(32) NOT NULL,
+    payload VARCHAR(2048) NOT NULL,
+    created_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    INDEX idx_group_events_time (created_at)
+);
@@ -0,0 +1,5 @@
+--Run once on existing databases (new databases get this from schema.sql)
+--Per-user block version used in response cache keys (cache.py)
+
+ALTER TABLE users
+    ADD COLUMN block_version BIGINT NOT NULL DEFAULT 0;
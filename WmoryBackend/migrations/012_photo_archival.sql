@@ -0,0 +1,15 @@
+--Run once on existing databases (new databases get this from schema.sql)
+--Archival tier for old originals (archival.py, archive_worker.py) and a group/date index for listings.
+--photos is not partitioned: MySQL does not allow foreign keys on partitioned InnoDB tables, and photos
+--both has them (user/group cascades) and is referenced by them (hidden_photos, media_hashes, content_reports).
+--Listings read a group's newest rows through idx_photos_group_date instead, so their cost does not grow
+--with the group's history, and old originals move to a colder storage class.
+
+ALTER TABLE photos
+    ADD COLUMN storage_class VARCHAR(32) NOT NULL DEFAULT 'STANDARD',
+    ADD COLUMN archived_at DATETIME DEFAULT NULL,
+    ADD COLUMN restore_requested_at DATETIME DEFAULT NULL,
+    ADD COLUMN restored_until DATETIME DEFAULT NULL,
+    ADD INDEX idx_photos_group_date (group_id, upload_date, id),
+    ADD INDEX idx_photos_archive (archived_at, upload_date),
+    ADD INDEX idx_photos_restore (restore_requested_at);
@@ -0,0 +1,15 @@
+--Run once on existing databases (new databases get this from schema.sql)
+--Hidden items as one compact id set per (user, group) instead of one hidden_photos row per item (hidden_sets.py).
+--After this migration, fold the existing rows in with: python hidden_sets.py
+--then run 014_drop_hidden_photos.sql.
+
+CREATE TABLE hidden_sets (
+    user_id INT NOT NULL,
+    group_id INT NOT NULL,
+    bitmap MEDIUMBLOB NOT NULL,
+    item_count INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, group_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (group_id) REFERENCES groups_table(id) ON DELETE CASCADE
+);
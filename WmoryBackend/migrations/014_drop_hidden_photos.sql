@@ -0,0 +1,3 @@
+--Run once, after 013_hidden_sets.sql and `python hidden_sets.py` (which compacts hidden_photos into hidden_sets)
+
+DROP TABLE hidden_photos;
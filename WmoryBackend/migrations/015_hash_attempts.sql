@@ -0,0 +1,8 @@
+--Run once on existing databases (new databases get this from schema.sql)
+--Images whose hashing failed are retried by media_worker.py up to MAX_HASH_ATTEMPTS times
+
+ALTER TABLE photos
+    ADD COLUMN hash_attempts TINYINT NOT NULL DEFAULT 0;
+
+--Rows recorded without hashes after a single failed attempt get their retries
+DELETE FROM media_hashes WHERE sha256 IS NULL;
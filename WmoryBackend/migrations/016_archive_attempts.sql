@@ -0,0 +1,5 @@
+--Run once on existing databases (new databases get this from schema.sql)
+--Failed archive attempts per original (archive_worker.py); after MAX_ARCHIVE_ATTEMPTS it is no longer a candidate
+
+ALTER TABLE photos
+    ADD COLUMN archive_attempts TINYINT NOT NULL DEFAULT 0;
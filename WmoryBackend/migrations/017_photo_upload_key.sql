@@ -0,0 +1,8 @@
+--Run once on existing databases (new databases get this from schema.sql)
+--Key the client confirmed, so a retried /confirm-upload(s) is recognised after file_name moved to a reused blob's key
+
+ALTER TABLE photos
+    ADD COLUMN upload_key VARCHAR(255) DEFAULT NULL AFTER file_name,
+    ADD INDEX idx_photos_group_upload_key (group_id, upload_key);
+
+UPDATE photos SET upload_key = file_name WHERE upload_key IS NULL;
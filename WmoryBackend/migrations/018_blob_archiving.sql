@@ -0,0 +1,5 @@
+--Run once on existing databases (new databases get this from schema.sql)
+--Blobs being copied to the archive tier are marked instead of locked for the whole copy (archive_worker.py)
+
+ALTER TABLE media_blobs
+    ADD COLUMN archiving_since DATETIME DEFAULT NULL AFTER ref_count;
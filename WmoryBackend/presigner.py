@@ -0,0 +1,142 @@
+# presigner.py
+import hmac
+import time
+import hashlib
+import datetime
+import threading
+from urllib.parse import quote, urlsplit
+
+# Local AWS Signature Version 4 query-string signer for S3 GET/PUT URLs.
+# Produces the same URLs as boto3's generate_presigned_url without building a request
+# object, resolving endpoints or running event hooks for every key.
+
+ALGORITHM = 'AWS4-HMAC-SHA256'
+SERVICE = 's3'
+
+# How long frozen credentials are reused before asking the provider again.
+# Refreshable credentials (instance roles) refresh well ahead of their expiry.
+CREDENTIALS_TTL = 60
+
+
+def _sign(key, msg):
+    return hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
+
+
+def _is_dns_compatible(bucket):
+    # Same rule boto3 uses before choosing virtual-hosted addressing
+    return (3 <= len(bucket) <= 63 and '.' not in bucket and '_' not in bucket
+            and bucket == bucket.lower() and bucket[0].isalnum() and bucket[-1].isalnum())
+
+
+class SigV4Presigner:
+    """
+    Signs S3 object URLs locally.
+    :param bucket: bucket name
+    :param region: signing region (e.g. 'eu-north-1')
+    :param credentials_provider: callable returning an object with access_key, secret_key and token
+    :param endpoint_url: optional custom endpoint (local S3 stand-in); path-style addressing is used
+    """
+
+    def __init__(self, bucket, region, credentials_provider, endpoint_url=None):
+        self.bucket = bucket
+        self.region = region
+        self._credentials_provider = credentials_provider
+        self._credentials = None
+        self._credentials_at = 0
+        self._signing_keys = {}
+        self._lock = threading.Lock()
+
+        if endpoint_url:
+            parts = urlsplit(endpoint_url)
+            self._scheme = parts.scheme
+            self.host = parts.netloc
+            self._path_prefix = f"/{bucket}"
+        else:
+            # Matches boto3's default (virtual-hosted, global s3.amazonaws.com endpoint)
+            self._scheme = 'https'
+            self.host = f"{bucket}.s3.amazonaws.com"
+            self._path_prefix = ''
+
+    @staticmethod
+    def is_supported(bucket, region, endpoint_url=None):
+        """
+        True when local URLs match boto3 byte for byte.
+        (boto3 signs us-east-1 with SigV2 and switches to path-style for bucket names that are not DNS compatible.)
+        """
+        if not bucket or not region:
+            return False
+        return bool(endpoint_url) or (region != 'us-east-1' and _is_dns_compatible(bucket))
+
+    def _get_credentials(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._credentials is None or now - self._credentials_at > CREDENTIALS_TTL:
+                self._credentials = self._credentials_provider()
+                self._credentials_at = now
+            return self._credentials
+
+    def _signing_key(self, secret_key, datestamp):
+        # The derived key only changes per day/region/service (and secret)
+        cache_key = (secret_key, datestamp, self.region, SERVICE)
+        key = self._signing_keys.get(cache_key)
+        if key is None:
+            k_date = _sign(('AWS4' + secret_key).encode('utf-8'), datestamp)
+            k_region = _sign(k_date, self.region)
+            k_service = _sign(k_region, SERVICE)
+            key = _sign(k_service, 'aws4_request')
+            with self._lock:
+                if len(self._signing_keys) > 8:
+                    self._signing_keys.clear()
+                self._signing_keys[cache_key] = key
+        return key
+
+    def presign(self, object_name, expiration=900, method='GET', content_type=None, now=None):
+        """Returns a presigned URL for one object."""
+        return self.presign_many([object_name], expiration, method, content_type, now)[0]
+
+    def presign_many(self, object_names, expiration=900, method='GET', content_type=None, now=None):
+        """
+        Returns presigned URLs for many objects, in order.
+        Credentials, timestamp, scope and signing key are computed once for the whole batch.
+        :param now: optional datetime (UTC) to sign with, defaults to the current time
+        """
+        creds = self._get_credentials()
+        now = now or datetime.datetime.utcnow()
+        amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+        datestamp = now.strftime('%Y%m%d')
+        scope = f"{datestamp}/{self.region}/{SERVICE}/aws4_request"
+        signing_key = self._signing_key(creds.secret_key, datestamp)
+
+        if content_type:
+            signed_headers = 'content-type;host'
+            canonical_headers = f"content-type:{content_type.strip()}\nhost:{self.host}\n"
+        else:
+            signed_headers = 'host'
+            canonical_headers = f"host:{self.host}\n"
+
+        # URL order follows boto3; the canonical query string is sorted by name
+        params = [
+            ('X-Amz-Algorithm', ALGORITHM),
+            ('X-Amz-Credential', f"{creds.access_key}/{scope}"),
+            ('X-Amz-Date', amz_date),
+            ('X-Amz-Expires', str(int(expiration))),
+            ('X-Amz-SignedHeaders', signed_headers),
+        ]
+        if creds.token:
+            params.append(('X-Amz-Security-Token', creds.token))
+        encoded = [(name, quote(value, safe='-_.~')) for name, value in params]
+        url_query = '&'.join(f"{name}={value}" for name, value in encoded)
+        canonical_query = '&'.join(f"{name}={value}" for name, value in sorted(encoded))
+
+        request_suffix = f"\n{canonical_query}\n{canonical_headers}\n{signed_headers}\nUNSIGNED-PAYLOAD"
+        sts_prefix = f"{ALGORITHM}\n{amz_date}\n{scope}\n"
+        base_url = f"{self._scheme}://{self.host}"
+
+        urls = []
+        for object_name in object_names:
+            path = f"{self._path_prefix}/{quote(object_name, safe='/~')}"
+            canonical_request = f"{method}\n{path}{request_suffix}"
+            string_to_sign = sts_prefix + hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
+            signature = hmac.new(signing_key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+            urls.append(f"{base_url}{path}?{url_query}&X-Amz-Signature={signature}")
+        return urls
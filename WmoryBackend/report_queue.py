@@ -0,0 +1,41 @@
+# report_queue.py
+
+# Moderation queue summary: one report_queue row per reported photo (report count, newest report).
+# /admin/get-reports pages through it on idx_report_queue_recent, so a page reads limit + 1 index
+# entries however many reports are pending. Every write to content_reports refreshes the rows of the
+# photos it touched in the same transaction; rows of deleted photos go away by ON DELETE CASCADE.
+# Reports also cascade away with their reporter's account: callers deleting users refresh the photos
+# those users reported (reported_photo_ids before the delete, refresh_report_queue after it).
+
+
+def refresh_report_queue(cursor, photo_ids):
+    """Recomputes the queue rows of the given photos from their remaining reports (caller commits)."""
+    photo_ids = list({int(p) for p in photo_ids})
+    if not photo_ids:
+        return
+    format_strings = ','.join(['%s'] * len(photo_ids))
+    cursor.execute(f"""
+        INSERT INTO report_queue (photo_id, report_count, last_report_id, last_reported_at)
+        SELECT photo_id, COUNT(*), MAX(id), MAX(created_at)
+        FROM content_reports
+        WHERE photo_id IN ({format_strings})
+        GROUP BY photo_id
+        ON DUPLICATE KEY UPDATE report_count = VALUES(report_count), last_report_id = VALUES(last_report_id),
+                                last_reported_at = VALUES(last_reported_at)
+    """, tuple(photo_ids))
+    cursor.execute(f"""
+        DELETE FROM report_queue
+        WHERE photo_id IN ({format_strings})
+        AND NOT EXISTS (SELECT 1 FROM content_reports r WHERE r.photo_id = report_queue.photo_id)
+    """, tuple(photo_ids))
+
+
+def reported_photo_ids(cursor, reporter_ids):
+    """Photos the given users reported (their reports cascade away with the accounts)."""
+    reporter_ids = list(reporter_ids)
+    if not reporter_ids:
+        return []
+    format_strings = ','.join(['%s'] * len(reporter_ids))
+    cursor.execute(f"SELECT DISTINCT photo_id FROM content_reports WHERE reporter_id IN ({format_strings})",
+                   tuple(reporter_ids))
+    return [row['photo_id'] if isinstance(row, dict) else row[0] for row in cursor.fetchall()]
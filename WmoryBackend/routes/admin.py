@@ -5,11 +5,15 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from flask import Blueprint, request, jsonify, current_app, url_for
-from db import get_db_connection
+from db import get_db_connection, get_read_connection, mark_user_write
 from dotenv import load_dotenv
-from s3_helpers import upload_file_to_s3, get_presigned_url, delete_file_from_s3
+from s3_helpers import upload_file_to_s3, get_presigned_urls, delete_file_from_s3, delete_files_from_s3, delete_media_from_s3, get_thumbnail_key
 from extensions import limiter
-from utils import log_action
+from utils import log_action, log_actions, handle_admin_succession
+from blobs import release_photos
+from group_versions import bump_group_version
+from events import publish_photos_removed
+from report_queue import refresh_report_queue, reported_photo_ids
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -164,6 +168,7 @@ def report_content():
             VALUES (%s, %s, %s, %s)
         """
         cursor.execute(sql, (reporter_id, photo_id, uploader_id, reason))
+        refresh_report_queue(cursor, [photo_id])
         conn.commit()
         
         cursor.close(); conn.close()
@@ -173,15 +178,48 @@ def report_content():
         return jsonify({"error": str(e)}), 500
 
 # ==========================================
-# GET REPORTS
+# GET REPORTS (PAGINATED QUEUE)
 # ==========================================
+REPORT_PAGE_SIZE = 20
+MAX_REPORT_PAGE_SIZE = 100
+
+REPORT_CURSOR_FORMAT = '%Y%m%d%H%M%S'
+
+def encode_report_cursor(row):
+    """Keyset cursor of a queue entry: its newest report time and photo id."""
+    return f"{row['last_reported_at'].strftime(REPORT_CURSOR_FORMAT)}-{row['photo_id']}"
+
+def decode_report_cursor(value):
+    """:return: (last_reported_at, photo_id), or None if the cursor is malformed"""
+    try:
+        date_part, id_part = value.split('-', 1)
+        return datetime.datetime.strptime(date_part, REPORT_CURSOR_FORMAT), int(id_part)
+    except (AttributeError, ValueError):
+        return None
+
 @admin_bp.route('/admin/get-reports', methods=['GET'])
 @limiter.limit("20 per minute")  # 20 request per minute
 def get_reports():
+    """
+    Returns one page of the moderation queue, one entry per reported photo (most recently reported first).
+    Resolved and dismissed reports are deleted, so every report in the table is pending.
+    Query params: limit, cursor (next_cursor of the previous page).
+    """
     admin_id = request.args.get('admin_id')
+    page_cursor = request.args.get('cursor')
 
     try:
-        conn = get_db_connection()
+        limit = min(max(int(request.args.get('limit', REPORT_PAGE_SIZE)), 1), MAX_REPORT_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "Invalid limit or cursor"}), 400
+    if page_cursor:
+        page_cursor = decode_report_cursor(page_cursor)
+        if page_cursor is None:
+            return jsonify({"error": "Invalid limit or cursor"}), 400
+
+    try:
+        # Report queue is read-only: serve it from the replica
+        conn = get_read_connection(admin_id)
         cursor = conn.cursor(dictionary=True)
 
         # Check Admin
@@ -192,40 +230,74 @@ def get_reports():
             cursor.close(); conn.close()
             return jsonify({"error": "Unauthorized"}), 403
 
-        # Fetch Reports
-        sql = """
+        # 1. One page of the per-photo queue summary (report_queue.py)
+        # Keyset pagination on (newest report time, photo_id): a range read on idx_report_queue_recent that
+        # stops after limit + 1 rows, so a new report on an old photo moves it to the top
+        where = ""
+        params = []
+        if page_cursor:
+            where = "WHERE (last_reported_at, photo_id) < (%s, %s)"
+            params += [page_cursor[0], page_cursor[1]]
+        params.append(limit + 1)
+
+        sql_page = f"""
+            SELECT photo_id, report_count, last_report_id as latest_report_id, last_reported_at
+            FROM report_queue
+            {where}
+            ORDER BY last_reported_at DESC, photo_id DESC
+            LIMIT %s
+        """
+        cursor.execute(sql_page, tuple(params))
+        page = cursor.fetchall()
+
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_report_cursor(page[-1])
+
+        if not page:
+            cursor.close(); conn.close()
+            return jsonify({"reports": [], "next_cursor": None}), 200
+
+        # 2. Join details only for the visible page (newest report of each photo)
+        latest_ids = [row['latest_report_id'] for row in page]
+        format_strings = ','.join(['%s'] * len(latest_ids))
+        sql_details = f"""
             SELECT 
                 r.id as report_id, r.reason, r.status, r.created_at,
                 r.reporter_id, u1.username as reporter_username,
                 r.uploader_id, u2.username as uploader_username,
-                r.photo_id, p.file_name as photo_filename
+                r.photo_id, p.file_name as photo_filename, p.media_type
             FROM content_reports r
             JOIN users u1 ON r.reporter_id = u1.id
             JOIN users u2 ON r.uploader_id = u2.id
             JOIN photos p ON r.photo_id = p.id
-            ORDER BY r.created_at DESC
+            WHERE r.id IN ({format_strings})
         """
-        cursor.execute(sql)
-        reports = cursor.fetchall()
+        cursor.execute(sql_details, tuple(latest_ids))
+        details = {row['report_id']: row for row in cursor.fetchall()}
+
+        # Sign URLs lazily: only the photos on this page, in one batch
+        signed = get_presigned_urls(d['photo_filename'] for d in details.values())
 
-        # Video extensions to check
-        video_extensions = {'mp4', 'mov', 'avi', 'm4v'}
+        reports = []
+        for row in page:
+            report = details.get(row['latest_report_id'])
+            if not report:
+                continue
+
+            report['report_count'] = row['report_count']
+            report['last_reported_at'] = row['last_reported_at']
 
-        for report in reports:
             if report['photo_filename']:
-                report['photo_url'] = get_presigned_url(report['photo_filename'])
-                
-                # Determine Media Type
-                ext = report['photo_filename'].rsplit('.', 1)[1].lower()
-                if ext in video_extensions:
-                    report['media_type'] = 'video'
-                else:
-                    report['media_type'] = 'image'
+                report['photo_url'] = signed.get(report['photo_filename'])
             else:
                 report['photo_url'] = None
 
+            reports.append(report)
+
         cursor.close(); conn.close()
-        return jsonify(reports), 200
+        return jsonify({"reports": reports, "next_cursor": next_cursor}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -330,43 +402,27 @@ def manual_ban():
         cursor.execute("INSERT INTO banned_users (email, username, reason) VALUES (%s, %s, %s)", (email, uname, "Manual Ban by Admin (ID)"))
         
         # --- HANDLE ADMIN SUCCESSION BEFORE BANNING ---
-        # Find groups where the banned user is an admin
-        cursor.execute("SELECT group_id FROM groups_members WHERE user_id = %s AND is_admin = 1", (uid,))
-        admin_groups = cursor.fetchall()
-
-        for group in admin_groups:
-            gid = group['group_id']
-            
-            # Remove the user from this specific group first
-            cursor.execute("DELETE FROM groups_members WHERE user_id = %s AND group_id = %s", (uid, gid))
-            
-            # Check if group still has members
-            cursor.execute("SELECT count(*) as count FROM groups_members WHERE group_id = %s", (gid,))
-            count_res = cursor.fetchone()
-            
-            if count_res['count'] == 0:
-                # If group is empty, delete group
-                cursor.execute("DELETE FROM groups_table WHERE id = %s", (gid,))
-            else:
-                # If group not empty, ensure there is at least one admin
-                cursor.execute("SELECT user_id FROM groups_members WHERE group_id = %s AND is_admin = 1", (gid,))
-                has_admin = cursor.fetchone()
-                
-                if not has_admin:
-                    # Promote the oldest member to admin (Heir logic)
-                    cursor.execute("SELECT user_id FROM groups_members WHERE group_id = %s ORDER BY id ASC LIMIT 1", (gid,))
-                    heir = cursor.fetchone()
-                    if heir:
-                        cursor.execute("UPDATE groups_members SET is_admin = 1 WHERE user_id = %s AND group_id = %s", (heir['user_id'], gid))
-
-        # Finally, delete the user from users table
+        _, keys_to_delete = handle_admin_succession(cursor, uid)
+
+        # The user's photos go with the account (CASCADE): release their blobs first,
+        # and their groups get new listings and photo_removed events
+        cursor.execute("SELECT id, group_id, file_name, blob_id FROM photos WHERE user_id = %s FOR UPDATE", (uid,))
+        user_photos = cursor.fetchall()
+        keys_to_delete += release_photos(cursor, user_photos)
+        bump_group_version(cursor, [p['group_id'] for p in user_photos])
+        publish_photos_removed(cursor, user_photos)
+
+        # Finally, delete the user from users table (their own reports go with it)
+        queued_photo_ids = reported_photo_ids(cursor, [uid])
         cursor.execute("DELETE FROM users WHERE id=%s", (uid,))
+        refresh_report_queue(cursor, queued_photo_ids)
 
         conn.commit()
+        delete_media_from_s3(keys_to_delete)
 
         # --- AUDIT LOG ---
         # Updated Metadata: Removed phone input reference, kept target phone for record
-        log_action(admin_id, 'MANUAL_BAN', uid, metadata=f"Target Email: {email}, Reason: Manual Ban via ID")
+        log_action(admin_id, 'MANUAL_BAN', uid, metadata=f"Target Email: {email}, Reason: Manual Ban via ID", sync=True)
         # ----------------------
 
         cursor.close(); conn.close()
@@ -396,44 +452,44 @@ def resolve_report():
             cursor.close(); conn.close()
             return jsonify({"error": "Unauthorized"}), 403
 
+        # Media released below; removed from S3 once the transaction is committed
+        keys_to_delete = []
+
         if action == 'delete_content':
             # 1. Retrieve photo filename and ID using the report ID
             # We join tables to safely get the photo associated with this specific report
             cursor.execute("""
-                SELECT p.file_name, p.id 
+                SELECT p.file_name, p.id, p.blob_id, p.group_id
                 FROM photos p
                 JOIN content_reports r ON p.id = r.photo_id
                 WHERE r.id = %s
+                FOR UPDATE
             """, (report_id,))
             photo_row = cursor.fetchone()
 
             if photo_row:
-                file_name = photo_row['file_name']
                 p_id = photo_row['id']
 
-                # 2. Delete from S3 (Try-Except block to prevent crash if file is missing)
-                if file_name:
-                    try:
-                        # --- DYNAMIC THUMBNAIL DELETE ---
-                        thumb_to_delete = file_name.replace('media/', 'thumbs/') if file_name.startswith('media/') else f"thumb_{file_name}"
-                        delete_file_from_s3(file_name)
-                        delete_file_from_s3(thumb_to_delete)
-                    except Exception as s3_error:
-                        print(f"S3 Delete Warning: {s3_error}")
-
-                # 3. DELETE FROM DB (CRITICAL: Delete dependent data first)
+                # 2. DELETE FROM DB (CRITICAL: Delete dependent data first)
                 # First, delete the report itself to satisfy Foreign Key constraints
                 cursor.execute("DELETE FROM content_reports WHERE photo_id = %s", (p_id,))
                 
-                # Delete from hidden_photos if exists
-                cursor.execute("DELETE FROM hidden_photos WHERE photo_id = %s", (p_id,))
-                
-                # Finally, delete the photo record
+                # Then the photo record (locked above, so no concurrent delete got to it first)
                 cursor.execute("DELETE FROM photos WHERE id = %s", (p_id,))
+
+                # 3. Release the photo's blob; its S3 objects are deleted after the commit if nothing else shares it
+                if cursor.rowcount:
+                    keys_to_delete += release_photos(cursor, [photo_row])
+                bump_group_version(cursor, photo_row['group_id'])
+                publish_photos_removed(cursor, [photo_row])
                 
         elif action == 'dismiss':
-            # Just delete the report record
-            cursor.execute("DELETE FROM content_reports WHERE id=%s", (report_id,))
+            # Just delete the report record (the photo's queue entry keeps its other reports)
+            cursor.execute("SELECT photo_id FROM content_reports WHERE id = %s", (report_id,))
+            report_row = cursor.fetchone()
+            if report_row:
+                cursor.execute("DELETE FROM content_reports WHERE id = %s", (report_id,))
+                refresh_report_queue(cursor, [report_row['photo_id']])
 
         elif action == 'ban_user':
             # 1. Get Uploader ID from the report
@@ -464,47 +520,17 @@ def resolve_report():
                             delete_file_from_s3(thumb_to_delete)
                         except: pass
 
-                    # 5. S3 Cleanup: Delete All User Photos
-                    cursor.execute("SELECT file_name FROM photos WHERE user_id=%s", (uploader_id,))
+                    # 5. HANDLE ADMIN SUCCESSION BEFORE BANNING (VIA REPORT)
+                    # Groups left empty go with their photos; their keys are deleted after the commit
+                    _, released_keys = handle_admin_succession(cursor, uploader_id)
+                    keys_to_delete += released_keys
+
+                    # 6. S3 Cleanup: Release All Remaining User Photos (deleted from S3 after the commit)
+                    cursor.execute("SELECT id, group_id, file_name, blob_id FROM photos WHERE user_id=%s FOR UPDATE", (uploader_id,))
                     user_photos = cursor.fetchall()
-                    for p in user_photos:
-                        if p['file_name']:
-                            try:
-                                photo_key = p['file_name']
-                                thumb_to_delete = photo_key.replace('media/', 'thumbs/') if photo_key.startswith('media/') else f"thumb_{photo_key}"
-                                delete_file_from_s3(photo_key)
-                                delete_file_from_s3(thumb_to_delete)
-                            except: pass
-
-                    # 6. HANDLE ADMIN SUCCESSION BEFORE BANNING (VIA REPORT)
-                    # Find groups where the uploader is an admin
-                    cursor.execute("SELECT group_id FROM groups_members WHERE user_id = %s AND is_admin = 1", (uploader_id,))
-                    admin_groups = cursor.fetchall()
-
-                    for group in admin_groups:
-                        gid = group['group_id']
-                        
-                        # Remove the user from this specific group first to trigger succession
-                        cursor.execute("DELETE FROM groups_members WHERE user_id = %s AND group_id = %s", (uploader_id, gid))
-                        
-                        # Check if group still has members
-                        cursor.execute("SELECT count(*) as count FROM groups_members WHERE group_id = %s", (gid,))
-                        count_res = cursor.fetchone()
-                        
-                        if count_res['count'] == 0:
-                            # If group is empty, delete group
-                            cursor.execute("DELETE FROM groups_table WHERE id = %s", (gid,))
-                        else:
-                            # If group not empty, ensure there is at least one admin
-                            cursor.execute("SELECT user_id FROM groups_members WHERE group_id = %s AND is_admin = 1", (gid,))
-                            has_admin = cursor.fetchone()
-                            
-                            if not has_admin:
-                                # Promote the oldest member to admin (Heir logic)
-                                cursor.execute("SELECT user_id FROM groups_members WHERE group_id = %s ORDER BY id ASC LIMIT 1", (gid,))
-                                heir = cursor.fetchone()
-                                if heir:
-                                    cursor.execute("UPDATE groups_members SET is_admin = 1 WHERE user_id = %s AND group_id = %s", (heir['user_id'], gid))
+                    keys_to_delete += release_photos(cursor, user_photos)
+                    bump_group_version(cursor, [p['group_id'] for p in user_photos])
+                    publish_photos_removed(cursor, user_photos)
 
                     # 7. FINAL DB CLEANUP AND DELETE USER
                     # Delete all reports related to this user (as uploader)
@@ -513,10 +539,16 @@ def resolve_report():
                     # Delete user's photos from DB (non-group members handled by CASCADE)
                     cursor.execute("DELETE FROM photos WHERE user_id = %s", (uploader_id,))
                     
-                    # Finally, delete the user record
+                    # Finally, delete the user record (reports they filed go with it)
+                    queued_photo_ids = reported_photo_ids(cursor, [uploader_id])
                     cursor.execute("DELETE FROM users WHERE id=%s", (uploader_id,))
+                    refresh_report_queue(cursor, queued_photo_ids)
 
         conn.commit()
+        mark_user_write(admin_id)
+
+        if keys_to_delete:
+            delete_media_from_s3(keys_to_delete)
 
         # --- AUDIT LOGIC BASED ON ACTION ---
         if action == 'delete_content':
@@ -524,7 +556,7 @@ def resolve_report():
         
         elif action == 'ban_user':
              if 'uploader_id' in locals():
-                 log_action(admin_id, 'BAN_USER_REPORT', uploader_id, metadata=f"Banned via report {report_id}")
+                 log_action(admin_id, 'BAN_USER_REPORT', uploader_id, metadata=f"Banned via report {report_id}", sync=True)
         
         elif action == 'dismiss':
              log_action(admin_id, 'DISMISS_REPORT', report_id, metadata="Report dismissed")
@@ -535,4 +567,180 @@ def resolve_report():
 
     except Exception as e:
         print(f"Resolve Report Error: {e}")
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+# ==========================================
+# BULK RESOLVE REPORTS
+# ==========================================
+BULK_RESOLVE_ACTIONS = {'delete_content', 'dismiss', 'ban_user'}
+MAX_BULK_REPORTS = 500
+
+@admin_bp.route('/admin/bulk-resolve-reports', methods=['POST'])
+@limiter.limit("20 per minute")  # 20 per minute
+def bulk_resolve_reports():
+    """
+    Resolves many reports in one transaction.
+    Body: {"admin_id": 1, "items": [{"report_id": 10, "action": "dismiss"}, ...]}
+    or the shorthand {"admin_id": 1, "report_ids": [10, 11], "action": "delete_content"}.
+    """
+    data = request.get_json(silent=True) or {}
+    admin_id = data.get('admin_id')
+
+    items = data.get('items')
+    report_ids = data.get('report_ids')
+    if items is None and isinstance(report_ids, list) and report_ids:
+        items = [{"report_id": rid, "action": data.get('action')} for rid in report_ids]
+
+    if not items or not isinstance(items, list):
+        return jsonify({"error": "Missing fields"}), 400
+    if len(items) > MAX_BULK_REPORTS:
+        return jsonify({"error": f"At most {MAX_BULK_REPORTS} reports per request"}), 400
+
+    # Group report ids by action
+    ids_by_action = {action: set() for action in BULK_RESOLVE_ACTIONS}
+    try:
+        for item in items:
+            action = item.get('action')
+            report_id = int(item['report_id'])
+            if action not in BULK_RESOLVE_ACTIONS or report_id <= 0:
+                raise ValueError(report_id)
+            ids_by_action[action].add(report_id)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return jsonify({"error": "Invalid action or report_id"}), 400
+
+    all_report_ids = set().union(*ids_by_action.values())
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        # Validate the admin once for the whole batch
+        cursor.execute("SELECT is_super_admin FROM users WHERE id = %s", (admin_id,))
+        user = cursor.fetchone()
+        if not user or user['is_super_admin'] != 1:
+            cursor.close(); conn.close()
+            return jsonify({"error": "Unauthorized"}), 403
+
+        # 1. Resolve every report to its photo and uploader in one query
+        format_strings = ','.join(['%s'] * len(all_report_ids))
+        cursor.execute(f"""
+            SELECT r.id, r.photo_id, r.uploader_id, p.file_name, p.blob_id, p.group_id
+            FROM content_reports r
+            JOIN photos p ON r.photo_id = p.id
+            WHERE r.id IN ({format_strings})
+        """, tuple(all_report_ids))
+        reports = {row['id']: row for row in cursor.fetchall()}
+
+        keys_to_delete = []
+        media_to_delete = []
+        audit_entries = []
+
+        # 2. BAN USERS (also removes all of their content)
+        ban_uploader_ids = {reports[rid]['uploader_id'] for rid in ids_by_action['ban_user'] if rid in reports}
+        banned_ids = []
+        if ban_uploader_ids:
+            uid_strings = ','.join(['%s'] * len(ban_uploader_ids))
+            cursor.execute(f"SELECT id, email, username, profile_image FROM users WHERE id IN ({uid_strings})", tuple(ban_uploader_ids))
+            target_users = cursor.fetchall()
+            banned_ids = [u['id'] for u in target_users]
+
+        if banned_ids:
+            uid_strings = ','.join(['%s'] * len(banned_ids))
+
+            # Archive into banned_users (multi-row insert)
+            cursor.executemany(
+                "INSERT INTO banned_users (email, username, reason) VALUES (%s, %s, %s)",
+                [(u['email'], u['username'], "Reported Content") for u in target_users]
+            )
+
+            # Collect S3 keys: profile pictures and every photo of the banned users
+            for u in target_users:
+                if u['profile_image']:
+                    keys_to_delete += [u['profile_image'], get_thumbnail_key(u['profile_image'])]
+
+            # Groups left empty go first (with their photos), then the rest of the users' photos
+            _, released_keys = handle_admin_succession(cursor, banned_ids)
+            media_to_delete += released_keys
+            cursor.execute(f"SELECT id, group_id, file_name, blob_id FROM photos WHERE user_id IN ({uid_strings}) FOR UPDATE",
+                           tuple(banned_ids))
+            banned_photos = cursor.fetchall()
+            media_to_delete += release_photos(cursor, banned_photos)
+            bump_group_version(cursor, [p['group_id'] for p in banned_photos])
+            publish_photos_removed(cursor, banned_photos)
+
+            cursor.execute(f"DELETE FROM content_reports WHERE uploader_id IN ({uid_strings})", tuple(banned_ids))
+            cursor.execute(f"DELETE FROM photos WHERE user_id IN ({uid_strings})", tuple(banned_ids))
+            queued_photo_ids = reported_photo_ids(cursor, banned_ids)
+            cursor.execute(f"DELETE FROM users WHERE id IN ({uid_strings})", tuple(banned_ids))
+            refresh_report_queue(cursor, queued_photo_ids)
+
+            for rid in ids_by_action['ban_user']:
+                if rid in reports and reports[rid]['uploader_id'] in banned_ids:
+                    audit_entries.append((admin_id, 'BAN_USER_REPORT', reports[rid]['uploader_id'], f"Banned via report {rid}"))
+
+        # 3. DELETE CONTENT (skip photos already removed with a banned uploader or an emptied group)
+        delete_rows = [reports[rid] for rid in ids_by_action['delete_content']
+                       if rid in reports and reports[rid]['uploader_id'] not in banned_ids]
+        delete_photo_ids = list({row['photo_id'] for row in delete_rows})
+        if delete_photo_ids:
+            # Lock the photos still present: succession deletes are visible here, concurrent ones are waited for
+            pid_strings = ','.join(['%s'] * len(delete_photo_ids))
+            cursor.execute(f"SELECT id, file_name, blob_id FROM photos WHERE id IN ({pid_strings}) FOR UPDATE",
+                           tuple(delete_photo_ids))
+            locked_photos = cursor.fetchall()
+            delete_photo_ids = [p['id'] for p in locked_photos]
+            delete_rows = [row for row in delete_rows if row['photo_id'] in delete_photo_ids]
+        if delete_photo_ids:
+            pid_strings = ','.join(['%s'] * len(delete_photo_ids))
+
+            # Dependent rows first, then the photos
+            cursor.execute(f"DELETE FROM content_reports WHERE photo_id IN ({pid_strings})", tuple(delete_photo_ids))
+            cursor.execute(f"DELETE FROM photos WHERE id IN ({pid_strings})", tuple(delete_photo_ids))
+            media_to_delete += release_photos(cursor, locked_photos)
+            bump_group_version(cursor, [row['group_id'] for row in delete_rows])
+            publish_photos_removed(cursor, list({row['photo_id']: {"id": row['photo_id'], "group_id": row['group_id']}
+                                                for row in delete_rows}.values()))
+
+            for row in delete_rows:
+                audit_entries.append((admin_id, 'DELETE_CONTENT', row['id'], "Deleted content via bulk report resolve"))
+
+        # 4. DISMISS (each report on its own, like the single resolve)
+        # Reports removed above with a deleted photo or a banned uploader are gone already: no audit row for them
+        dismiss_ids = [rid for rid in ids_by_action['dismiss'] if rid in reports]
+        if dismiss_ids:
+            rid_strings = ','.join(['%s'] * len(dismiss_ids))
+            cursor.execute(f"SELECT id, photo_id FROM content_reports WHERE id IN ({rid_strings})", tuple(dismiss_ids))
+            dismiss_rows = cursor.fetchall()
+        else:
+            dismiss_rows = []
+        if dismiss_rows:
+            rid_strings = ','.join(['%s'] * len(dismiss_rows))
+            cursor.execute(f"DELETE FROM content_reports WHERE id IN ({rid_strings})", tuple(row['id'] for row in dismiss_rows))
+            refresh_report_queue(cursor, [row['photo_id'] for row in dismiss_rows])
+
+            for row in dismiss_rows:
+                audit_entries.append((admin_id, 'DISMISS_REPORT', row['id'], "Report dismissed via bulk resolve"))
+
+        conn.commit()
+        mark_user_write(admin_id)
+        cursor.close(); conn.close()
+
+        # 5. Batched side effects after the commit
+        if keys_to_delete:
+            delete_files_from_s3(keys_to_delete)
+        if media_to_delete:
+            delete_media_from_s3(media_to_delete)
+        # Bans are critical: write their audit rows synchronously
+        log_actions(audit_entries, sync=bool(banned_ids))
+
+        return jsonify({
+            "message": "İşlem başarıyla tamamlandı",
+            "processed": len(reports),
+            "not_found": sorted(all_report_ids - set(reports)),
+            "banned_users": len(banned_ids),
+            "deleted_photos": len(delete_photo_ids)
+        }), 200
+
+    except Exception as e:
+        print(f"Bulk Resolve Error: {e}")
+        return jsonify({"error": str(e)}), 500
@@ -8,12 +8,15 @@ from flask import Blueprint, request, jsonify, current_app, url_for
 from db import get_db_connection
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
-from PIL import Image
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
-from s3_helpers import upload_file_to_s3, get_presigned_url, delete_file_from_s3
+from s3_helpers import upload_file_to_s3, get_presigned_url, delete_file_from_s3, delete_media_from_s3
 from extensions import limiter
+from utils import handle_admin_succession
+from blobs import release_photos
+from report_queue import refresh_report_queue, reported_photo_ids
+from group_versions import bump_user_groups
 
 load_dotenv()
 
@@ -32,6 +35,7 @@ def allowed_file(filename):
 
 # --- THUMBNAIL HELPER ---
 def create_thumbnail(image_path, filename):
+    from PIL import Image  # only needed when a picture is uploaded
     try:
         size = (300, 300)
         with Image.open(image_path) as img:
@@ -363,9 +367,10 @@ def update_profile():
         cursor = conn.cursor(dictionary=True)
 
         # Find Old Image (For deletion later)
-        cursor.execute("SELECT profile_image FROM users WHERE id = %s", (user_id,))
+        cursor.execute("SELECT username, profile_image FROM users WHERE id = %s", (user_id,))
         row = cursor.fetchone()
         old_image = row['profile_image'] if row else None
+        old_username = row['username'] if row else None
 
         picture_filename = None
 
@@ -431,6 +436,9 @@ def update_profile():
         params.append(user_id)
 
         cursor.execute(query, tuple(params))
+        # Name and picture are shown in every group of the user (cached member lists are keyed by group version)
+        if username != old_username or picture_filename or remove_photo:
+            bump_user_groups(cursor, [user_id])
         conn.commit()
 
         # 4. Cleanup: Delete Old Image from S3 (Only if new image uploaded)
@@ -493,41 +501,21 @@ def delete_account():
         user_data = cursor.fetchone()
 
         # 2. HANDLE ADMIN SUCCESSION IN GROUPS
-        # Find groups where the user is an admin
-        cursor.execute("SELECT group_id FROM groups_members WHERE user_id = %s AND is_admin = 1", (user_id,))
-        admin_groups = cursor.fetchall()
+        _, released_keys = handle_admin_succession(cursor, user_id)
 
-        for group in admin_groups:
-            gid = group['group_id']
-            
-            # Remove the user from this specific group first to apply leave_group logic
-            cursor.execute("DELETE FROM groups_members WHERE user_id = %s AND group_id = %s", (user_id, gid))
-            
-            # Check if group still has members
-            cursor.execute("SELECT count(*) as count FROM groups_members WHERE group_id = %s", (gid,))
-            count_res = cursor.fetchone()
-            
-            if count_res['count'] == 0:
-                # If group is empty, delete group (S3 cleanup for group photo handled by DB logic if needed)
-                cursor.execute("DELETE FROM groups_table WHERE id = %s", (gid,))
-            else:
-                # If group not empty, ensure there is at least one admin
-                cursor.execute("SELECT user_id FROM groups_members WHERE group_id = %s AND is_admin = 1", (gid,))
-                has_admin = cursor.fetchone()
-                
-                if not has_admin:
-                    # Promote the oldest member to admin (Heir logic)
-                    cursor.execute("SELECT user_id FROM groups_members WHERE group_id = %s ORDER BY id ASC LIMIT 1", (gid,))
-                    heir = cursor.fetchone()
-                    if heir:
-                        cursor.execute("UPDATE groups_members SET is_admin = 1 WHERE user_id = %s AND group_id = %s", (heir['user_id'], gid))
-
-        # 3. DELETE USER FROM DATABASE
+        # 3. RELEASE THE USER'S MEDIA (photos are removed by CASCADE below)
+        cursor.execute("SELECT file_name, blob_id FROM photos WHERE user_id = %s FOR UPDATE", (user_id,))
+        released_keys += release_photos(cursor, cursor.fetchall())
+
+        # 4. DELETE USER FROM DATABASE
         # groups_members (non-admin ones), group_requests, etc. will be deleted via ON DELETE CASCADE
+        queued_photo_ids = reported_photo_ids(cursor, [user_id])
         cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        refresh_report_queue(cursor, queued_photo_ids)
         conn.commit()
+        delete_media_from_s3(released_keys)
 
-        # 4. Clean up S3 (Profile Image)
+        # 5. Clean up S3 (Profile Image)
         if user_data and user_data['profile_image']:
             image_key = user_data['profile_image']
             # Dynamic thumbnail delete
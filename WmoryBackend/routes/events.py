@@ -0,0 +1,114 @@
+import os
+import json
+import time
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from db import get_db_connection
+from extensions import limiter
+from events import broker, fetch_events_since
+
+events_bp = Blueprint('events', __name__)
+
+# --- STREAM CONFIGURATION ---
+# Each open stream holds one worker thread (gunicorn.conf.py runs gthread workers), so streams are
+# capped per worker and end after STREAM_MAX_SECONDS; EventSource clients reconnect with Last-Event-ID.
+MAX_STREAMS_PER_WORKER = int(os.getenv('MAX_STREAMS_PER_WORKER', '48'))
+STREAM_MAX_SECONDS = int(os.getenv('STREAM_MAX_SECONDS', '300'))
+HEARTBEAT_SECONDS = 15
+RECONNECT_MS = 3000
+REPLAY_LIMIT = 500
+
+
+def format_event(event):
+    data = json.dumps({"group_id": event['group_id'], **event['data']}, separators=(',', ':'))
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+def format_resync(last_event_id):
+    # The client missed more than can be replayed: refetch /group-snapshot (or /group-versions)
+    return f"id: {last_event_id}\nevent: resync\ndata: {{}}\n\n"
+
+
+# ==========================================
+# LIVE GROUP EVENTS (SERVER-SENT EVENTS)
+# ==========================================
+@events_bp.route('/group-events', methods=['GET'])
+@limiter.limit("30 per minute")  # reconnect storms
+def group_events():
+    """
+    Streams events of every group of the user:
+        event: photo_added      data: {"group_id", "user_id", "count"}
+        event: photo_removed    data: {"group_id", "photo_ids"}
+        event: member_joined    data: {"group_id", "user_id"}
+        event: member_left      data: {"group_id", "user_id"}
+        event: request_pending  data: {"group_id", "user_id"}
+        event: resync           (events were missed: reload)
+    Resumes after the Last-Event-ID header (or last_event_id param) when given.
+    """
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({"error": "Missing user_id"}), 400
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({"error": "Invalid Last-Event-ID"}), 400
+
+    try:
+        # Primary: the replay must see everything the poller (which reads the primary) may already have passed
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT group_id FROM groups_members WHERE user_id = %s", (user_id,))
+        group_ids = [row['group_id'] for row in cursor.fetchall()]
+
+        # Subscribe before replaying, so nothing committed in between is lost (duplicates are skipped below)
+        subscription = broker.subscribe(group_ids, cursor, MAX_STREAMS_PER_WORKER)
+        if subscription is None:
+            cursor.close(); conn.close()
+            return jsonify({"error": "Too many open streams"}), 503, {"Retry-After": "5"}
+        if last_event_id is None:
+            cursor.execute("SELECT COALESCE(MAX(id), 0) as last_id FROM group_events")
+            last_event_id = cursor.fetchone()['last_id']
+        replay, complete = fetch_events_since(cursor, group_ids, last_event_id, REPLAY_LIMIT)
+        if not complete:
+            # The client reloads everything and resumes from the newest event
+            cursor.execute("SELECT COALESCE(MAX(id), 0) as last_id FROM group_events")
+            resync_id = cursor.fetchone()['last_id']
+        cursor.close(); conn.close()
+    except Exception as e:
+        print(f"Group events error: {e}")
+        if 'subscription' in locals():
+            broker.unsubscribe(subscription)
+        return jsonify({"error": str(e)}), 500
+
+    def stream():
+        try:
+            yield f"retry: {RECONNECT_MS}\n\n"
+            if not complete:
+                yield format_resync(resync_id)
+                return
+            sent = set()
+            for event in replay:
+                sent.add(event['id'])
+                yield format_event(event)
+
+            deadline = time.monotonic() + STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                if subscription.overflowed:
+                    yield format_resync(subscription.drain_last_id(max(sent, default=last_event_id)))
+                    return
+                event = subscription.get(timeout=HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": ping\n\n"
+                    continue
+                if event['id'] in sent or event['id'] <= last_event_id:
+                    continue
+                sent.add(event['id'])
+                yield format_event(event)
+                # A member who left (or was removed) stops receiving that group
+                if event['type'] == 'member_left' and str(event['data'].get('user_id')) == str(user_id):
+                    broker.unsubscribe(subscription, [event['group_id']])
+        finally:
+            broker.unsubscribe(subscription)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(stream()), mimetype='text/event-stream', headers=headers)
@@ -1,28 +1,33 @@
 import os
-import string
-import random
-import requests # IMPORT REQUESTS
+import mysql.connector
+from mysql.connector import errorcode
 from flask import Blueprint, request, jsonify, current_app, send_from_directory, url_for
 from werkzeug.utils import secure_filename
-from db import get_db_connection
-from PIL import Image
+from db import get_db_connection, get_read_connection, mark_user_write
 import uuid
-from utils import log_action
-from s3_helpers import upload_file_to_s3, get_presigned_url, delete_file_from_s3
+from utils import log_action, handle_admin_succession, get_http_session, HTTP_TIMEOUT
+from s3_helpers import upload_file_to_s3, get_presigned_url, get_presigned_urls, delete_file_from_s3, delete_media_from_s3, get_thumbnail_key
+from blobs import release_photos
+from membership import get_membership, is_member, is_group_admin, invalidate_membership
+from group_codes import next_group_code
+from group_versions import bump_group_version, bump_block_version, get_group_versions, get_cache_versions
+from cache import response_cache
+from visibility import load_viewer_blocks
+from events import publish_event
+from cdn_helpers import is_cdn_mode, create_group_grant, attach_grant_cookies
+from routes.photos import MEDIA_TYPES, list_group_media, parse_page_limit
 
 groups_bp = Blueprint('groups', __name__)
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+MAX_CODE_ATTEMPTS = 3
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def generate_group_code():
-    characters = string.ascii_uppercase + string.digits
-    return ''.join(random.choices(characters, k=8))
-
 # --- HELPER: THUMBNAIL ---
 def create_thumbnail(image_path, filename):
+    from PIL import Image  # only needed when a picture is uploaded
     try:
         size = (300, 300)
         with Image.open(image_path) as img:
@@ -52,14 +57,96 @@ def send_expo_push_notification(tokens, title, body, data=None):
             "data": data or {}
         }
         # Expo API Call
-        requests.post(
+        get_http_session().post(
             "https://exp.host/--/api/v2/push/send",
             json=message,
-            headers={"Accept": "application/json", "Accept-Encoding": "gzip, deflate"}
+            headers={"Accept": "application/json", "Accept-Encoding": "gzip, deflate"},
+            timeout=HTTP_TIMEOUT
         )
     except Exception as e:
         print(f"Push notification error: {e}")
 
+# --- HELPER: GROUP SCREEN QUERIES ---
+GROUP_DETAILS_SQL = "SELECT id, group_name, description, picture, group_code, is_joining_active FROM groups_table WHERE id = %s"
+
+GROUP_REQUESTS_SQL = """
+    SELECT r.id as request_id, u.id as user_id, u.username, u.profile_image 
+    FROM group_requests r
+    JOIN users u ON r.user_id = u.id
+    WHERE r.group_id = %s
+"""
+
+def picture_keys(rows, field):
+    """Object keys (picture and its thumbnail) to sign for the rows' field."""
+    keys = []
+    for row in rows:
+        if row and row.get(field):
+            keys += [row[field], get_thumbnail_key(row[field])]
+    return keys
+
+def attach_picture_urls(rows, field, url_field, signed):
+    """Sets url_field and thumbnail_url on each row from a dict of signed URLs (None without a picture)."""
+    for row in rows:
+        key = row.get(field)
+        row[url_field] = signed.get(key) if key else None
+        row['thumbnail_url'] = signed.get(get_thumbnail_key(key)) if key else None
+
+# --- HELPER: CACHED GROUP PAYLOADS (cache.py) ---
+# Details and the full member list (avatars signed) are shared by every viewer of a group version;
+# each viewer's block filtering and own settings are applied on top by members_for_viewer.
+GROUP_MEMBERS_BASE_SQL = """
+    SELECT u.id, u.username, u.profile_image, gm.is_admin, gm.notifications
+    FROM groups_members gm
+    JOIN users u ON gm.user_id = u.id
+    WHERE gm.group_id = %s
+    ORDER BY u.username ASC
+"""
+
+def load_group_details(cursor, group_id, group_version):
+    """Group details with signed picture URLs, or None if the group does not exist."""
+    if group_version is None:
+        return None
+    def load():
+        cursor.execute(GROUP_DETAILS_SQL, (group_id,))
+        group = cursor.fetchone()
+        if group:
+            attach_picture_urls([group], 'picture', 'picture_url', get_presigned_urls(picture_keys([group], 'picture')))
+        return group
+    return response_cache.get_or_load(f"group-details:{group_id}:{group_version}", load)
+
+def load_group_members(cursor, group_id, group_version):
+    """Every member (by name) with signed avatar URLs, before any viewer's block filtering."""
+    if group_version is None:
+        return []
+    def load():
+        cursor.execute(GROUP_MEMBERS_BASE_SQL, (group_id,))
+        members = cursor.fetchall()
+        attach_picture_urls(members, 'profile_image', 'profile_url', get_presigned_urls(picture_keys(members, 'profile_image')))
+        return members
+    return response_cache.get_or_load(f"group-members:{group_id}:{group_version}", load)
+
+def members_for_viewer(members, viewer_id, blocks, membership=None):
+    """
+    The viewer's member list: users who blocked the viewer are hidden,
+    users the viewer blocked are flagged, the viewer comes first. Cached rows are copied, not changed.
+    """
+    blocked_by = set(blocks['blocked_by'])
+    blocked_by_me = set(blocks['blocked_by_me'])
+    result = []
+    for member in members:
+        if member['id'] in blocked_by:
+            continue
+        row = dict(member)
+        is_viewer = str(member['id']) == str(viewer_id)
+        row['sort_order'] = 0 if is_viewer else 1
+        row['is_blocked_by_me'] = 1 if member['id'] in blocked_by_me else 0
+        if is_viewer and membership:
+            # Not part of the group version: the viewer's own setting comes from the membership cache
+            row['notifications'] = membership['notifications']
+        result.append(row)
+    result.sort(key=lambda row: row['sort_order'])  # stable: everyone else stays in name order
+    return result
+
 # ==========================================
 # CREATE GROUP 
 # ==========================================
@@ -108,18 +195,20 @@ def create_group():
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        new_code = ""
-        while True:
-            new_code = generate_group_code()
-            cursor.execute("SELECT id FROM groups_table WHERE group_code = %s", (new_code,))
-            if not cursor.fetchone(): break 
-
+        # Codes are unique by construction; only a clash with a pre-sequence random code takes another number
         sql_group = "INSERT INTO groups_table (group_code, created_by, group_name, description, picture, is_joining_active) VALUES (%s, %s, %s, %s, %s, 1)"
-        cursor.execute(sql_group, (new_code, user_id, group_name, description, picture_filename))
+        for attempt in range(MAX_CODE_ATTEMPTS):
+            new_code = next_group_code(cursor)
+            try:
+                cursor.execute(sql_group, (new_code, user_id, group_name, description, picture_filename))
+                break
+            except mysql.connector.IntegrityError as e:
+                if e.errno != errorcode.ER_DUP_ENTRY or attempt == MAX_CODE_ATTEMPTS - 1: raise
         group_id = cursor.lastrowid 
 
         sql_member = "INSERT INTO groups_members (user_id, group_id, is_admin) VALUES (%s, %s, %s)"
         cursor.execute(sql_member, (user_id, group_id, 1))
+        invalidate_membership(cursor, group_id, user_id)
 
         conn.commit()
         cursor.close()
@@ -145,9 +234,7 @@ def edit_group():
     cursor = conn.cursor(dictionary=True)
 
     # 1. Check Admin Permission
-    cursor.execute("SELECT is_admin FROM groups_members WHERE user_id=%s AND group_id=%s", (user_id, group_id))
-    row = cursor.fetchone()
-    if not row or row['is_admin'] != 1:
+    if not is_group_admin(cursor, user_id, group_id):
         cursor.close(); conn.close()
         return jsonify({"error": "Unauthorized"}), 403
 
@@ -209,6 +296,7 @@ def edit_group():
         params.append(group_id)
 
         cursor.execute(sql, tuple(params))
+        bump_group_version(cursor, group_id)
         conn.commit()
         
         cursor.close(); conn.close()
@@ -234,10 +322,7 @@ def delete_group():
         cursor = conn.cursor(dictionary=True)
 
         # 1. Check Admin Permission
-        cursor.execute("SELECT is_admin FROM groups_members WHERE user_id=%s AND group_id=%s", (user_id, group_id))
-        row = cursor.fetchone()
-        
-        if not row or row['is_admin'] != 1:
+        if not is_group_admin(cursor, user_id, group_id):
             cursor.close(); conn.close()
             return jsonify({"error": "Unauthorized. Only admins can delete the group."}), 403
 
@@ -247,16 +332,19 @@ def delete_group():
         group_data = cursor.fetchone()
         
         # B) Get All Photos in Group
-        cursor.execute("SELECT file_name FROM photos WHERE group_id = %s", (group_id,))
+        cursor.execute("SELECT file_name, blob_id FROM photos WHERE group_id = %s FOR UPDATE", (group_id,))
         group_photos = cursor.fetchall()
 
         # 3. Delete Data from DB
         # Note: Foreign keys usually handle cascading, but we need manual S3 delete
+        # Blobs shared with other groups keep their objects; only unreferenced ones are deleted below
+        released_keys = release_photos(cursor, group_photos)
         cursor.execute("DELETE FROM groups_table WHERE id = %s", (group_id,))
+        invalidate_membership(cursor, group_id=group_id)
         conn.commit()
 
         # ---  AUDIT LOG ---
-        log_action(user_id, 'DELETE_GROUP', group_id, metadata="Group deleted by admin")
+        log_action(user_id, 'DELETE_GROUP', group_id, metadata="Group deleted by admin", sync=True)
         # ----------------------
 
         # 4. Delete Files from S3 (Cleanup)
@@ -268,11 +356,7 @@ def delete_group():
             delete_file_from_s3(thumb_to_delete)
 
         # B) Delete All Photos Uploaded to Group
-        for photo in group_photos:
-            photo_key = photo['file_name']
-            thumb_to_delete = photo_key.replace('media/', 'thumbs/') if photo_key.startswith('media/') else f"thumb_{photo_key}"
-            delete_file_from_s3(photo_key)
-            delete_file_from_s3(thumb_to_delete)
+        delete_media_from_s3(released_keys)
         
         cursor.close(); conn.close()
         return jsonify({"message": "Grup ve içerikleri başarıyla silindi"}), 200
@@ -293,8 +377,14 @@ def join_group():
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
-        # 1. Find Group & Check Status
-        cursor.execute("SELECT id, group_name, picture, is_joining_active FROM groups_table WHERE group_code = %s", (code,))
+        # 1. Group, membership, pending request and requester name in one round trip
+        cursor.execute("""
+            SELECT g.id, g.group_name, g.picture, g.is_joining_active,
+                   EXISTS (SELECT 1 FROM groups_members gm WHERE gm.user_id = %s AND gm.group_id = g.id) as is_member,
+                   (SELECT username FROM users WHERE id = %s) as requestor_name
+            FROM groups_table g
+            WHERE g.group_code = %s
+        """, (user_id, user_id, code))
         group = cursor.fetchone()
 
         if not group:
@@ -307,27 +397,29 @@ def join_group():
 
         group_id = group['id']
 
-        # 2. Check Member
-        cursor.execute("SELECT id FROM groups_members WHERE user_id = %s AND group_id = %s", (user_id, group_id))
-        if cursor.fetchone():
+        if group['is_member']:
             cursor.close(); conn.close()
             return jsonify({"status": "error", "message": "Zaten bu grubun üyesisiniz"}), 409
 
-        # 3. Check Request
-        cursor.execute("SELECT id FROM group_requests WHERE user_id = %s AND group_id = %s", (user_id, group_id))
-        if cursor.fetchone():
+        if group['requestor_name'] is None:
             cursor.close(); conn.close()
-            return jsonify({"status": "error", "message": "Zaten bir istek gönderdiniz"}), 409
+            return jsonify({"status": "error", "message": "Kullanıcı bulunamadı"}), 404
 
-        # 4. Create Request
-        cursor.execute("INSERT INTO group_requests (user_id, group_id) VALUES (%s, %s)", (user_id, group_id))
+        # 2. Create Request (unique_request turns repeated taps and concurrent attempts into a 409)
+        try:
+            cursor.execute("INSERT INTO group_requests (user_id, group_id) VALUES (%s, %s)", (user_id, group_id))
+        except mysql.connector.IntegrityError as e:
+            cursor.close(); conn.close()
+            if e.errno == errorcode.ER_DUP_ENTRY:
+                return jsonify({"status": "error", "message": "Zaten bir istek gönderdiniz"}), 409
+            # Foreign key: the group (or the user) was deleted after the lookup above
+            return jsonify({"status": "error", "message": "Grup bulunamadı"}), 404
+        bump_group_version(cursor, group_id)  # admins see the new request
+        publish_event(cursor, group_id, 'request_pending', {"user_id": int(user_id)})
         conn.commit()
 
         # --- NOTIFICATION LOGIC ---
-        # Get Requestor Name
-        cursor.execute("SELECT username FROM users WHERE id = %s", (user_id,))
-        requestor = cursor.fetchone()
-        requestor_name = requestor['username'] if requestor else "Bir kullanıcı"
+        requestor_name = group['requestor_name'] or "Bir kullanıcı"
 
         # Get Admins of the group who have push tokens
         sql_admins = """
@@ -377,19 +469,12 @@ def block_user():
         sql_block = "INSERT IGNORE INTO blocked_users (blocker_id, blocked_id) VALUES (%s, %s)"
         cursor.execute(sql_block, (blocker_id, blocked_id))
 
-        sql_hide_1 = """
-            INSERT IGNORE INTO hidden_photos (user_id, photo_id)
-            SELECT %s, id FROM photos WHERE user_id = %s
-        """
-        cursor.execute(sql_hide_1, (blocker_id, blocked_id))
-
-        sql_hide_2 = """
-            INSERT IGNORE INTO hidden_photos (user_id, photo_id)
-            SELECT %s, id FROM photos WHERE user_id = %s
-        """
-        cursor.execute(sql_hide_2, (blocked_id, blocker_id))
+        # Each other's media is filtered by the block itself (visibility.py): nothing to hide per photo
+        bump_block_version(cursor, [blocker_id, blocked_id])
 
         conn.commit()
+        mark_user_write(blocker_id)
+        mark_user_write(blocked_id)
         cursor.close(); conn.close()
         return jsonify({"message": "User blocked successfully"}), 200
     except Exception as e:
@@ -410,21 +495,12 @@ def unblock_user():
 
         cursor.execute("DELETE FROM blocked_users WHERE blocker_id = %s AND blocked_id = %s", (blocker_id, blocked_id))
 
-        sql_unhide_1 = """
-            DELETE FROM hidden_photos 
-            WHERE user_id = %s 
-            AND photo_id IN (SELECT id FROM photos WHERE user_id = %s)
-        """
-        cursor.execute(sql_unhide_1, (blocker_id, blocked_id))
-
-        sql_unhide_2 = """
-            DELETE FROM hidden_photos 
-            WHERE user_id = %s 
-            AND photo_id IN (SELECT id FROM photos WHERE user_id = %s)
-        """
-        cursor.execute(sql_unhide_2, (blocked_id, blocker_id))
+        # Media shows again once no block remains in either direction; items hidden by hand stay hidden
+        bump_block_version(cursor, [blocker_id, blocked_id])
 
         conn.commit()
+        mark_user_write(blocker_id)
+        mark_user_write(blocked_id)
         cursor.close(); conn.close()
         return jsonify({"message": "User unblocked"}), 200
     except Exception as e:
@@ -479,13 +555,12 @@ def toggle_joining():
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute("SELECT is_admin FROM groups_members WHERE user_id=%s AND group_id=%s", (user_id, group_id))
-        row = cursor.fetchone()
-        if not row or row[0] != 1:
+        if not is_group_admin(cursor, user_id, group_id):
             cursor.close(); conn.close()
             return jsonify({"error": "Sadece yöneticiler değiştirebilir"}), 403
 
         cursor.execute("UPDATE groups_table SET is_joining_active = %s WHERE id = %s", (status, group_id))
+        bump_group_version(cursor, group_id)
         conn.commit()
         cursor.close(); conn.close()
         return jsonify({"message": "Updated"}), 200
@@ -502,24 +577,11 @@ def get_group_requests():
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
         
-        sql = """
-            SELECT r.id as request_id, u.id as user_id, u.username, u.profile_image 
-            FROM group_requests r
-            JOIN users u ON r.user_id = u.id
-            WHERE r.group_id = %s
-        """
-        cursor.execute(sql, (group_id,))
+        cursor.execute(GROUP_REQUESTS_SQL, (group_id,))
         requests = cursor.fetchall()
 
-        for r in requests:
-            if r['profile_image']:
-                pic_key = r['profile_image']
-                # --- DYNAMIC THUMBNAIL URL FETCH ---
-                thumb_key = pic_key.replace('pp_media/', 'pp_thumbs/') if pic_key.startswith('pp_media/') else f"thumb_{pic_key}"
-                r['profile_url'] = get_presigned_url(pic_key)
-                r['thumbnail_url'] = get_presigned_url(thumb_key)
-            else:
-                r['thumbnail_url'] = None
+        # --- DYNAMIC THUMBNAIL URL FETCH (one signing batch) ---
+        attach_picture_urls(requests, 'profile_image', 'profile_url', get_presigned_urls(picture_keys(requests, 'profile_image')))
 
         cursor.close(); conn.close()
         return jsonify(requests), 200
@@ -541,9 +603,7 @@ def manage_request():
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute("SELECT is_admin FROM groups_members WHERE user_id=%s AND group_id=%s", (admin_id, group_id))
-        row = cursor.fetchone()
-        if not row or row[0] != 1:
+        if not is_group_admin(cursor, admin_id, group_id):
             cursor.close(); conn.close()
             return jsonify({"error": "Sadece yöneticiler isteklere cevap verebilir"}), 403
 
@@ -551,6 +611,8 @@ def manage_request():
 
         if action == 'accept':
             cursor.execute("INSERT INTO groups_members (user_id, group_id) VALUES (%s, %s)", (target_user_id, group_id))
+            invalidate_membership(cursor, group_id, target_user_id)
+            publish_event(cursor, group_id, 'member_joined', {"user_id": int(target_user_id)})
             try:
                 # A) Get Group Name
                 cursor.execute("SELECT group_name FROM groups_table WHERE id = %s", (group_id,))
@@ -575,7 +637,9 @@ def manage_request():
                 print(f"Notification error (Non-critical): {notify_error}")
             # --- NEW NOTIFICATION CODE END ---
         
+        bump_group_version(cursor, group_id)
         conn.commit()
+        mark_user_write(admin_id)
         cursor.close(); conn.close()
         return jsonify({"message": "Success"}), 200
     except Exception as e:
@@ -596,20 +660,23 @@ def manage_member():
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute("SELECT is_admin FROM groups_members WHERE user_id=%s AND group_id=%s", (admin_id, group_id))
-        row = cursor.fetchone()
-        if not row or row[0] != 1:
+        if not is_group_admin(cursor, admin_id, group_id):
             cursor.close(); conn.close()
             return jsonify({"error": "Unauthorized"}), 403
 
         if action == 'kick':
             cursor.execute("DELETE FROM groups_members WHERE user_id=%s AND group_id=%s", (target_user_id, group_id))
+            invalidate_membership(cursor, group_id, target_user_id)
+            publish_event(cursor, group_id, 'member_left', {"user_id": int(target_user_id)})
         
         elif action == 'promote':
             cursor.execute("UPDATE groups_members SET is_admin = 0 WHERE user_id=%s AND group_id=%s", (admin_id, group_id))
             cursor.execute("UPDATE groups_members SET is_admin = 1 WHERE user_id=%s AND group_id=%s", (target_user_id, group_id))
+            invalidate_membership(cursor, group_id=group_id)
 
+        bump_group_version(cursor, group_id)
         conn.commit()
+        mark_user_write(admin_id)
 
         # --- NEW: AUDIT LOG ---
         if action == 'kick':
@@ -639,40 +706,20 @@ def leave_group():
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
-        cursor.execute("SELECT is_admin FROM groups_members WHERE user_id=%s AND group_id=%s", (user_id, group_id))
-        member_row = cursor.fetchone()
-
-        if not member_row:
+        if not is_member(cursor, user_id, group_id):
             cursor.close(); conn.close()
             return jsonify({"error": "Member not found"}), 404
         
-        was_admin = (member_row['is_admin'] == 1)
-
-        cursor.execute("DELETE FROM groups_members WHERE user_id=%s AND group_id=%s", (user_id, group_id))
-
-        cursor.execute("SELECT count(*) as count FROM groups_members WHERE group_id=%s", (group_id,))
-        res = cursor.fetchone()
-        
-        if res['count'] == 0:
-            cursor.execute("DELETE FROM groups_table WHERE id=%s", (group_id,))
-            
-            conn.commit()
-            cursor.close(); conn.close()
-            return jsonify({"message": "Left group and group deleted (empty)"}), 200
-        
-        if was_admin:
-            cursor.execute("SELECT user_id FROM groups_members WHERE group_id=%s AND is_admin=1", (group_id,))
-            remaining_admin = cursor.fetchone()
-
-            if not remaining_admin:
-                cursor.execute("SELECT user_id FROM groups_members WHERE group_id=%s ORDER BY id ASC LIMIT 1", (group_id,))
-                heir = cursor.fetchone()
-                
-                if heir:
-                    cursor.execute("UPDATE groups_members SET is_admin=1 WHERE user_id=%s AND group_id=%s", (heir['user_id'], group_id))
+        # Leave, delete the group if it is now empty, promote an heir if no admin is left
+        deleted_groups, released_keys = handle_admin_succession(cursor, user_id, group_ids=[group_id])
 
         conn.commit()
+        mark_user_write(user_id)
         cursor.close(); conn.close()
+        delete_media_from_s3(released_keys)
+
+        if deleted_groups:
+            return jsonify({"message": "Left group and group deleted (empty)"}), 200
         return jsonify({"message": "Left group successfully"}), 200
 
     except Exception as e:
@@ -688,17 +735,9 @@ def get_group_details():
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
         
-        cursor.execute("SELECT id, group_name, description, picture, group_code, is_joining_active FROM groups_table WHERE id = %s", (group_id,))
-        group = cursor.fetchone()
-        
-        if group:
-            if group['picture']:
-                pic_key = group['picture']
-                thumb_key = pic_key.replace('gp_media/', 'gp_thumbs/') if pic_key.startswith('gp_media/') else f"thumb_{pic_key}"
-                group['picture_url'] = get_presigned_url(pic_key)
-                group['thumbnail_url'] = get_presigned_url(thumb_key)
-            else:
-                group['picture_url'] = None; group['thumbnail_url'] = None
+        # Cached per group version: a hit costs one primary key lookup
+        group_version, _ = get_cache_versions(cursor, group_id, None)
+        group = load_group_details(cursor, group_id, group_version)
         
         cursor.close(); conn.close()
         return jsonify(group) if group else (jsonify({"error": "Not found"}), 404)
@@ -718,43 +757,111 @@ def get_group_members():
     current_user_id = request.args.get('current_user_id')
     
     try:
-        conn = get_db_connection()
+        # Member list is read-only: serve it from the replica
+        conn = get_read_connection(current_user_id)
         cursor = conn.cursor(dictionary=True)
         
-        sql = """
-            SELECT 
-                u.id, 
-                u.username, 
-                u.profile_image, 
-                gm.is_admin, 
-                gm.notifications,
-                CASE WHEN u.id = %s THEN 0 ELSE 1 END as sort_order,
-                CASE WHEN EXISTS (SELECT 1 FROM blocked_users WHERE blocker_id = %s AND blocked_id = u.id) THEN 1 ELSE 0 END as is_blocked_by_me
-            FROM groups_members gm 
-            JOIN users u ON gm.user_id = u.id 
-            WHERE gm.group_id = %s 
-            AND u.id NOT IN (
-                SELECT blocker_id FROM blocked_users WHERE blocked_id = %s
-            )
-            ORDER BY sort_order ASC, u.username ASC
-        """
-        cursor.execute(sql, (current_user_id, current_user_id, group_id, current_user_id))
-        members = cursor.fetchall()
-        
-        for m in members:
-            if m['profile_image']:
-                pic_key = m['profile_image']
-                # --- DYNAMIC THUMBNAIL URL FETCH ---
-                thumb_key = pic_key.replace('pp_media/', 'pp_thumbs/') if pic_key.startswith('pp_media/') else f"thumb_{pic_key}"
-                m['profile_url'] = get_presigned_url(pic_key)
-                m['thumbnail_url'] = get_presigned_url(thumb_key)
-            else: m['profile_url'] = None; m['thumbnail_url'] = None
+        # Shared list per group version + the viewer's block sets per block version (both cached):
+        # a hit costs one primary key lookup instead of the join and the avatar signing
+        group_version, block_version = get_cache_versions(cursor, group_id, current_user_id)
+        members = members_for_viewer(load_group_members(cursor, group_id, group_version), current_user_id,
+                                     load_viewer_blocks(cursor, current_user_id, block_version),
+                                     get_membership(cursor, current_user_id, group_id))
             
         cursor.close(); conn.close()
         return jsonify(members), 200
     except Exception as e: return jsonify({"error": str(e)}), 500
 
 
+# ==========================================
+# GROUP SNAPSHOT (GROUP SCREEN IN ONE REQUEST)
+# ==========================================
+SNAPSHOT_FIELDS = ('details', 'members', 'requests', 'photos')
+SNAPSHOT_PHOTOS_LIMIT = 60
+
+@groups_bp.route('/group-snapshot', methods=['GET'])
+def get_group_snapshot():
+    """
+    Everything the group screen loads, from one connection and one membership check:
+    details, members, pending requests (admins only) and the first page of photos.
+    fields=details,members,... selects parts (all by default). Photo options follow /group-photos
+    (lazy, type, hide_duplicates, limit); photos_next_cursor continues the listing there.
+    Details, members and photos are shared per group version (cache.py), so a hit signs nothing.
+    """
+    group_id = request.args.get('group_id')
+    user_id = request.args.get('user_id')
+    fields = set(request.args.get('fields', ','.join(SNAPSHOT_FIELDS)).split(','))
+    lazy = request.args.get('lazy') == '1'
+    media_type = request.args.get('type')
+    hide_duplicates = request.args.get('hide_duplicates') == '1'
+
+    if not group_id or not user_id:
+        return jsonify({"error": "group_id and user_id are required"}), 400
+    if not fields <= set(SNAPSHOT_FIELDS):
+        return jsonify({"error": f"fields must be among {', '.join(SNAPSHOT_FIELDS)}"}), 400
+    if media_type and media_type not in MEDIA_TYPES:
+        return jsonify({"error": "type must be 'image' or 'video'"}), 400
+    try:
+        limit = parse_page_limit(request.args.get('limit')) or SNAPSHOT_PHOTOS_LIMIT
+    except ValueError:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+
+    try:
+        # Read-only: served from the replica (the viewer's own recent writes pin it to the primary)
+        conn = get_read_connection(user_id)
+        cursor = conn.cursor(dictionary=True)
+
+        membership = get_membership(cursor, user_id, group_id)
+        if not membership:
+            cursor.close(); conn.close()
+            return jsonify({"error": "Unauthorized"}), 403
+
+        snapshot = {"is_admin": membership['is_admin']}
+        group = members = requests = photos = None
+
+        # Details, members and photos come signed from the caches (see load_group_details)
+        versions = get_cache_versions(cursor, group_id, user_id)
+        group_version, block_version = versions
+        if 'details' in fields:
+            group = load_group_details(cursor, group_id, group_version)
+            if not group:
+                cursor.close(); conn.close()
+                return jsonify({"error": "Not found"}), 404
+        if 'members' in fields:
+            members = members_for_viewer(load_group_members(cursor, group_id, group_version), user_id,
+                                         load_viewer_blocks(cursor, user_id, block_version), membership)
+        if 'requests' in fields and membership['is_admin']:
+            cursor.execute(GROUP_REQUESTS_SQL, (group_id,))
+            requests = cursor.fetchall()
+        if 'photos' in fields:
+            # Shared listing per group version (see routes/photos.py list_group_media)
+            photos, snapshot['photos_next_cursor'] = list_group_media(cursor, group_id, user_id, media_type, hide_duplicates, limit,
+                                                                     lazy=lazy, versions=versions)
+
+        cursor.close(); conn.close()
+
+        if group is not None:
+            snapshot['details'] = group
+        if members is not None:
+            snapshot['members'] = members
+        if 'requests' in fields:
+            # Only admins see pending requests
+            if requests is not None:
+                attach_picture_urls(requests, 'profile_image', 'profile_url', get_presigned_urls(picture_keys(requests, 'profile_image')))
+            snapshot['requests'] = requests
+        if photos is not None:
+            snapshot['photos'] = photos
+
+        response = jsonify(snapshot)
+        if photos is not None and is_cdn_mode():
+            grants, expires = create_group_grant(group_id)
+            attach_grant_cookies(response, grants, expires)
+        return response, 200
+    except Exception as e:
+        print(f"Group Snapshot Error: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+
 # ==========================================
 # GET USER GROUPS (UPDATED: Returns Members)
 # ==========================================
@@ -806,6 +913,30 @@ def get_user_groups():
         return jsonify(groups), 200
     except Exception as e: return jsonify({"error": str(e)}), 500
 
+# ==========================================
+# GROUP VERSIONS (CHANGE POLLING)
+# ==========================================
+@groups_bp.route('/group-versions', methods=['GET'])
+def get_user_group_versions():
+    """
+    Content version of every group of the user, e.g. {"versions": {"12": 40, "15": 3}}.
+    Clients refetch a group only when its version moved since their last poll.
+    """
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({"error": "Missing user_id"}), 400
+
+    try:
+        # The viewer's own recent writes pin the read to the primary, so their changes show up at once
+        conn = get_read_connection(user_id)
+        cursor = conn.cursor(dictionary=True)
+        versions = get_group_versions(cursor, user_id)
+        cursor.close(); conn.close()
+        return jsonify({"versions": versions}), 200
+    except Exception as e:
+        print(f"Group versions error: {e}")
+        return jsonify({"error": str(e)}), 500
+
 # ==========================================
 # TOGGLE NOTIFICATIONS
 # ==========================================
@@ -829,7 +960,9 @@ def toggle_notifications():
             WHERE user_id = %s AND group_id = %s
         """
         cursor.execute(sql, (user_id, group_id))
+        invalidate_membership(cursor, group_id, user_id)  # the member list overlays it from the membership cache
         conn.commit()
+        mark_user_write(user_id)
 
         # Fetch new status to return to frontend
         cursor.execute("SELECT notifications FROM groups_members WHERE user_id = %s AND group_id = %s", (user_id, group_id))
@@ -0,0 +1,27 @@
+from flask import Blueprint, jsonify
+from extensions import limiter
+from lifecycle import readiness
+from db import pool_stats
+
+health_bp = Blueprint('health', __name__)
+
+# ==========================================
+# LIVENESS
+# ==========================================
+# The process is up and serving requests; nothing external is checked,
+# so a database outage does not get healthy workers restarted.
+@health_bp.route('/healthz', methods=['GET'])
+@limiter.exempt
+def healthz():
+    return jsonify({"status": "ok"}), 200
+
+# ==========================================
+# READINESS
+# ==========================================
+# Warm DB pool and S3 client, and not draining. Deploys wait for this before stopping the old container.
+@health_bp.route('/readyz', methods=['GET'])
+@limiter.exempt
+def readyz():
+    ready, checks = readiness()
+    body = {"status": "ready" if ready else "not_ready", "checks": checks, "pool": pool_stats()}
+    return jsonify(body), 200 if ready else 503
@@ -1,13 +1,26 @@
 import os
-import requests 
 from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
-from db import get_db_connection
+from db import get_db_connection, get_read_connection, mark_user_write
 from datetime import datetime
 import uuid # Rastgele isim oluşturmak için
 
 # --- S3 HELPER IMPORT ---
-from s3_helpers import upload_file_to_s3, get_presigned_url, delete_file_from_s3, generate_presigned_post_url
+from s3_helpers import upload_file_to_s3, get_presigned_urls, generate_presigned_post_url, get_thumbnail_key, delete_media_from_s3
+from media_metadata import verify_upload, verify_uploads, sync_rendition_flags
+from dedup import find_exact_duplicate, find_exact_duplicates
+from blobs import acquire_blobs, release_photos, inherit_blob_renditions
+from membership import is_member
+from utils import get_http_session, HTTP_TIMEOUT
+from group_versions import bump_group_version, get_cache_versions
+from cache import ResponseCache
+from visibility import load_viewer_blocks, blocked_uploaders, load_hidden_ids
+from hidden_sets import hide_photos
+from events import publish_event, publish_photos_removed
+from report_queue import refresh_report_queue
+from archival import original_available, restore_status, request_restores
+from extensions import limiter
+from cdn_helpers import is_cdn_mode, group_media_key, is_group_media_key, cdn_url, create_group_grant, attach_grant_cookies
 
 photos_bp = Blueprint('photos', __name__)
 
@@ -28,10 +41,11 @@ def send_expo_push_notification(tokens, title, body, data=None):
             "body": body,
             "data": data or {}
         }
-        requests.post(
+        get_http_session().post(
             "https://exp.host/--/api/v2/push/send",
             json=message,
-            headers={"Accept": "application/json", "Accept-Encoding": "gzip, deflate"}
+            headers={"Accept": "application/json", "Accept-Encoding": "gzip, deflate"},
+            timeout=HTTP_TIMEOUT
         )
     except Exception as e:
         print(f"Push notification error: {e}")
@@ -58,8 +72,7 @@ def upload_photo():
             cursor = conn.cursor(dictionary=True)
 
             # Check membership
-            cursor.execute("SELECT id FROM groups_members WHERE user_id = %s AND group_id = %s", (user_id, group_id))
-            if not cursor.fetchone():
+            if not is_member(cursor, user_id, group_id):
                 cursor.close(); conn.close()
                 return jsonify({"error": "You are not a member of this group"}), 403
 
@@ -129,13 +142,22 @@ def upload_photo():
                 return jsonify({"error": "Failed to upload to Cloud Storage"}), 500
 
             # 4. SAVE TO DB (Store only the filename/key, NOT the full URL)
-            sql = "INSERT INTO photos (file_name, user_id, group_id, upload_date) VALUES (%s, %s, %s, %s)"
-            cursor.execute(sql, (filename, user_id, group_id, datetime.utcnow()))
+            # No ETag is known here, so the object always gets its own blob (the worker merges it by SHA-256)
+            blob = acquire_blobs(cursor, {filename: {"size_bytes": file_size, "etag": None}})[filename]
+            sql = """
+                INSERT INTO photos (file_name, upload_key, blob_id, user_id, group_id, upload_date, media_type, mime_type, size_bytes, has_thumbnail)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """
+            cursor.execute(sql, (filename, filename, blob['blob_id'], user_id, group_id, datetime.utcnow(), get_media_type(filename, file.mimetype),
+                                 file.mimetype, file_size, 1 if thumb_path else 0))
             
             # Update Counters
             cursor.execute("UPDATE users SET daily_usage = daily_usage + %s WHERE id = %s", (file_size, user_id))
+            bump_group_version(cursor, group_id)
+            publish_event(cursor, group_id, 'photo_added', {"user_id": int(user_id), "count": 1})
             
             conn.commit()
+            mark_user_write(user_id)
 
             # --- NOTIFICATIONS ---
             cursor.execute("SELECT group_name FROM groups_table WHERE id = %s", (group_id,))
@@ -170,88 +192,453 @@ def upload_photo():
     else:
         return jsonify({"error": "File type not allowed"}), 400
 
+# --- HELPER: MEDIA URLS ---
+VIDEO_EXTENSIONS = {'mp4', 'mov', 'avi', 'm4v'}
+
+# Photos of a group the viewer may see: uploader not blocked either way.
+# Items the viewer hid are dropped in process afterwards (load_hidden_ids, a compact id set).
+VISIBLE_PHOTOS_FILTER = """
+    photos.group_id = %s 
+    AND photos.user_id NOT IN (
+        SELECT blocked_id FROM blocked_users WHERE blocker_id = %s
+        UNION
+        SELECT blocker_id FROM blocked_users WHERE blocked_id = %s
+    )
+"""
+
+def sign_media_urls(photos, group_id, include_originals=True, include_avatars=True, extra_keys=()):
+    """
+    Returns a dict of object key -> URL for the thumbnails (and optionally originals/avatars) of the given rows.
+    CDN mode: media in the group's shard is covered by one signed cookie, so it gets plain CDN URLs.
+    Everything else (legacy keys, avatars, extra_keys) is presigned in one batch (valid for 15 mins).
+    Archived originals are not signed until restored (archival.py); their thumbnails are.
+    """
+    cdn_mode = is_cdn_mode()
+    keys = list(extra_keys)
+    cdn_keys = []
+    for photo in photos:
+        media_keys = [get_thumbnail_key(photo['file_name'])]
+        if include_originals and original_available(photo):
+            media_keys.append(photo['file_name'])
+        if cdn_mode and is_group_media_key(photo['file_name'], group_id):
+            cdn_keys += media_keys
+        else:
+            keys += media_keys
+        if include_avatars:
+            keys.append(photo.get('profile_image'))
+
+    signed = get_presigned_urls(keys)
+    for key in cdn_keys:
+        signed[key] = cdn_url(key)
+    return signed
+
+MEDIA_TYPES = ('image', 'video')
+
+def get_media_type(file_name, mime_type=None):
+    """'video' or 'image', from the stored content type when known, else from the extension."""
+    if mime_type and mime_type.startswith(('image/', 'video/')):
+        return 'video' if mime_type.startswith('video/') else 'image'
+    ext = file_name.rsplit('.', 1)[1].lower()
+    return 'video' if ext in VIDEO_EXTENSIONS else 'image'
+
+def parse_media_hints(item):
+    """
+    Layout hints the client read from the picked asset: width, height (px) and duration_ms.
+    Only used for the grid layout until the media worker records the real values.
+    """
+    hints = {}
+    for field in ('width', 'height', 'duration_ms'):
+        try:
+            value = int(item.get(field) or 0)
+        except (TypeError, ValueError):
+            value = 0
+        hints[field] = value if 0 < value < 2**31 else None
+    return hints
+
+# Largest page /group-photos serves when a limit is given
+MAX_PHOTOS_PAGE = 500
+
+CURSOR_DATE_FORMAT = '%Y%m%d%H%M%S%f'
+
+def encode_photos_cursor(photo):
+    """Keyset cursor of a listing row: its upload date and id."""
+    return f"{photo['upload_date'].strftime(CURSOR_DATE_FORMAT)}-{photo['id']}"
+
+def decode_photos_cursor(value):
+    """:return: (upload_date, id), or None if the cursor is malformed"""
+    try:
+        date_part, id_part = value.split('-', 1)
+        return datetime.strptime(date_part, CURSOR_DATE_FORMAT), int(id_part)
+    except (AttributeError, ValueError):
+        return None
+
+LISTING_SELECT = """
+    SELECT photos.id, photos.file_name, photos.upload_date, 
+           photos.user_id as uploader_id, 
+           photos.media_type, photos.size_bytes, photos.width, photos.height,
+           photos.duration_ms, photos.has_thumbnail, photos.has_preview,
+           photos.archived_at, photos.restore_requested_at, photos.restored_until,
+           users.username, users.profile_image,
+           mh.duplicate_of
+    FROM photos 
+    JOIN users ON photos.user_id = users.id 
+    LEFT JOIN media_hashes mh ON mh.photo_id = photos.id
+"""
+
+def fetch_group_photos(cursor, group_id, user_id, media_type=None, hide_duplicates=False, limit=None, before=None):
+    """
+    Visible media of a group for the viewer, newest first.
+    limit/before page through the listing: before is a decoded cursor, and up to limit + 1 rows are
+    returned so the caller can tell whether another page exists. Hidden items are dropped after the
+    query, so a page that lost rows to them is topped up from the following rows.
+    """
+    hidden_ids = load_hidden_ids(cursor, user_id, group_id)
+    photos = []
+    while True:
+        sql = f"""
+            {LISTING_SELECT}
+            WHERE {VISIBLE_PHOTOS_FILTER}
+            {"AND photos.media_type = %s" if media_type else ""}
+            {"AND mh.duplicate_of IS NULL" if hide_duplicates else ""}
+            {"AND (photos.upload_date < %s OR (photos.upload_date = %s AND photos.id < %s))" if before else ""}
+            ORDER BY photos.upload_date DESC, photos.id DESC
+            {"LIMIT %s" if limit else ""}
+        """
+        params = (group_id, user_id, user_id) + ((media_type,) if media_type else ())
+        if before:
+            params += (before[0], before[0], before[1])
+        if limit:
+            params += (limit + 1,)
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        photos += [row for row in rows if row['id'] not in hidden_ids]
+        if not limit:
+            return photos
+        if len(photos) > limit or len(rows) <= limit:
+            return photos[:limit + 1]
+        before = (rows[-1]['upload_date'], rows[-1]['id'])
+
+def build_photo_items(photos, signed, lazy=False):
+    """Listing items of /group-photos from fetch_group_photos rows and their signed URLs."""
+    photo_list = []
+    for photo in photos:
+        filename = photo['file_name']
+        thumbnail_url = signed.get(get_thumbnail_key(filename))
+
+        # Handle User Avatar (Profile Pic) Presigned URL
+        user_avatar_url = signed.get(photo['profile_image']) if photo['profile_image'] else None
+
+        item = {
+            "id": photo['id'],
+            "thumbnail": thumbnail_url, # S3 Link
+            "type": photo['media_type'],
+            "size": photo['size_bytes'], # Verified size
+            "width": photo['width'], # Layout hints (may be None for older uploads)
+            "height": photo['height'],
+            "duration_ms": photo['duration_ms'],
+            "has_thumbnail": bool(photo['has_thumbnail']),
+            "has_preview": bool(photo['has_preview']),
+            "duplicate_of": photo['duplicate_of'], # Earlier item this one (nearly) duplicates
+            "restore_status": restore_status(photo), # 'archived'/'restoring': original needs /request-restore
+            "uploader_id": photo['uploader_id'],
+            "uploaded_by": photo['username'],
+            "user_avatar": user_avatar_url, # S3 Link for avatar
+            "date": photo['upload_date'].isoformat() + 'Z'
+        }
+
+        if not lazy:
+            original_url = signed.get(filename)
+            # If generating URL fails (e.g., file deleted manually from S3), use a placeholder or handle gracefully
+            if not original_url: 
+                original_url = "" # Frontend should handle empty URL
+            if not thumbnail_url:
+                item['thumbnail'] = original_url
+            item['url'] = original_url # S3 Link
+
+        photo_list.append(item)
+    return photo_list
+
+def parse_page_limit(value, maximum=MAX_PHOTOS_PAGE):
+    """Page size from a query parameter: None when absent, ValueError when not a positive integer."""
+    if value is None:
+        return None
+    limit = int(value)
+    if limit <= 0:
+        raise ValueError("limit must be positive")
+    return min(limit, maximum)
+
+# --- HELPER: SHARED GROUP LISTING ---
+# The whole listing of a group (signed) is built once per group version and filter and shared by
+# every viewer; each viewer's hidden items and blocked uploaders are removed on top. When an upload
+# notifies a large group, concurrent misses in a worker wait for one build (cache.py SingleFlight)
+# instead of each running the query and the signing loop. Listings longer than
+# LISTING_CACHE_MAX_ITEMS are served by the per-viewer query instead.
+# The tier is bounded by approximate bytes per worker (a full listing is several MB) and stays local:
+# listings are rebuilt cheaply per worker and are too large to move through Redis on every hit.
+LISTING_CACHE_SIZE = int(os.getenv('LISTING_CACHE_SIZE', '200'))
+LISTING_CACHE_MAX_ITEMS = int(os.getenv('LISTING_CACHE_MAX_ITEMS', '2000'))
+LISTING_CACHE_MB = int(os.getenv('LISTING_CACHE_MB', '64'))
+listing_cache = ResponseCache(size=LISTING_CACHE_SIZE, redis_url=None, max_bytes=LISTING_CACHE_MB * 1024 * 1024)
+
+def load_group_listing(cursor, group_id, group_version, media_type=None, hide_duplicates=False):
+    """
+    Listing entries of the whole group, newest first: {'item', 'thumbnail', 'key': [date, id]}.
+    item is the non-lazy listing item; thumbnail is the plain thumbnail URL for lazy listings.
+    :return: the entries, or None when the group is too large to cache (or does not exist)
+    """
+    if group_version is None:
+        return None
+    def load():
+        sql = f"""
+            {LISTING_SELECT}
+            WHERE photos.group_id = %s
+            {"AND photos.media_type = %s" if media_type else ""}
+            {"AND mh.duplicate_of IS NULL" if hide_duplicates else ""}
+            ORDER BY photos.upload_date DESC, photos.id DESC
+            LIMIT %s
+        """
+        cursor.execute(sql, (group_id,) + ((media_type,) if media_type else ()) + (LISTING_CACHE_MAX_ITEMS + 1,))
+        rows = cursor.fetchall()
+        if len(rows) > LISTING_CACHE_MAX_ITEMS:
+            return {"too_large": True}
+        signed = sign_media_urls(rows, group_id, include_originals=True)
+        return {"entries": [
+            {"item": item, "thumbnail": signed.get(get_thumbnail_key(row['file_name'])),
+             "key": [row['upload_date'].strftime(CURSOR_DATE_FORMAT), row['id']]}
+            for row, item in zip(rows, build_photo_items(rows, signed))
+        ]}
+    key = f"group-listing:{group_id}:{group_version}:{media_type or 'all'}:{int(hide_duplicates)}"
+    return listing_cache.get_or_load(key, load).get('entries')
+
+def page_group_listing(entries, hidden_ids, blocked, limit=None, before=None, lazy=False):
+    """
+    One page of a shared listing for a viewer. Same items and cursors as fetch_group_photos.
+    :return: (items, next cursor or None)
+    """
+    before_key = [before[0].strftime(CURSOR_DATE_FORMAT), before[1]] if before else None
+    items = []
+    last_key = None
+    for entry in entries:
+        if before_key and entry['key'] >= before_key:
+            continue
+        item = entry['item']
+        if item['id'] in hidden_ids or item['uploader_id'] in blocked:
+            continue
+        if limit and len(items) == limit:
+            return items, f"{last_key[0]}-{last_key[1]}"
+        if lazy:
+            item = {k: v for k, v in item.items() if k != 'url'}
+            item['thumbnail'] = entry['thumbnail']
+        items.append(item)
+        last_key = entry['key']
+    return items, None
+
+def list_group_media(cursor, group_id, user_id, media_type=None, hide_duplicates=False, limit=None, before=None,
+                     lazy=False, versions=None):
+    """
+    Listing items of the group for the viewer (caller checked membership), from the shared listing
+    when the group is small enough, else from the per-viewer query.
+    versions: (group, block) versions if the caller already read them (get_cache_versions).
+    :return: (items, next cursor or None)
+    """
+    group_version, block_version = versions or get_cache_versions(cursor, group_id, user_id)
+    entries = load_group_listing(cursor, group_id, group_version, media_type, hide_duplicates)
+    if entries is not None:
+        blocked = blocked_uploaders(load_viewer_blocks(cursor, user_id, block_version))
+        return page_group_listing(entries, load_hidden_ids(cursor, user_id, group_id), blocked, limit, before, lazy)
+
+    photos = fetch_group_photos(cursor, group_id, user_id, media_type, hide_duplicates, limit, before)
+    next_cursor = None
+    if limit and len(photos) > limit:
+        photos = photos[:limit]
+        next_cursor = encode_photos_cursor(photos[-1])
+    signed = sign_media_urls(photos, group_id, include_originals=not lazy)
+    return build_photo_items(photos, signed, lazy), next_cursor
+
 # ==========================================
 # GET GROUP PHOTOS (S3 PRESIGNED URLS)
 # ==========================================
 @photos_bp.route('/group-photos', methods=['GET'])
 def get_group_photos():
+    """
+    Lists the group's media for the viewer.
+    lazy=1 returns ids and thumbnail URLs only; originals are fetched on demand via /resolve-media.
+    type=image|video filters by media type (served by idx_photos_group_type_date).
+    hide_duplicates=1 leaves out items the media worker flagged as (near-)duplicates of an earlier one.
+    limit=N returns one page (the whole listing without it); the X-Next-Cursor header, passed back
+    as cursor=, fetches the next one.
+    """
     group_id = request.args.get('group_id')
     user_id = request.args.get('user_id')
+    lazy = request.args.get('lazy') == '1'
+    media_type = request.args.get('type')
+    hide_duplicates = request.args.get('hide_duplicates') == '1'
+    page_cursor = request.args.get('cursor')
 
     if not group_id or not user_id:
         return jsonify({"error": "group_id and user_id are required"}), 400
+    if media_type and media_type not in MEDIA_TYPES:
+        return jsonify({"error": "type must be 'image' or 'video'"}), 400
+    try:
+        limit = parse_page_limit(request.args.get('limit'))
+    except ValueError:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    before = decode_photos_cursor(page_cursor) if page_cursor else None
+    if page_cursor and not before:
+        return jsonify({"error": "Invalid cursor"}), 400
 
     try:
-        conn = get_db_connection()
+        # Listing is read-only: serve it from the replica
+        conn = get_read_connection(user_id)
+        cursor = conn.cursor(dictionary=True)
+
+        if not is_member(cursor, user_id, group_id):
+            cursor.close(); conn.close()
+            return jsonify({"error": "Unauthorized"}), 403
+
+        # --- LISTING WITH MEDIA URLS (shared per group version, see list_group_media) ---
+        photo_list, next_cursor = list_group_media(cursor, group_id, user_id, media_type, hide_duplicates, limit, before, lazy)
+
+        cursor.close(); conn.close()
+        response = jsonify(photo_list)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        if is_cdn_mode():
+            # Membership was just checked: refresh the group grant with the listing (one signature per prefix)
+            grants, expires = create_group_grant(group_id)
+            attach_grant_cookies(response, grants, expires)
+        return response, 200
+    except Exception as e:
+        print(f"Get Photos Error: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+# ==========================================
+# RESOLVE MEDIA (ON-DEMAND ORIGINAL URLS)
+# ==========================================
+MAX_RESOLVE_MEDIA = 50
+
+def parse_photo_ids(value, max_count=MAX_RESOLVE_MEDIA):
+    """:return: value as a list of positive int ids (at most max_count), or None if it is anything else"""
+    if not isinstance(value, list) or not value or len(value) > max_count:
+        return None
+    if any(isinstance(v, bool) or not isinstance(v, int) or v <= 0 for v in value):
+        return None
+    return list(dict.fromkeys(value))
+
+@photos_bp.route('/resolve-media', methods=['POST'])
+def resolve_media():
+    """
+    Returns signed original/thumbnail URLs for up to MAX_RESOLVE_MEDIA photo ids the client is about to display.
+    Membership is checked once, visibility (group, blocked) in a single query and hidden items in process.
+    Archived originals come back with an empty url and their restore_status (see /request-restore).
+    Body: {"user_id": 1, "group_id": 2, "photo_ids": [10, 11]}
+    """
+    data = request.get_json(silent=True) or {}
+    user_id = data.get('user_id')
+    group_id = data.get('group_id')
+
+    if not user_id or not group_id or not data.get('photo_ids'):
+        return jsonify({"error": "Missing fields"}), 400
+    photo_ids = parse_photo_ids(data.get('photo_ids'))
+    if photo_ids is None:
+        return jsonify({"error": f"photo_ids must be a list of at most {MAX_RESOLVE_MEDIA} photo ids"}), 400
+
+    try:
+        conn = get_read_connection(user_id)
         cursor = conn.cursor(dictionary=True)
 
-        cursor.execute("SELECT id FROM groups_members WHERE user_id = %s AND group_id = %s", (user_id, group_id))
-        if not cursor.fetchone():
+        if not is_member(cursor, user_id, group_id):
             cursor.close(); conn.close()
             return jsonify({"error": "Unauthorized"}), 403
 
-        sql = """
-            SELECT photos.id, photos.file_name, photos.upload_date, 
-                   photos.user_id as uploader_id, 
-                   users.username, users.profile_image
-            FROM photos 
-            JOIN users ON photos.user_id = users.id 
-            WHERE photos.group_id = %s 
-            AND photos.id NOT IN (SELECT photo_id FROM hidden_photos WHERE user_id = %s)
-            AND photos.user_id NOT IN (
-                SELECT blocked_id FROM blocked_users WHERE blocker_id = %s
-                UNION
-                SELECT blocked_id FROM blocked_users WHERE blocked_id = %s
-            )
-            ORDER BY photos.upload_date DESC
+        format_strings = ','.join(['%s'] * len(photo_ids))
+        sql = f"""
+            SELECT photos.id, photos.file_name, photos.media_type,
+                   photos.archived_at, photos.restore_requested_at, photos.restored_until
+            FROM photos
+            WHERE photos.id IN ({format_strings})
+            AND {VISIBLE_PHOTOS_FILTER}
         """
-        cursor.execute(sql, (group_id, user_id, user_id, user_id))
+        cursor.execute(sql, tuple(photo_ids) + (group_id, user_id, user_id))
         photos = cursor.fetchall()
+        hidden_ids = load_hidden_ids(cursor, user_id, group_id)
+        photos = [photo for photo in photos if photo['id'] not in hidden_ids]
+        cursor.close(); conn.close()
 
-        photo_list = []
+        signed = sign_media_urls(photos, group_id, include_avatars=False)
+
+        media = []
         for photo in photos:
             filename = photo['file_name']
-            if filename.startswith('media/'):
-                # New system: 'media/abc.jpg' -> 'thumbs/abc.jpg'
-                thumb_filename = filename.replace('media/', 'thumbs/')
-            else:
-                # Old system: 'abc.jpg' -> 'thumb_abc.jpg'
-                thumb_filename = f"thumb_{filename}"
-            
-            # --- GENERATE PRESIGNED URLS ---
-            # This generates a secure, temporary link (valid for 15 mins)
-            original_url = get_presigned_url(filename)
-            thumbnail_url = get_presigned_url(thumb_filename)
-            
-            # If generating URL fails (e.g., file deleted manually from S3), use a placeholder or handle gracefully
-            if not original_url: 
-                original_url = "" # Frontend should handle empty URL
-            if not thumbnail_url:
-                thumbnail_url = original_url 
-
-            # Handle User Avatar (Profile Pic) Presigned URL
-            user_avatar_url = None
-            if photo['profile_image']:
-                 user_avatar_url = get_presigned_url(photo['profile_image'])
-            
-            ext = filename.rsplit('.', 1)[1].lower()
-            media_type = 'video' if ext in ['mp4', 'mov', 'avi', 'm4v'] else 'image'
-
-            photo_list.append({
+            original_url = signed.get(filename) or ""
+            media.append({
                 "id": photo['id'],
-                "url": original_url,        # S3 Link
-                "thumbnail": thumbnail_url, # S3 Link
-                "type": media_type,
-                "uploader_id": photo['uploader_id'],
-                "uploaded_by": photo['username'],
-                "user_avatar": user_avatar_url, # S3 Link for avatar
-                "date": photo['upload_date'].isoformat() + 'Z'
+                "url": original_url,
+                "thumbnail": signed.get(get_thumbnail_key(filename)) or original_url,
+                "type": photo['media_type'],
+                "restore_status": restore_status(photo)
             })
 
+        found = {photo['id'] for photo in photos}
+        missing = [pid for pid in photo_ids if int(pid) not in found]
+        return jsonify({"media": media, "missing": missing}), 200
+    except Exception as e:
+        print(f"Resolve Media Error: {e}")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+# ==========================================
+# REQUEST RESTORE (ARCHIVED ORIGINALS)
+# ==========================================
+@photos_bp.route('/request-restore', methods=['POST'])
+@limiter.limit("20 per minute")
+def request_restore():
+    """
+    Starts restores of archived originals the viewer wants to open or save (up to MAX_RESOLVE_MEDIA ids).
+    A restore takes minutes to hours depending on RESTORE_TIER; the group gets a media_restored event
+    when the originals are readable, after which /resolve-media signs them.
+    Body: {"user_id": 1, "group_id": 2, "photo_ids": [10, 11]}
+    """
+    data = request.get_json(silent=True) or {}
+    user_id = data.get('user_id')
+    group_id = data.get('group_id')
+
+    if not user_id or not group_id or not data.get('photo_ids'):
+        return jsonify({"error": "Missing fields"}), 400
+    photo_ids = parse_photo_ids(data.get('photo_ids'))
+    if photo_ids is None:
+        return jsonify({"error": f"photo_ids must be a list of at most {MAX_RESOLVE_MEDIA} photo ids"}), 400
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        if not is_member(cursor, user_id, group_id):
+            cursor.close(); conn.close()
+            return jsonify({"error": "Unauthorized"}), 403
+
+        format_strings = ','.join(['%s'] * len(photo_ids))
+        cursor.execute(f"""
+            SELECT photos.id, photos.file_name, photos.archived_at, photos.restore_requested_at, photos.restored_until
+            FROM photos
+            WHERE photos.id IN ({format_strings})
+            AND {VISIBLE_PHOTOS_FILTER}
+        """, tuple(photo_ids) + (group_id, user_id, user_id))
+        photos = cursor.fetchall()
+        hidden_ids = load_hidden_ids(cursor, user_id, group_id)
+        photos = [photo for photo in photos if photo['id'] not in hidden_ids]
+
+        statuses = request_restores(cursor, photos)
+        if any(statuses[photo['id']] != restore_status(photo) for photo in photos):
+            # Listings show the new restore status
+            bump_group_version(cursor, group_id)
+        conn.commit()
         cursor.close(); conn.close()
-        return jsonify(photo_list), 200
+
+        media = [{"id": photo_id, "restore_status": status} for photo_id, status in statuses.items()]
+        missing = [pid for pid in photo_ids if int(pid) not in statuses]
+        return jsonify({"media": media, "missing": missing}), 200
     except Exception as e:
-        print(f"Get Photos Error: {e}")
+        print(f"Request Restore Error: {e}")
         return jsonify({"error": "Internal Server Error"}), 500
 
 # ==========================================
@@ -272,17 +659,17 @@ def bulk_action():
         cursor = conn.cursor(dictionary=True)
 
         if action_type == 'hide':
-            values = [(user_id, pid) for pid in photo_ids]
-            sql = "INSERT IGNORE INTO hidden_photos (user_id, photo_id) VALUES (%s, %s)"
-            cursor.executemany(sql, values)
+            hide_photos(cursor, user_id, photo_ids)
             conn.commit()
+            mark_user_write(user_id)
             cursor.close(); conn.close()
             return jsonify({"message": "Photos hidden successfully"}), 200
 
         elif action_type == 'delete':
-            # Get filenames BEFORE deleting from DB
+            # Get filenames BEFORE deleting from DB (locked: a concurrent delete waits, then finds nothing)
             format_strings = ','.join(['%s'] * len(photo_ids))
-            cursor.execute(f"SELECT id, file_name, user_id FROM photos WHERE id IN ({format_strings})", tuple(photo_ids))
+            cursor.execute(f"SELECT id, file_name, user_id, group_id, blob_id FROM photos WHERE id IN ({format_strings}) FOR UPDATE",
+                           tuple(photo_ids))
             photos_to_delete = cursor.fetchall()
 
             for photo in photos_to_delete:
@@ -290,20 +677,19 @@ def bulk_action():
                     cursor.close(); conn.close()
                     return jsonify({"error": "Unauthorized: You do not own all selected photos"}), 403
 
-            # Delete from DB
-            cursor.execute(f"DELETE FROM photos WHERE id IN ({format_strings})", tuple(photo_ids))
+            # Delete from DB (shared blobs lose one reference per deleted photo)
+            released_keys = []
+            if photos_to_delete:
+                locked_strings = ','.join(['%s'] * len(photos_to_delete))
+                cursor.execute(f"DELETE FROM photos WHERE id IN ({locked_strings})", tuple(p['id'] for p in photos_to_delete))
+                released_keys = release_photos(cursor, photos_to_delete)
+            bump_group_version(cursor, [p['group_id'] for p in photos_to_delete])
+            publish_photos_removed(cursor, photos_to_delete)
             conn.commit()
+            mark_user_write(user_id)
 
-            # Delete from S3
-            for photo in photos_to_delete:
-                filename = photo['file_name']
-                if filename.startswith('media/'):
-                    thumb_filename = filename.replace('media/', 'thumbs/')
-                else:
-                    thumb_filename = f"thumb_{filename}"
-                    
-                delete_file_from_s3(filename)
-                delete_file_from_s3(thumb_filename)
+            # Delete unreferenced objects from S3 (originals and renditions in batched requests)
+            delete_media_from_s3(released_keys)
 
             cursor.close(); conn.close()
             return jsonify({"message": "Photos deleted successfully"}), 200
@@ -324,7 +710,8 @@ def delete_photo():
     try:
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT file_name, user_id FROM photos WHERE id = %s", (photo_id,))
+        # Locked: a concurrent delete of the same photo waits, then gets 404 instead of releasing its blob again
+        cursor.execute("SELECT file_name, user_id, group_id, blob_id FROM photos WHERE id = %s FOR UPDATE", (photo_id,))
         photo = cursor.fetchone()
         
         if not photo:
@@ -333,17 +720,14 @@ def delete_photo():
             cursor.close(); conn.close(); return jsonify({"error": "Unauthorized"}), 403
             
         cursor.execute("DELETE FROM photos WHERE id = %s", (photo_id,))
+        released_keys = release_photos(cursor, [photo]) if cursor.rowcount else []
+        bump_group_version(cursor, photo['group_id'])
+        publish_event(cursor, photo['group_id'], 'photo_removed', {"photo_ids": [int(photo_id)]})
         conn.commit()
+        mark_user_write(user_id)
         
-        # DELETE FROM S3
-        filename = photo['file_name']
-        if filename.startswith('media/'):
-            thumb_filename = filename.replace('media/', 'thumbs/')
-        else:
-            thumb_filename = f"thumb_{filename}"
-            
-        delete_file_from_s3(filename)
-        delete_file_from_s3(thumb_filename)
+        # DELETE FROM S3 (original, thumbnail and preview) unless another group still shares the blob
+        delete_media_from_s3(released_keys)
         
         cursor.close(); conn.close()
         return jsonify({"message": "Deleted"}), 200
@@ -371,6 +755,7 @@ def report_content():
         uploader_id = result[0]
         sql = "INSERT INTO content_reports (reporter_id, uploader_id, photo_id, reason) VALUES (%s, %s, %s, %s)"
         cursor.execute(sql, (reporter_id, uploader_id, photo_id, reason))
+        refresh_report_queue(cursor, [photo_id])
         conn.commit()
         cursor.close(); conn.close()
         return jsonify({"message": "Reported successfully"}), 201
@@ -381,6 +766,161 @@ def report_content():
 def hide_photo():
     return bulk_action() 
 
+# ==========================================
+# GROUP MEDIA GRANT (CDN SIGNED COOKIES)
+# ==========================================
+@photos_bp.route('/group-media-grant', methods=['GET'])
+def get_group_media_grant():
+    """
+    Issues time-bounded CloudFront cookies for the group's media prefixes (one set per prefix path).
+    The grants are also returned in the body for clients that attach them as a Cookie header:
+    a request for a URL under grant['path'] carries that grant's cookies.
+    """
+    group_id = request.args.get('group_id')
+    user_id = request.args.get('user_id')
+
+    if not group_id or not user_id:
+        return jsonify({"error": "group_id and user_id are required"}), 400
+
+    if not is_cdn_mode():
+        return jsonify({"error": "CDN access mode is not enabled"}), 404
+
+    try:
+        conn = get_read_connection(user_id)
+        cursor = conn.cursor(dictionary=True)
+        member = is_member(cursor, user_id, group_id)
+        cursor.close(); conn.close()
+
+        if not member:
+            return jsonify({"error": "Unauthorized"}), 403
+
+        grants, expires = create_group_grant(group_id)
+        response = jsonify({"grants": grants, "expires": expires})
+        attach_grant_cookies(response, grants, expires)
+        return response, 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# --- HELPERS: DIRECT UPLOAD ---
+ALLOWED_UPLOAD_TYPES = ['image/jpeg', 'image/png', 'image/jpg', 'video/mp4', 'video/quicktime']
+MAX_BATCH_UPLOADS = 100
+
+def create_upload_target(group_id, file_type):
+    """Creates a group-sharded key ('media/g<group_id>/<uuid>.<ext>') and its presigned PUT URL."""
+    ext = file_type.split('/')[-1]
+    unique_name = f"{uuid.uuid4()}.{ext}"
+    object_key = group_media_key(group_id, unique_name)
+    url = generate_presigned_post_url(object_key, file_type)
+    if not url:
+        return None
+    return {"upload_url": url, "file_name": unique_name, "object_key": object_key}
+
+def check_upload_key(file_name, group_id):
+    """Returns an error message if the key may not be confirmed into the group, else None."""
+    # Ensure the user is only confirming files within the allowed media/ directory
+    if not isinstance(file_name, str) or not file_name.startswith('media/'):
+        return "Invalid file path prefix"
+    # Sharded keys must belong to the group they are confirmed into (legacy 'media/<uuid>' keys are still accepted)
+    if file_name.count('/') > 1 and not is_group_media_key(file_name, group_id):
+        return "Invalid file path prefix"
+    return None
+
+def find_confirmed_keys(cursor, group_id, object_keys):
+    """
+    Uploaded keys already confirmed as photos of the group (a retried confirm). Matched on upload_key, because
+    file_name is the blob's key when the upload was reused or merged. :return: set of keys
+    """
+    if not object_keys:
+        return set()
+    format_strings = ','.join(['%s'] * len(object_keys))
+    cursor.execute(f"SELECT upload_key FROM photos WHERE group_id = %s AND upload_key IN ({format_strings})",
+                   (group_id,) + tuple(object_keys))
+    return {row['upload_key'] for row in cursor.fetchall()}
+
+def discard_uploads(cursor, object_keys):
+    """Removes uploaded objects that will not become photos (with any renditions) and their metadata rows."""
+    if not object_keys:
+        return
+    delete_media_from_s3(object_keys)
+    format_strings = ','.join(['%s'] * len(object_keys))
+    cursor.execute(f"DELETE FROM media_metadata WHERE object_key IN ({format_strings})", tuple(object_keys))
+
+def get_remaining_quota(cursor, conn, user_id):
+    """
+    Returns the bytes the user may still upload today (resets the daily counter on a new day).
+    :return: remaining bytes, or None if the user does not exist
+    """
+    sql_user = """
+        SELECT u.daily_usage, u.last_upload_date, p.size_mb 
+        FROM users u
+        LEFT JOIN packets p ON u.packet_id = p.id
+        WHERE u.id = %s
+    """
+    cursor.execute(sql_user, (user_id,))
+    user_stats = cursor.fetchone()
+    if not user_stats:
+        return None
+
+    current_usage = user_stats['daily_usage'] or 0
+    limit_mb = user_stats['size_mb'] or 100 
+    limit_bytes = limit_mb * 1024 * 1024
+
+    today = datetime.utcnow().date()
+    db_date = user_stats['last_upload_date']
+
+    if db_date is None or db_date < today:
+        cursor.execute("UPDATE users SET daily_usage = 0, last_upload_date = %s WHERE id = %s", (today, user_id))
+        conn.commit()
+        current_usage = 0
+
+    return limit_bytes - current_usage
+
+def notify_group_upload(cursor, group_id, user_id, count=1):
+    """Sends one push to the group's members (notifications on) about `count` new items."""
+    sql = """
+        SELECT g.group_name, u.username
+        FROM groups_table g, users u
+        WHERE g.id = %s AND u.id = %s
+    """
+    cursor.execute(sql, (group_id, user_id))
+    names = cursor.fetchone()
+    if not names:
+        return
+
+    sql_members = """
+        SELECT u.push_token 
+        FROM users u
+        JOIN groups_members gm ON u.id = gm.user_id
+        WHERE gm.group_id = %s AND u.id != %s AND u.push_token IS NOT NULL AND gm.notifications = 1
+    """
+    cursor.execute(sql_members, (group_id, user_id))
+    tokens = [m['push_token'] for m in cursor.fetchall()]
+    if tokens:
+        group_name = names['group_name']
+        uploader_name = names['username']
+        if count == 1:
+            body = f"{uploader_name}, {group_name} grubuna medya yükledi"
+        else:
+            body = f"{uploader_name}, {group_name} grubuna {count} medya yükledi"
+        data_payload = {"screen": "MediaGallery", "groupId": group_id}
+        send_expo_push_notification(tokens, group_name, body, data_payload)
+
+# Thumbnails/previews are created asynchronously; the S3 event consumer flips has_thumbnail/has_preview
+INSERT_UPLOAD_SQL = """
+    INSERT INTO photos (file_name, upload_key, blob_id, user_id, group_id, upload_date, media_type, mime_type, size_bytes, width, height, duration_ms)
+    VALUES """
+PHOTO_ROW_PLACEHOLDERS = '(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)'
+
+def build_photo_row(upload_key, blob, user_id, group_id, metadata, hints, upload_date):
+    """
+    Values for INSERT_UPLOAD_SQL from the confirmed key, the photo's blob, the verified object metadata
+    and the client's layout hints.
+    """
+    file_name = blob['object_key']
+    mime_type = metadata.get('content_type')
+    return (file_name, upload_key, blob['blob_id'], user_id, group_id, upload_date, get_media_type(file_name, mime_type), mime_type,
+            metadata['size_bytes'], hints.get('width'), hints.get('height'), hints.get('duration_ms'))
+
 # --- NEW: Generate URL for Direct Upload ---
 @photos_bp.route('/generate-upload-url', methods=['POST'])
 def get_upload_url():
@@ -394,8 +934,7 @@ def get_upload_url():
         return jsonify({"error": "Missing user_id, group_id or file_type"}), 400
 
     # 1. VALIDATE FILE TYPE (Roadmap Security)
-    allowed_types = ['image/jpeg', 'image/png', 'image/jpg', 'video/mp4', 'video/quicktime']
-    if file_type not in allowed_types:
+    if file_type not in ALLOWED_UPLOAD_TYPES:
         return jsonify({"error": "File type not allowed"}), 400
 
     try:
@@ -404,31 +943,57 @@ def get_upload_url():
 
         # 2. VALIDATE GROUP MEMBERSHIP (Roadmap Item #1)
         # Prevents generating a URL for a group the user doesn't belong to
-        cursor.execute("SELECT id FROM groups_members WHERE user_id = %s AND group_id = %s", (user_id, group_id))
-        if not cursor.fetchone():
+        if not is_member(cursor, user_id, group_id):
             cursor.close(); conn.close()
             return jsonify({"error": "You are not a member of this group"}), 403
 
         cursor.close(); conn.close()
 
         # 3. GENERATE KEY AND URL
-        ext = file_type.split('/')[-1]
-        unique_name = f"{uuid.uuid4()}.{ext}"
-        object_key = f"media/{unique_name}" # Key includes 'media/' prefix
-        
-        url = generate_presigned_post_url(object_key, file_type)
-        
-        if url:
-            return jsonify({
-                "upload_url": url, 
-                "file_name": unique_name, 
-                "object_key": object_key
-            }), 200
+        target = create_upload_target(group_id, file_type)
+        if target:
+            return jsonify(target), 200
             
         return jsonify({"error": "Could not generate S3 URL"}), 500
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# --- Batch variant: one membership check for many files ---
+@photos_bp.route('/generate-upload-urls', methods=['POST'])
+def get_upload_urls():
+    """
+    Body: {"user_id": 1, "group_id": 2, "file_types": ["image/jpeg", "video/mp4", ...]}
+    Returns {"uploads": [{upload_url, file_name, object_key}, ...]} in the order of file_types.
+    """
+    data = request.json
+    user_id = data.get('user_id')
+    group_id = data.get('group_id')
+    file_types = data.get('file_types')
+
+    if not user_id or not group_id or not file_types:
+        return jsonify({"error": "Missing user_id, group_id or file_types"}), 400
+    if len(file_types) > MAX_BATCH_UPLOADS:
+        return jsonify({"error": f"At most {MAX_BATCH_UPLOADS} files per request"}), 400
+    if any(t not in ALLOWED_UPLOAD_TYPES for t in file_types):
+        return jsonify({"error": "File type not allowed"}), 400
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        if not is_member(cursor, user_id, group_id):
+            cursor.close(); conn.close()
+            return jsonify({"error": "You are not a member of this group"}), 403
+
+        cursor.close(); conn.close()
+
+        uploads = [create_upload_target(group_id, file_type) for file_type in file_types]
+        if not all(uploads):
+            return jsonify({"error": "Could not generate S3 URL"}), 500
+        return jsonify({"uploads": uploads}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # --- NEW: Confirm Upload, Generate Thumbnail, and Save to DB --
 @photos_bp.route('/confirm-upload', methods=['POST'])
 def confirm_upload():
@@ -436,12 +1001,12 @@ def confirm_upload():
     user_id = data.get('user_id')
     group_id = data.get('group_id')
     file_name = data.get('file_name') # e.g., 'media/uuid.jpg'
-    file_size = data.get('file_size', 0)
+    # Client-reported 'file_size' is ignored: quota uses the size S3 reports for the object
 
     # 0. SECURITY PREFIX CHECK (Roadmap Item #1)
-    # Ensure the user is only confirming files within the allowed media/ directory
-    if not file_name or not file_name.startswith('media/'):
-        return jsonify({"error": "Invalid file path prefix"}), 400
+    key_error = check_upload_key(file_name, group_id)
+    if key_error:
+        return jsonify({"error": key_error}), 400
 
     if not user_id or not group_id or not file_name:
         return jsonify({"error": "Missing data"}), 400
@@ -451,86 +1016,198 @@ def confirm_upload():
         cursor = conn.cursor(dictionary=True)
 
         # --- 1. GROUP MEMBERSHIP CHECK ---
-        cursor.execute("SELECT id FROM groups_members WHERE user_id = %s AND group_id = %s", (user_id, group_id))
-        if not cursor.fetchone():
+        if not is_member(cursor, user_id, group_id):
             cursor.close(); conn.close()
             return jsonify({"error": "You are not a member of this group"}), 403
 
-        # --- 2. DAILY USAGE LIMIT CHECK ---
-        sql_user = """
-            SELECT u.daily_usage, u.last_upload_date, p.size_mb 
-            FROM users u
-            LEFT JOIN packets p ON u.packet_id = p.id
-            WHERE u.id = %s
-        """
-        cursor.execute(sql_user, (user_id,))
-        user_stats = cursor.fetchone()
-
-        if not user_stats:
+        # --- 1.4 RETRIED CONFIRM ---
+        # The key is already a photo of the group: nothing to store, charge or delete
+        if find_confirmed_keys(cursor, group_id, [file_name]):
             cursor.close(); conn.close()
-            return jsonify({"error": "User not found"}), 404
-
-        current_usage = user_stats['daily_usage'] or 0
-        limit_mb = user_stats['size_mb'] or 100 
-        limit_bytes = limit_mb * 1024 * 1024
+            return jsonify({"message": "File already confirmed", "filename": file_name}), 200
 
-        today = datetime.utcnow().date()
-        db_date = user_stats['last_upload_date']
-
-        if db_date is None or db_date < today:
-            cursor.execute("UPDATE users SET daily_usage = 0, last_upload_date = %s WHERE id = %s", (today, user_id))
+        # --- 1.5 UPLOAD VERIFICATION ---
+        # Authoritative size from media_metadata (S3 event consumer) or a single HEAD request
+        metadata = verify_upload(cursor, file_name)
+        if not metadata:
+            cursor.close(); conn.close()
+            return jsonify({"error": "Uploaded file not found"}), 400
+        file_size = metadata['size_bytes']
+
+        # --- 1.6 EXACT DUPLICATE SKIP ---
+        # Same bytes already in the group (ETag + size): keep the existing item, do not store or charge again
+        duplicate = find_exact_duplicate(cursor, group_id, file_name, metadata)
+        if duplicate:
+            discard_uploads(cursor, [file_name])
             conn.commit()
-            current_usage = 0
+            cursor.close(); conn.close()
+            return jsonify({"message": "Already in this group", "filename": file_name, "duplicate_of": duplicate['id']}), 200
 
-        if (current_usage + file_size) > limit_bytes:
+        # --- 2. DAILY USAGE LIMIT CHECK ---
+        remaining = get_remaining_quota(cursor, conn, user_id)
+        if remaining is None:
+            cursor.close(); conn.close()
+            return jsonify({"error": "User not found"}), 404
+
+        if file_size > remaining:
             # Delete the file that frontend just uploaded to S3
-            delete_file_from_s3(file_name)
+            discard_uploads(cursor, [file_name])
+            conn.commit()
             cursor.close(); conn.close()
             return jsonify({"error": "LIMIT_EXCEEDED_STORAGE"}), 403
         # --------------------------------------------------------
 
-        # 3. Extract just the UUID from the path for local temp processing (e.g., 'media/abc.jpg' -> 'abc.jpg')
-        clean_filename = file_name.split('/')[-1]
-
-        # 4. Thumbnail generation is now handled asynchronously by AWS Lambda.
+        # 3. Thumbnail generation is handled asynchronously by AWS Lambda.
         # No local processing needed here.
 
+        # 4. Content-addressed storage: identical bytes already stored (e.g. shared into another group)
+        # are referenced instead of kept twice
+        blob = acquire_blobs(cursor, {file_name: metadata})[file_name]
+        if blob['object_key'] != file_name:
+            discard_uploads(cursor, [file_name])
+
         # 5. Save to DB
         # --- FIX: Save the FULL path ('media/uuid.jpg') to DB so get_group_photos knows where it is! ---
-        sql = "INSERT INTO photos (file_name, user_id, group_id, upload_date) VALUES (%s, %s, %s, %s)"
-        cursor.execute(sql, (file_name, user_id, group_id, datetime.utcnow()))
+        cursor.execute(INSERT_UPLOAD_SQL + PHOTO_ROW_PLACEHOLDERS,
+                       build_photo_row(file_name, blob, user_id, group_id, metadata, parse_media_hints(data), datetime.utcnow()))
+        sync_rendition_flags(cursor, [blob['object_key']])
+        inherit_blob_renditions(cursor, [blob['blob_id']])
         
         # Update Usage
         cursor.execute("UPDATE users SET daily_usage = daily_usage + %s WHERE id = %s", (file_size, user_id))
+        bump_group_version(cursor, group_id)
+        publish_event(cursor, group_id, 'photo_added', {"user_id": int(user_id), "count": 1})
         conn.commit()
+        mark_user_write(user_id)
 
         # 6. Push Notifications
-        cursor.execute("SELECT group_name FROM groups_table WHERE id = %s", (group_id,))
-        group_row = cursor.fetchone()
-        cursor.execute("SELECT username FROM users WHERE id = %s", (user_id,))
-        user_row = cursor.fetchone()
-
-        if group_row and user_row:
-            group_name = group_row['group_name']
-            uploader_name = user_row['username']
-            sql_members = """
-                SELECT u.push_token 
-                FROM users u
-                JOIN groups_members gm ON u.id = gm.user_id
-                WHERE gm.group_id = %s AND u.id != %s AND u.push_token IS NOT NULL AND gm.notifications = 1
-            """
-            cursor.execute(sql_members, (group_id, user_id))
-            members = cursor.fetchall()
-            tokens = [m['push_token'] for m in members]
-            if tokens:
-                title = group_name
-                body = f"{uploader_name}, {group_name} grubuna medya yükledi"
-                data_payload = {"screen": "MediaGallery", "groupId": group_id}
-                send_expo_push_notification(tokens, title, body, data_payload)
+        notify_group_upload(cursor, group_id, user_id)
         
         cursor.close(); conn.close()
+        # The stored key may be another group's object (shared blob): it stays internal
         return jsonify({"message": "File confirmed and saved successfully", "filename": file_name}), 201
 
     except Exception as e:
         print(f"Confirm Upload Error: {e}")
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+# --- Batch variant: one insert, one quota update, one push ---
+@photos_bp.route('/confirm-uploads', methods=['POST'])
+def confirm_uploads():
+    """
+    Body: {"user_id": 1, "group_id": 2, "file_names": ["media/g2/a.jpg", ...]}
+    Entries may also be objects with layout hints: {"file_name": "media/g2/a.jpg", "width": 1080, "height": 1920, "duration_ms": 0}
+    Files are accepted in order while they fit the daily quota; the rest are deleted from S3.
+    Exact duplicates are deleted and listed under "duplicates" (not charged against the quota).
+    Keys an earlier attempt already saved are listed as confirmed again (safe to retry).
+    Returns {"confirmed": [...], "rejected": [{"file_name", "error"}], "duplicates": [...]} (403 LIMIT_EXCEEDED_STORAGE if nothing fit).
+    """
+    data = request.json
+    user_id = data.get('user_id')
+    group_id = data.get('group_id')
+    file_names = data.get('file_names')
+
+    if not user_id or not group_id or not file_names:
+        return jsonify({"error": "Missing data"}), 400
+    if not isinstance(file_names, list):
+        return jsonify({"error": "file_names must be a list"}), 400
+    if len(file_names) > MAX_BATCH_UPLOADS:
+        return jsonify({"error": f"At most {MAX_BATCH_UPLOADS} files per request"}), 400
+
+    file_names = [item.get('file_name') if isinstance(item, dict) else item for item in file_names]
+    hints = {}
+    rejected = []
+    candidates = []
+    for item, file_name in zip(data.get('file_names'), file_names):
+        key_error = check_upload_key(file_name, group_id)
+        if key_error:
+            rejected.append({"file_name": file_name, "error": key_error})
+        elif file_name not in hints:
+            hints[file_name] = parse_media_hints(item) if isinstance(item, dict) else {}
+            candidates.append(file_name)
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        if not is_member(cursor, user_id, group_id):
+            cursor.close(); conn.close()
+            return jsonify({"error": "You are not a member of this group"}), 403
+
+        # Keys saved by an earlier attempt of this request are reported as confirmed and left untouched
+        already_confirmed = find_confirmed_keys(cursor, group_id, candidates)
+        requested = candidates
+        candidates = [file_name for file_name in candidates if file_name not in already_confirmed]
+
+        # Verify all objects: one SELECT, HEADs only for keys the event consumer has not recorded
+        metadata = verify_uploads(cursor, candidates)
+
+        # Exact duplicates (of the group's items or of an earlier file in this batch) are not stored again
+        duplicates = find_exact_duplicates(cursor, group_id, metadata)
+
+        remaining = get_remaining_quota(cursor, conn, user_id)
+        if remaining is None:
+            cursor.close(); conn.close()
+            return jsonify({"error": "User not found"}), 404
+
+        confirmed = []
+        over_limit = []
+        accepted = {}  # (etag, size) -> first accepted key, for repeats inside the batch
+        total_size = 0
+        for file_name in candidates:
+            if file_name not in metadata:
+                rejected.append({"file_name": file_name, "error": "Uploaded file not found"})
+                continue
+            signature = (metadata[file_name].get('etag'), metadata[file_name]['size_bytes'])
+            duplicate = duplicates.get(file_name)
+            if duplicate and duplicate['id'] is None:
+                # A repeat of an earlier file of this batch only counts if that file was accepted
+                if signature in accepted:
+                    duplicates[file_name] = {"id": None, "file_name": accepted[signature]}
+                    continue
+                del duplicates[file_name]
+            elif duplicate:
+                continue
+            size = metadata[file_name]['size_bytes']
+            if total_size + size > remaining:
+                over_limit.append(file_name)
+                rejected.append({"file_name": file_name, "error": "LIMIT_EXCEEDED_STORAGE"})
+                continue
+            total_size += size
+            confirmed.append(file_name)
+            accepted.setdefault(signature, file_name)
+
+        # Content-addressed storage: files already stored elsewhere reference the existing blob
+        blobs = acquire_blobs(cursor, {file_name: metadata[file_name] for file_name in confirmed})
+        reused = [file_name for file_name in confirmed if blobs[file_name]['object_key'] != file_name]
+
+        discard_uploads(cursor, over_limit + list(duplicates) + reused)
+
+        if confirmed:
+            now = datetime.utcnow()
+            placeholders = ','.join([PHOTO_ROW_PLACEHOLDERS] * len(confirmed))
+            rows = [build_photo_row(file_name, blobs[file_name], user_id, group_id, metadata[file_name], hints.get(file_name, {}), now)
+                    for file_name in confirmed]
+            cursor.execute(INSERT_UPLOAD_SQL + placeholders, tuple(v for row in rows for v in row))
+            sync_rendition_flags(cursor, [blobs[file_name]['object_key'] for file_name in confirmed])
+            inherit_blob_renditions(cursor, [blobs[file_name]['blob_id'] for file_name in reused])
+            cursor.execute("UPDATE users SET daily_usage = daily_usage + %s WHERE id = %s", (total_size, user_id))
+            bump_group_version(cursor, group_id)
+            publish_event(cursor, group_id, 'photo_added', {"user_id": int(user_id), "count": len(confirmed)})
+        conn.commit()
+
+        if confirmed:
+            mark_user_write(user_id)
+            notify_group_upload(cursor, group_id, user_id, len(confirmed))
+
+        cursor.close(); conn.close()
+
+        if not confirmed and not already_confirmed and over_limit:
+            return jsonify({"error": "LIMIT_EXCEEDED_STORAGE", "confirmed": [], "rejected": rejected}), 403
+        saved = set(confirmed) | already_confirmed
+        skipped = [{"file_name": k, "duplicate_of": d['id']} for k, d in duplicates.items()]
+        return jsonify({"confirmed": [k for k in requested if k in saved], "rejected": rejected, "duplicates": skipped}), 201
+
+    except Exception as e:
+        print(f"Confirm Uploads Error: {e}")
+        return jsonify({"error": str(e)}), 500
@@ -1,25 +1,60 @@
 import os
-import boto3
+import threading
+from email.utils import parsedate_to_datetime
 from botocore.exceptions import NoCredentialsError, ClientError
 from dotenv import load_dotenv
 
+from presigner import SigV4Presigner
+
 load_dotenv()
 
 # --- AWS CONFIGURATION ---
 BUCKET_NAME = os.getenv('AWS_BUCKET_NAME')
 REGION = os.getenv('AWS_REGION', 'eu-north-1') 
+# Optional custom endpoint (e.g. a local S3 stand-in such as MinIO)
+ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL') or None
+
+# --- S3 CLIENT ---
+# Created on first use: importing boto3 and building a client costs noticeable time and memory,
+# and a client created before gunicorn forks must not be shared by the workers.
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+def get_s3_client():
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                import boto3
+                _s3_client = boto3.client(
+                    's3',
+                    region_name=REGION,
+                    endpoint_url=ENDPOINT_URL
+                )
+    return _s3_client
+
+# --- LOCAL PRESIGNER ---
+# Signs URLs without going through boto3 per call; falls back to boto3 when unsupported or on error.
+_presigner = None
+_presigner_lock = threading.Lock()
 
-# Initialize S3 Client
-s3_client = boto3.client(
-    's3',
-    region_name=REGION
-)
+def _get_presigner():
+    global _presigner
+    if _presigner is None and SigV4Presigner.is_supported(BUCKET_NAME, REGION, ENDPOINT_URL):
+        with _presigner_lock:
+            if _presigner is None:
+                import boto3
+                credentials = boto3.session.Session().get_credentials()
+                if credentials is not None:
+                    _presigner = SigV4Presigner(BUCKET_NAME, REGION, credentials.get_frozen_credentials, ENDPOINT_URL)
+    return _presigner
 
-def upload_file_to_s3(file_name, object_name=None):
+def upload_file_to_s3(file_name, object_name=None, content_type=None):
     """
     Upload a file to an S3 bucket
     :param file_name: File to upload (local path)
     :param object_name: S3 object name. If not specified then file_name is used
+    :param content_type: Optional Content-Type stored with the object
     :return: True if file was uploaded, else False
     """
     if object_name is None:
@@ -28,7 +63,8 @@ def upload_file_to_s3(file_name, object_name=None):
     try:
         # Upload the file
         # ExtraArgs={'ACL': 'private'} is default but good to be explicit if not blocking public access
-        s3_client.upload_file(file_name, BUCKET_NAME, object_name)
+        extra_args = {'ContentType': content_type} if content_type else None
+        get_s3_client().upload_file(file_name, BUCKET_NAME, object_name, ExtraArgs=extra_args)
         print(f"✅ Uploaded to S3: {object_name}")
         return True
     except FileNotFoundError:
@@ -48,8 +84,15 @@ def get_presigned_url(object_name, expiration=900):
     :param expiration: Time in seconds for the presigned URL to remain valid (Default: 15 mins)
     :return: Presigned URL as string. If error, returns None.
     """
+    presigner = _get_presigner()
+    if presigner:
+        try:
+            return presigner.presign(object_name, expiration)
+        except Exception as e:
+            print(f"❌ Local Presign Error (falling back to boto3): {e}")
+
     try:
-        response = s3_client.generate_presigned_url('get_object',
+        response = get_s3_client().generate_presigned_url('get_object',
                                                     Params={'Bucket': BUCKET_NAME,
                                                             'Key': object_name},
                                                     ExpiresIn=expiration)
@@ -58,26 +101,141 @@ def get_presigned_url(object_name, expiration=900):
         print(f"❌ S3 Presign Error: {e}")
         return None
 
+def get_presigned_urls(object_names, expiration=900):
+    """
+    Generate presigned GET URLs for many objects at once (one timestamp and signing key for the batch).
+    :return: dict of object_name -> URL (None for keys that could not be signed)
+    """
+    keys = [k for k in dict.fromkeys(object_names) if k]
+    presigner = _get_presigner()
+    if presigner and keys:
+        try:
+            return dict(zip(keys, presigner.presign_many(keys, expiration)))
+        except Exception as e:
+            print(f"❌ Local Presign Error (falling back to boto3): {e}")
+    return {k: get_presigned_url(k, expiration) for k in keys}
+
+def upload_bytes_to_s3(data, object_name, content_type):
+    """
+    Upload in-memory bytes (e.g. a rendered thumbnail) with an explicit Content-Type.
+    :return: True if uploaded, else False
+    """
+    try:
+        get_s3_client().put_object(Bucket=BUCKET_NAME, Key=object_name, Body=data, ContentType=content_type)
+        print(f"✅ Uploaded to S3: {object_name}")
+        return True
+    except ClientError as e:
+        print(f"❌ S3 Upload Error: {e}")
+        return False
+
+def download_bytes_from_s3(object_name):
+    """
+    Read a whole object into memory (used by background workers).
+    :return: bytes, or None if it could not be read
+    """
+    try:
+        response = get_s3_client().get_object(Bucket=BUCKET_NAME, Key=object_name)
+        return response['Body'].read()
+    except ClientError as e:
+        print(f"❌ S3 Download Error: {e}")
+        return None
+
+def head_object_metadata(object_name):
+    """
+    HEAD an object to read its authoritative size, content type and ETag.
+    :return: dict with size_bytes, content_type, etag; None if the object does not exist
+    """
+    try:
+        response = get_s3_client().head_object(Bucket=BUCKET_NAME, Key=object_name)
+        return {
+            "size_bytes": response['ContentLength'],
+            "content_type": response.get('ContentType'),
+            "etag": response.get('ETag', '').strip('"')
+        }
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        print(f"❌ S3 Head Error: {e}")
+        raise
+
 def delete_file_from_s3(object_name):
     """
     Delete a file from an S3 bucket
     """
     try:
-        s3_client.delete_object(Bucket=BUCKET_NAME, Key=object_name)
+        get_s3_client().delete_object(Bucket=BUCKET_NAME, Key=object_name)
         print(f"🗑️ Deleted from S3: {object_name}")
         return True
     except ClientError as e:
         print(f"❌ S3 Delete Error: {e}")
         return False
 
+def delete_files_from_s3(object_names):
+    """
+    Delete many files from the S3 bucket using batched DeleteObjects calls (1000 keys per request).
+    :return: Number of keys S3 reported as deleted
+    """
+    keys = [k for k in dict.fromkeys(object_names) if k]
+    deleted = 0
+    for i in range(0, len(keys), 1000):
+        chunk = keys[i:i + 1000]
+        try:
+            response = get_s3_client().delete_objects(
+                Bucket=BUCKET_NAME,
+                Delete={'Objects': [{'Key': k} for k in chunk], 'Quiet': False}
+            )
+            deleted += len(response.get('Deleted', []))
+            for err in response.get('Errors', []):
+                print(f"❌ S3 Batch Delete Error: {err.get('Key')} - {err.get('Message')}")
+        except ClientError as e:
+            print(f"❌ S3 Batch Delete Error: {e}")
+    print(f"🗑️ Batch deleted from S3: {deleted} objects")
+    return deleted
+
+def get_thumbnail_key(object_name):
+    """
+    Returns the thumbnail key for a media key.
+    'media/x.jpg' -> 'thumbs/x.jpg', 'pp_media/' -> 'pp_thumbs/', 'gp_media/' -> 'gp_thumbs/', legacy 'x.jpg' -> 'thumb_x.jpg'
+    """
+    for media_prefix, thumb_prefix in (('media/', 'thumbs/'), ('pp_media/', 'pp_thumbs/'), ('gp_media/', 'gp_thumbs/')):
+        if object_name.startswith(media_prefix):
+            return thumb_prefix + object_name[len(media_prefix):]
+    return f"thumb_{object_name}"
+
+def get_preview_key(object_name):
+    """
+    Returns the low-bitrate preview key for a video key.
+    'media/g1/x.mp4' -> 'previews/g1/x.mp4', legacy 'x.mp4' -> 'preview_x.mp4'
+    """
+    if object_name.startswith('media/'):
+        return 'previews/' + object_name[len('media/'):]
+    return f"preview_{object_name}"
+
+
+def get_media_keys(object_name):
+    """All S3 objects of an uploaded media key: the original, its thumbnail/poster and its video preview."""
+    return [object_name, get_thumbnail_key(object_name), get_preview_key(object_name)]
+
+
+def delete_media_from_s3(object_names):
+    """Batch-delete uploaded media keys together with their thumbnails and previews."""
+    return delete_files_from_s3([key for object_name in object_names if object_name for key in get_media_keys(object_name)])
+
 
 def generate_presigned_post_url(object_name, file_type, expiration=3600):
     """
     Generate a presigned URL to allow direct upload (PUT) from the mobile app to S3.
     """
+    presigner = _get_presigner()
+    if presigner:
+        try:
+            return presigner.presign(object_name, expiration, method='PUT', content_type=file_type)
+        except Exception as e:
+            print(f"❌ Local Presign PUT Error (falling back to boto3): {e}")
+
     try:
         # Generate the presigned URL for a PUT request
-        url = s3_client.generate_presigned_url(
+        url = get_s3_client().generate_presigned_url(
             'put_object',
             Params={
                 'Bucket': BUCKET_NAME,
@@ -94,4 +252,56 @@ def generate_presigned_post_url(object_name, file_type, expiration=3600):
     except Exception as e:
         # General catch for other unexpected errors
         print(f"❌ Unexpected Presign Error: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def change_storage_class(object_name, storage_class):
+    """
+    Moves an object to another storage class by copying it onto itself (managed copy, so objects
+    over 5 GB are copied in parts). Metadata and Content-Type are kept.
+    :return: True if the object was rewritten, else False
+    """
+    try:
+        get_s3_client().copy(
+            {'Bucket': BUCKET_NAME, 'Key': object_name}, BUCKET_NAME, object_name,
+            ExtraArgs={'StorageClass': storage_class, 'MetadataDirective': 'COPY'}
+        )
+        print(f"🧊 Moved to {storage_class}: {object_name}")
+        return True
+    except ClientError as e:
+        print(f"❌ S3 Storage Class Error: {e}")
+        return False
+
+def request_object_restore(object_name, days, tier='Standard'):
+    """
+    Asks S3 for a temporary readable copy of an archived object.
+    :return: True if a restore was started or is already running/done, else False
+    """
+    try:
+        get_s3_client().restore_object(
+            Bucket=BUCKET_NAME, Key=object_name,
+            RestoreRequest={'Days': days, 'GlacierJobParameters': {'Tier': tier}}
+        )
+        return True
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == 'RestoreAlreadyInProgress':
+            return True
+        print(f"❌ S3 Restore Error: {e}")
+        return False
+
+def get_restore_expiry(object_name):
+    """
+    Reads the restore state of an archived object from its HEAD response.
+    :return: (finished, expiry datetime or None); (False, None) while the restore runs or if the object is missing
+    """
+    try:
+        response = get_s3_client().head_object(Bucket=BUCKET_NAME, Key=object_name)
+    except ClientError as e:
+        print(f"❌ S3 Head Error: {e}")
+        return False, None
+    # e.g. 'ongoing-request="false", expiry-date="Fri, 21 Dec 2012 00:00:00 GMT"'
+    restore = response.get('Restore') or ''
+    if 'ongoing-request="false"' not in restore:
+        return False, None
+    match = restore.split('expiry-date="', 1)
+    expiry = parsedate_to_datetime(match[1].rstrip('"')) if len(match) == 2 else None
+    return True, expiry.replace(tzinfo=None) if expiry else None
@@ -23,6 +23,7 @@ CREATE TABLE users(
     packet_id INT DEFAULT 2,
     daily_usage BIGINT DEFAULT 0,
     last_upload_date DATETIME,
+    block_version BIGINT NOT NULL DEFAULT 0, -- bumped when the user blocks or is blocked (cache.py keys)
     FOREIGN KEY (packet_id) REFERENCES packets(id)
 );
 
@@ -35,9 +36,16 @@ CREATE TABLE groups_table (
     group_name VARCHAR(255) NOT NULL DEFAULT 'Adsız Grup',
     picture VARCHAR(255) DEFAULT NULL,
     is_joining_active TINYINT(1) DEFAULT 1,
+    content_version BIGINT NOT NULL DEFAULT 0, -- bumped on every visible change (group_versions.py)
     FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
 );
 
+-- Single row; group_codes.next_group_code turns each value into an invite code
+CREATE TABLE group_code_sequence (
+    next_value BIGINT NOT NULL
+);
+INSERT INTO group_code_sequence (next_value) VALUES (0);
+
 CREATE TABLE groups_members(
     id INT AUTO_INCREMENT PRIMARY KEY,
     user_id INT NOT NULL,
@@ -46,27 +54,107 @@ CREATE TABLE groups_members(
     is_admin TINYINT(1) NOT NULL DEFAULT 0,
     notifications TINYINT(1) NOT NULL DEFAULT 1,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE ON UPDATE CASCADE,
-    FOREIGN KEY (group_id) REFERENCES groups_table(id) ON DELETE CASCADE ON UPDATE CASCADE
+    FOREIGN KEY (group_id) REFERENCES groups_table(id) ON DELETE CASCADE ON UPDATE CASCADE,
+    INDEX idx_members_user_group (user_id, group_id, is_admin)
+);
+
+CREATE TABLE membership_changes (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    group_id INT,
+    user_id INT,
+    changed_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    INDEX idx_membership_changes_time (changed_at)
+);
+
+-- Live group events (events.py): fanned out to /group-events streams and replayed after Last-Event-ID
+CREATE TABLE group_events (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    group_id INT NOT NULL,
+    event_type VARCHAR(32) NOT NULL,
+    payload VARCHAR(2048) NOT NULL,
+    created_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    INDEX idx_group_events_time (created_at)
+);
+
+CREATE TABLE media_blobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    object_key VARCHAR(255) NOT NULL UNIQUE,
+    sha256 CHAR(64) UNIQUE,
+    etag VARCHAR(64),
+    size_bytes BIGINT,
+    ref_count INT NOT NULL DEFAULT 0,
+    archiving_since DATETIME DEFAULT NULL, -- set while archive_worker.py copies the object (not shared meanwhile)
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_media_blobs_etag (etag, size_bytes)
 );
 
 CREATE TABLE photos (
     id INT AUTO_INCREMENT PRIMARY KEY,
     file_name VARCHAR(255) NOT NULL,
+    upload_key VARCHAR(255) DEFAULT NULL, -- key the client uploaded and confirmed (file_name moves to the blob's key when reused or merged)
+    blob_id INT,
     user_id INT NOT NULL,
     group_id INT NOT NULL,
     upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    media_type ENUM('image', 'video') NOT NULL DEFAULT 'image',
+    mime_type VARCHAR(100),
+    size_bytes BIGINT,
+    width INT,
+    height INT,
+    duration_ms INT,
+    has_thumbnail TINYINT(1) NOT NULL DEFAULT 0,
+    has_preview TINYINT(1) NOT NULL DEFAULT 0,
+    render_attempts TINYINT NOT NULL DEFAULT 0,
+    hash_attempts TINYINT NOT NULL DEFAULT 0,
+    archive_attempts TINYINT NOT NULL DEFAULT 0,
+    storage_class VARCHAR(32) NOT NULL DEFAULT 'STANDARD', -- storage class of the original (archival.py)
+    archived_at DATETIME DEFAULT NULL,
+    restore_requested_at DATETIME DEFAULT NULL,
+    restored_until DATETIME DEFAULT NULL,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE ON UPDATE CASCADE,
-    FOREIGN KEY (group_id) REFERENCES groups_table(id) ON DELETE CASCADE ON UPDATE CASCADE
+    FOREIGN KEY (group_id) REFERENCES groups_table(id) ON DELETE CASCADE ON UPDATE CASCADE,
+    FOREIGN KEY (blob_id) REFERENCES media_blobs(id) ON DELETE SET NULL,
+    INDEX idx_photos_file_name (file_name),
+    INDEX idx_photos_group_upload_key (group_id, upload_key),
+    INDEX idx_photos_group_type_date (group_id, media_type, upload_date),
+    INDEX idx_photos_group_date (group_id, upload_date, id),
+    INDEX idx_photos_render_queue (media_type, has_preview, render_attempts),
+    INDEX idx_photos_archive (archived_at, upload_date),
+    INDEX idx_photos_restore (restore_requested_at)
 );
 
-CREATE TABLE hidden_photos (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+CREATE TABLE media_metadata (
+    object_key VARCHAR(255) PRIMARY KEY,
+    size_bytes BIGINT NOT NULL,
+    content_type VARCHAR(100),
+    etag VARCHAR(64),
+    verified_at DATETIME NOT NULL,
+    INDEX idx_media_metadata_etag (etag, size_bytes)
+);
+
+CREATE TABLE media_hashes (
+    photo_id INT PRIMARY KEY,
+    group_id INT NOT NULL,
+    sha256 CHAR(64),
+    phash BIGINT UNSIGNED,
+    dhash BIGINT UNSIGNED,
+    duplicate_of INT,
+    hashed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (photo_id) REFERENCES photos(id) ON DELETE CASCADE,
+    FOREIGN KEY (duplicate_of) REFERENCES photos(id) ON DELETE SET NULL,
+    INDEX idx_media_hashes_group (group_id, photo_id, duplicate_of, sha256, phash, dhash)
+);
+
+-- Items a user hid, one compact id set per group (bitmap.py, hidden_sets.py)
+CREATE TABLE hidden_sets (
     user_id INT NOT NULL,
-    photo_id INT NOT NULL,
-    hidden_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    group_id INT NOT NULL,
+    bitmap MEDIUMBLOB NOT NULL,
+    item_count INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, group_id),
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-    FOREIGN KEY (photo_id) REFERENCES photos(id) ON DELETE CASCADE,
-    UNIQUE KEY unique_hide (user_id, photo_id)
+    FOREIGN KEY (group_id) REFERENCES groups_table(id) ON DELETE CASCADE
 );
 
 CREATE TABLE group_requests (
@@ -92,6 +180,16 @@ CREATE TABLE content_reports (
     FOREIGN KEY (uploader_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- One row per reported photo (report_queue.py): the moderation queue pages on idx_report_queue_recent
+CREATE TABLE report_queue (
+    photo_id INT PRIMARY KEY,
+    report_count INT NOT NULL,
+    last_report_id INT NOT NULL,
+    last_reported_at TIMESTAMP NOT NULL,
+    INDEX idx_report_queue_recent (last_reported_at, photo_id),
+    FOREIGN KEY (photo_id) REFERENCES photos(id) ON DELETE CASCADE
+);
+
 CREATE TABLE banned_users (
     id INT AUTO_INCREMENT PRIMARY KEY,
     banned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -0,0 +1,86 @@
+"""
+The archive worker copies an original to the archive tier without holding the blob row lock:
+the blob is marked archiving and committed first, the result is recorded in a second transaction.
+
+    python -m unittest discover -s tests        # from the WmoryBackend directory
+
+The database and S3 are replaced by in-memory fakes.
+"""
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import archive_worker
+
+KEY = 'media/g2/a.jpg'
+CUTOFF = datetime(2025, 1, 1)
+
+
+class FakeConnection:
+    """Records every statement and commit in order; answers the blob and photo state lookups."""
+
+    def __init__(self):
+        self.log = []
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        sql = ' '.join(sql.split())
+        self.log.append(sql)
+        if sql.startswith('SELECT id FROM media_blobs'):
+            self._rows = [{"id": 7}]
+        elif 'MAX(upload_date)' in sql:
+            self._rows = [{"newest": CUTOFF - timedelta(days=1), "has_thumbnail": 1, "archived_at": None}]
+        elif sql.startswith('SELECT DISTINCT group_id'):
+            self._rows = [{"group_id": 2}]
+        else:
+            self._rows = []
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+    def commit(self):
+        self.log.append('COMMIT')
+
+    def rollback(self):
+        self.log.append('ROLLBACK')
+
+
+class ArchiveObjectTest(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = FakeConnection()
+
+    def _archive(self, copied):
+        def copy(key, storage_class):
+            self.conn.log.append('COPY')
+            return copied
+        with mock.patch.object(archive_worker, 'change_storage_class', side_effect=copy):
+            return archive_worker.archive_object(self.conn, self.conn, KEY, CUTOFF)
+
+    def test_copy_runs_between_two_transactions(self):
+        self.assertEqual(self._archive(True), [2])
+        log = self.conn.log
+        copy = log.index('COPY')
+        self.assertEqual(log[copy - 1], 'COMMIT')
+        self.assertTrue(any(s.startswith('UPDATE media_blobs SET archiving_since = %s') for s in log[:copy]))
+        self.assertTrue(log[copy + 1].startswith('UPDATE media_blobs SET archiving_since = NULL'))
+        self.assertTrue(any(s.startswith('UPDATE photos SET storage_class') for s in log[copy:]))
+        self.assertEqual(log[-1], 'COMMIT')
+
+    def test_failed_copy_clears_the_mark(self):
+        self.assertIsNone(self._archive(False))
+        after_copy = self.conn.log[self.conn.log.index('COPY'):]
+        self.assertTrue(after_copy[1].startswith('UPDATE media_blobs SET archiving_since = NULL'))
+        self.assertFalse(any(s.startswith('UPDATE photos SET storage_class') for s in after_copy))
+        self.assertTrue(any(s.startswith('UPDATE photos SET archive_attempts') for s in after_copy))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Retrying /confirm-upload or /confirm-uploads for keys that are already photos of the group
+must not delete or re-insert anything, also when the photo points at a reused blob's key.
+
+    python -m unittest discover -s tests        # from the WmoryBackend directory
+
+The database and S3 are replaced by in-memory fakes.
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+import routes.photos as photos
+from dedup import find_exact_duplicates
+
+GROUP_ID = 2
+KEY = 'media/g2/a.jpg'
+REUSED_KEY = 'media/g2/b.jpg'   # confirmed earlier; its photo's file_name is another upload's key
+METADATA = {"size_bytes": 1024, "content_type": "image/jpeg", "etag": '"0123456789abcdef"'}
+
+
+class FakeCursor:
+    """Answers the photos lookups from a fixed set of confirmed upload keys and records every statement."""
+
+    def __init__(self, upload_keys):
+        self.upload_keys = upload_keys
+        self.statements = []
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        self.statements.append(' '.join(sql.split()))
+        if 'SELECT upload_key FROM photos WHERE group_id' in sql:
+            self._rows = [{"upload_key": k} for k in params[1:] if k in self.upload_keys]
+        else:
+            self._rows = []
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.commits = 0
+
+    def cursor(self, dictionary=False):
+        return self._cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        pass
+
+
+class RetriedConfirmTest(unittest.TestCase):
+
+    def setUp(self):
+        app = Flask(__name__)
+        app.register_blueprint(photos.photos_bp)
+        self.client = app.test_client()
+        self.cursor = FakeCursor({KEY, REUSED_KEY})
+        self.conn = FakeConnection(self.cursor)
+        patches = [
+            mock.patch.object(photos, 'get_db_connection', return_value=self.conn),
+            mock.patch.object(photos, 'is_member', return_value=True),
+            # A reused upload's own object was deleted, so verifying it again fails
+            mock.patch.object(photos, 'verify_upload', side_effect=lambda cursor, key: None if key == REUSED_KEY else dict(METADATA)),
+            mock.patch.object(photos, 'verify_uploads', return_value={}),
+            mock.patch.object(photos, 'get_remaining_quota', return_value=10 ** 9),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.delete_media = mock.patch.object(photos, 'delete_media_from_s3').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def _assert_nothing_changed(self):
+        self.delete_media.assert_not_called()
+        self.assertFalse([s for s in self.cursor.statements if s.startswith(('DELETE', 'INSERT', 'UPDATE'))])
+
+    def test_single_confirm_retry(self):
+        response = self.client.post('/confirm-upload', json={"user_id": 1, "group_id": GROUP_ID, "file_name": KEY})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['filename'], KEY)
+        self.assertNotIn('duplicate_of', response.get_json())
+        self._assert_nothing_changed()
+
+    def test_single_confirm_retry_of_reused_upload(self):
+        response = self.client.post('/confirm-upload', json={"user_id": 1, "group_id": GROUP_ID, "file_name": REUSED_KEY})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['filename'], REUSED_KEY)
+        self._assert_nothing_changed()
+
+    def test_batch_confirm_retry(self):
+        response = self.client.post('/confirm-uploads', json={"user_id": 1, "group_id": GROUP_ID, "file_names": [KEY]})
+        self.assertEqual(response.status_code, 201)
+        body = response.get_json()
+        self.assertEqual(body['confirmed'], [KEY])
+        self.assertEqual(body['duplicates'], [])
+        self._assert_nothing_changed()
+
+    def test_batch_confirm_retry_of_reused_upload(self):
+        response = self.client.post('/confirm-uploads', json={"user_id": 1, "group_id": GROUP_ID, "file_names": [REUSED_KEY]})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['confirmed'], [REUSED_KEY])
+        self.assertEqual(response.get_json()['rejected'], [])
+        self._assert_nothing_changed()
+
+
+class ExactDuplicateQueryTest(unittest.TestCase):
+
+    def test_new_keys_are_not_their_own_duplicates(self):
+        cursor = FakeCursor(set())
+        with mock.patch.object(cursor, 'execute', wraps=cursor.execute) as execute:
+            find_exact_duplicates(cursor, GROUP_ID, {KEY: METADATA})
+        sql, params = execute.call_args_list[0].args
+        self.assertIn('p.file_name NOT IN', sql)
+        self.assertIn(KEY, params)
+
+
+if __name__ == '__main__':
+    unittest.main()
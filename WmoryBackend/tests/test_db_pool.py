@@ -0,0 +1,81 @@
+"""
+Pooled connections a request leaves open (error paths that skip close()) go back to the pool at teardown.
+
+    python -m unittest discover -s tests        # from the WmoryBackend directory
+
+The pool is replaced by an in-memory fake; no database is needed.
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from mysql.connector import pooling
+
+import db
+
+
+class FakePool:
+    """Hands out PooledMySQLConnection objects and records the ones given back."""
+
+    def __init__(self):
+        self.returned = []
+
+    def get_connection(self):
+        conn = object.__new__(pooling.PooledMySQLConnection)
+        conn._cnx = mock.Mock()
+        conn._cnx_pool = self
+        return conn
+
+    @property
+    def reset_session(self):
+        return False
+
+    def add_connection(self, cnx):
+        self.returned.append(cnx)
+
+
+class RequestTeardownTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = FakePool()
+        patcher = mock.patch.object(db, 'get_pool', return_value=self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        app = Flask(__name__)
+        db.init_app(app)
+
+        @app.route('/leak')
+        def leak():
+            try:
+                db.get_db_connection()
+                raise ValueError("query failed")
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+
+        @app.route('/close')
+        def close():
+            db.get_db_connection().close()
+            return jsonify({}), 200
+
+        self.client = app.test_client()
+
+    def test_connection_left_open_returns_to_pool(self):
+        before = db.pool_stats()['closed_at_teardown']
+        self.assertEqual(self.client.get('/leak').status_code, 500)
+        self.assertEqual(len(self.pool.returned), 1)
+        self.assertEqual(db.pool_stats()['closed_at_teardown'], before + 1)
+
+    def test_closed_connection_is_not_returned_twice(self):
+        before = db.pool_stats()['closed_at_teardown']
+        self.assertEqual(self.client.get('/close').status_code, 200)
+        self.assertEqual(len(self.pool.returned), 1)
+        self.assertEqual(db.pool_stats()['closed_at_teardown'], before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+The per-worker stream cap is checked and taken in one locked call, and a closed stream frees its slot.
+
+    python -m unittest discover -s tests        # from the WmoryBackend directory
+
+No database is needed: the poller thread is not started.
+"""
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import events
+
+
+class FakeCursor:
+
+    def execute(self, sql, params=()):
+        pass
+
+    def fetchone(self):
+        return {"last_id": 0}
+
+
+class StreamCapTest(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = events.LocalBroker()
+        patcher = mock.patch.object(self.broker, '_ensure_thread')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_concurrent_subscribes_respect_the_cap(self):
+        results = []
+        barrier = threading.Barrier(8)
+
+        def subscribe():
+            barrier.wait()
+            results.append(self.broker.subscribe([1], FakeCursor(), max_streams=3))
+
+        threads = [threading.Thread(target=subscribe) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len([r for r in results if r is not None]), 3)
+
+    def test_streams_without_groups_count_until_closed(self):
+        first = self.broker.subscribe([], FakeCursor(), max_streams=1)
+        self.assertIsNotNone(first)
+        self.assertIsNone(self.broker.subscribe([2], FakeCursor(), max_streams=1))
+        self.broker.unsubscribe(first)
+        self.assertIsNotNone(self.broker.subscribe([2], FakeCursor(), max_streams=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Membership cache: the changelog is replayed once per change id, and evictions only touch their own keys.
+
+    python -m unittest discover -s tests        # from the WmoryBackend directory
+
+The primary is replaced by an in-memory fake; no database is needed.
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import membership
+
+
+class FakePrimary:
+    """Answers the membership lookups and the changelog scans of membership.py."""
+
+    def __init__(self):
+        self.members = {("1", "10"): (0, 1), ("2", "10"): (1, 1), ("1", "20"): (0, 1)}
+        self.changes = []           # committed (id, group_id, user_id) rows
+        self.lookups = 0
+
+    def query(self, sql, params=()):
+        if 'MAX(id)' in sql:
+            return [(max((c[0] for c in self.changes), default=0),)]
+        if 'FROM membership_changes' in sql:
+            return sorted(c for c in self.changes if c[0] > params[0])
+        self.lookups += 1
+        row = self.members.get((str(params[0]), str(params[1])))
+        return [row] if row else []
+
+
+class MembershipCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.primary = FakePrimary()
+        patches = [
+            mock.patch.object(membership, '_query_primary', side_effect=self.primary.query),
+            mock.patch.object(membership, 'MEMBERSHIP_SYNC_INTERVAL', 0),
+            mock.patch.object(membership, '_scan_from', None),
+            mock.patch.object(membership, '_applied', set()),
+            mock.patch.object(membership, '_gaps', {}),
+            mock.patch.object(membership, '_last_sync_check', 0.0),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        membership._cache.clear()
+        membership._by_group.clear()
+        membership._by_user.clear()
+
+    def _lookup(self, user_id, group_id):
+        return membership.get_membership(None, user_id, group_id)
+
+    def test_changes_are_replayed_once(self):
+        self._lookup(1, 10)
+        self._lookup(1, 20)
+        self.primary.changes.append((1, 10, None))
+        self._lookup(1, 20)             # sync evicts group 10 only
+        self.assertEqual(self.primary.lookups, 2)
+        self._lookup(1, 10)             # re-read once after the eviction
+        self._lookup(1, 10)             # the same change is not applied again
+        self.assertEqual(self.primary.lookups, 3)
+
+    def test_user_eviction_uses_the_index(self):
+        for user_id, group_id in (("1", "10"), ("2", "10"), ("1", "20")):
+            self._lookup(user_id, group_id)
+        membership._evict(user_id=1)
+        self.assertEqual(set(membership._cache), {("2", "10")})
+        self.assertEqual(membership._by_group, {"10": {("2", "10")}})
+        self.assertEqual(membership._by_user, {"2": {("2", "10")}})
+
+    def test_change_committed_late_is_applied(self):
+        self._lookup(1, 10)
+        self.primary.changes.append((2, 20, None))  # id 1 is still uncommitted
+        self._lookup(1, 10)
+        self.assertEqual(membership._scan_from, 0)
+        self.primary.changes.append((1, 10, None))
+        self._lookup(1, 20)
+        self.assertNotIn(("1", "10"), membership._cache)
+        self.assertEqual(membership._scan_from, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
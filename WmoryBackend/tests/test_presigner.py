@@ -0,0 +1,109 @@
+"""
+SigV4Presigner must produce the same URLs as boto3's generate_presigned_url.
+
+    python -m unittest discover -s tests        # from the WmoryBackend directory
+
+Needs boto3 (requirements.txt); no network access or real credentials are used.
+"""
+import os
+import sys
+import datetime
+import unittest
+from collections import namedtuple
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import boto3
+    from botocore.credentials import ReadOnlyCredentials
+except ImportError:
+    boto3 = None
+
+from presigner import SigV4Presigner
+
+Credentials = namedtuple('Credentials', 'access_key secret_key token')
+
+BUCKET = 'wmory-test'
+REGION = 'eu-north-1'
+ACCESS_KEY = 'AKIDEXAMPLE'
+SECRET_KEY = 'test/secret+key='
+SESSION_TOKEN = 'FwoGZXIvYXdzE/token+with=reserved/chars'
+
+KEYS = [
+    'media/g1/x.jpg',
+    'thumbs/g1/x.jpg',
+    'media/g1/with space.jpg',
+    'media/g1/plus+sign.png',
+    'media/g1/ünïcödé-fotoğraf.jpg',
+    "media/(1)!*'~.mp4",
+    'pp_media/a b+c~ü.png',
+    'thumb_legacy.JPG',
+]
+
+
+def _signed_at(url):
+    amz_date = parse_qs(urlsplit(url).query)['X-Amz-Date'][0]
+    return datetime.datetime.strptime(amz_date, '%Y%m%dT%H%M%SZ')
+
+
+@unittest.skipIf(boto3 is None, "boto3 is not installed")
+class PresignerMatchesBoto3Test(unittest.TestCase):
+
+    def _pair(self, token=None):
+        client = boto3.client('s3', region_name=REGION, aws_access_key_id=ACCESS_KEY,
+                              aws_secret_access_key=SECRET_KEY, aws_session_token=token)
+        presigner = SigV4Presigner(BUCKET, REGION, lambda: ReadOnlyCredentials(ACCESS_KEY, SECRET_KEY, token))
+        return client, presigner
+
+    def _boto_urls(self, client, operation, expiration, content_type=None):
+        """
+        boto3's URL for every key, all signed within the same second (the clock presign_many is frozen to).
+        A batch that straddles a second boundary is signed again.
+        """
+        for _ in range(5):
+            urls = []
+            for key in KEYS:
+                params = {'Bucket': BUCKET, 'Key': key}
+                if content_type:
+                    params['ContentType'] = content_type
+                urls.append(client.generate_presigned_url(operation, Params=params, ExpiresIn=expiration))
+            signed_at = {_signed_at(url) for url in urls}
+            if len(signed_at) == 1:
+                return urls, signed_at.pop()
+        self.fail("boto3 URLs kept crossing a second boundary")
+
+    def _assert_same(self, token=None):
+        client, presigner = self._pair(token)
+        for operation, method, content_type, expiration in (('get_object', 'GET', None, 900),
+                                                             ('put_object', 'PUT', 'image/jpeg', 300)):
+            expected, now = self._boto_urls(client, operation, expiration, content_type)
+            actual = presigner.presign_many(KEYS, expiration, method, content_type, now=now)
+            for key, boto_url, local_url in zip(KEYS, expected, actual):
+                with self.subTest(method=method, key=key, token=bool(token)):
+                    self.assertEqual(local_url, boto_url)
+
+    def test_static_credentials(self):
+        self._assert_same()
+
+    def test_session_token(self):
+        self._assert_same(SESSION_TOKEN)
+
+
+class PresignerTest(unittest.TestCase):
+
+    def test_presign_matches_presign_many(self):
+        presigner = SigV4Presigner(BUCKET, REGION, lambda: Credentials(ACCESS_KEY, SECRET_KEY, SESSION_TOKEN))
+        now = datetime.datetime(2024, 2, 29, 23, 59, 59)
+        batch = presigner.presign_many(KEYS, 900, now=now)
+        self.assertEqual([presigner.presign(key, 900, now=now) for key in KEYS], batch)
+
+    def test_is_supported(self):
+        self.assertTrue(SigV4Presigner.is_supported(BUCKET, REGION))
+        self.assertFalse(SigV4Presigner.is_supported(BUCKET, 'us-east-1'))
+        self.assertFalse(SigV4Presigner.is_supported('Wmory_Test', REGION))
+        self.assertTrue(SigV4Presigner.is_supported('Wmory_Test', REGION, endpoint_url='http://localhost:9000'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,22 +1,131 @@
-from db import get_db_connection
+import threading
+from audit import record
+from membership import invalidate_memberships
+from group_versions import bump_group_version, bump_user_groups
+from events import publish_event
+from blobs import release_photos
 
-def log_action(actor_id, action_type, target_id=None, metadata=None):
+# --- HTTP SESSION ---
+# One per request thread for outgoing calls (Expo push): keeps connections alive between requests.
+# A requests.Session is not thread-safe, and one shared by the 64 threads of a gthread worker would
+# also overflow its 10-connection pool; sessions are created lazily, so none exists before the fork.
+# requests is imported on first use so workers that never send a push do not pay for it.
+HTTP_TIMEOUT = (3, 10)  # connect / read seconds: a slow push service must not hold request threads
+
+_http_local = threading.local()
+
+def get_http_session():
+    session = getattr(_http_local, 'session', None)
+    if session is None:
+        import requests
+        session = _http_local.session = requests.Session()
+    return session
+
+def log_action(actor_id, action_type, target_id=None, metadata=None, sync=False):
     """
-    Inserts a record into the audit_logs table.
+    Records an audit_logs entry.
+    Buffered and written in batches by the audit module; pass sync=True for critical actions.
     """
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        sql = """
-            INSERT INTO audit_logs (actor_id, action_type, target_id, metadata)
-            VALUES (%s, %s, %s, %s)
-        """
-        cursor.execute(sql, (actor_id, action_type, target_id, metadata))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-    except Exception as e:
-        # We assume logging errors shouldn't crash the main app flow
-        print(f"[AUDIT LOG ERROR]: {e}")
\ No newline at end of file
+    record([(actor_id, action_type, target_id, metadata)], sync=sync)
+
+
+def log_actions(entries, sync=False):
+    """
+    Records many audit_logs entries at once.
+    :param entries: iterable of (actor_id, action_type, target_id, metadata) tuples
+    """
+    record(entries, sync=sync)
+
+
+def handle_admin_succession(cursor, user_ids, group_ids=None):
+    """
+    Removes departing users from groups with a constant number of set-based statements.
+    By default this covers the groups they administer (other memberships go away via ON DELETE CASCADE
+    when the user row is deleted); pass group_ids to leave specific groups instead.
+    Groups left empty are deleted with their photos (blobs released), groups left without an admin
+    promote their oldest member. Callers releasing the departing users' own photos do so afterwards.
+    Expects a dictionary cursor.
+    :return: (ids of the deleted groups, object keys to delete from S3 after the commit)
+    """
+    if not isinstance(user_ids, (list, tuple, set)):
+        user_ids = [user_ids]
+    user_ids = list(user_ids)
+    if not user_ids:
+        return [], []
+    user_strings = ','.join(['%s'] * len(user_ids))
+
+    # Departing users lose every cached membership (all of them when the account itself goes away),
+    # and every group they were in changes for the remaining members
+    if group_ids is None:
+        invalidate_memberships(cursor, user_ids=user_ids)
+        memberships = bump_user_groups(cursor, user_ids)
+        for user_id in user_ids:
+            publish_event(cursor, [row['group_id'] for row in memberships if row['user_id'] == user_id],
+                          'member_left', {"user_id": user_id})
+
+    # 1. Groups affected by the departure
+    if group_ids is None:
+        cursor.execute(f"SELECT DISTINCT group_id FROM groups_members WHERE user_id IN ({user_strings}) AND is_admin = 1", tuple(user_ids))
+    else:
+        group_ids = list(group_ids)
+        if not group_ids:
+            return [], []
+        group_strings = ','.join(['%s'] * len(group_ids))
+        cursor.execute(
+            f"SELECT DISTINCT group_id FROM groups_members WHERE user_id IN ({user_strings}) AND group_id IN ({group_strings})",
+            tuple(user_ids) + tuple(group_ids)
+        )
+    affected = [row['group_id'] for row in cursor.fetchall()]
+    if not affected:
+        return [], []
+    group_strings = ','.join(['%s'] * len(affected))
+    # Whole groups: the remaining members may be promoted below
+    invalidate_memberships(cursor, group_ids=affected)
+    if group_ids is not None:
+        bump_group_version(cursor, affected)
+        for user_id in user_ids:
+            publish_event(cursor, affected, 'member_left', {"user_id": user_id})
+
+    # 2. Remove every departing user from those groups (admin or not, so none of them becomes an heir)
+    cursor.execute(
+        f"DELETE FROM groups_members WHERE user_id IN ({user_strings}) AND group_id IN ({group_strings})",
+        tuple(user_ids) + tuple(affected)
+    )
+
+    # 3. Bulk delete groups that are now empty
+    cursor.execute(f"""
+        SELECT g.id FROM groups_table g
+        LEFT JOIN groups_members gm ON gm.group_id = g.id
+        WHERE g.id IN ({group_strings}) AND gm.id IS NULL
+    """, tuple(affected))
+    empty_groups = [row['id'] for row in cursor.fetchall()]
+    released_keys = []
+    if empty_groups:
+        empty_strings = ','.join(['%s'] * len(empty_groups))
+        # Every remaining photo (members who left earlier included) releases its blob, as in delete_group;
+        # the rows are deleted here so callers selecting a departing user's photos do not release them twice
+        cursor.execute(f"SELECT file_name, blob_id FROM photos WHERE group_id IN ({empty_strings}) FOR UPDATE", tuple(empty_groups))
+        released_keys = release_photos(cursor, cursor.fetchall())
+        cursor.execute(f"DELETE FROM photos WHERE group_id IN ({empty_strings})", tuple(empty_groups))
+        cursor.execute(f"SELECT picture FROM groups_table WHERE id IN ({empty_strings}) AND picture IS NOT NULL",
+                       tuple(empty_groups))
+        released_keys += [row['picture'] for row in cursor.fetchall()]
+        cursor.execute(f"DELETE FROM groups_table WHERE id IN ({empty_strings})", tuple(empty_groups))
+
+    # 4. Bulk promote the oldest member of every group left without an admin (Heir logic)
+    cursor.execute(f"""
+        UPDATE groups_members gm
+        JOIN (
+            SELECT id FROM (
+                SELECT id,
+                       ROW_NUMBER() OVER (PARTITION BY group_id ORDER BY id ASC) as rn,
+                       MAX(is_admin) OVER (PARTITION BY group_id) as has_admin
+                FROM groups_members
+                WHERE group_id IN ({group_strings})
+            ) ranked
+            WHERE rn = 1 AND has_admin = 0
+        ) heirs ON gm.id = heirs.id
+        SET gm.is_admin = 1
+    """, tuple(affected))
+
+    return empty_groups, released_keys
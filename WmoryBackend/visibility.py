@@ -0,0 +1,31 @@
+# visibility.py
+from cache import response_cache
+from hidden_sets import load_hidden_set
+
+# What a viewer may see of a group beyond membership: blocks (both directions) and hidden items.
+# Shared payloads (member lists, listings) are cached per group version; these per-viewer sets are
+# applied on top of them.
+
+
+def load_viewer_blocks(cursor, user_id, block_version):
+    """Who blocked the viewer and whom the viewer blocked (both directions in one indexed query), cached per block version."""
+    if block_version is None:
+        return {"blocked_by": [], "blocked_by_me": []}
+    def load():
+        cursor.execute("SELECT blocker_id, blocked_id FROM blocked_users WHERE blocker_id = %s OR blocked_id = %s", (user_id, user_id))
+        rows = cursor.fetchall()
+        return {
+            "blocked_by": [row['blocker_id'] for row in rows if str(row['blocked_id']) == str(user_id)],
+            "blocked_by_me": [row['blocked_id'] for row in rows if str(row['blocker_id']) == str(user_id)],
+        }
+    return response_cache.get_or_load(f"blocks:{user_id}:{block_version}", load)
+
+
+def blocked_uploaders(blocks):
+    """Uploaders whose media the viewer does not see: blocked by the viewer, or blocking the viewer."""
+    return set(blocks['blocked_by']) | set(blocks['blocked_by_me'])
+
+
+def load_hidden_ids(cursor, user_id, group_id):
+    """Ids of the group's items the viewer hid, as a set-like IdBitmap (dictionary cursor)."""
+    return load_hidden_set(cursor, user_id, group_id)
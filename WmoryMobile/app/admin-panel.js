@@ -88,6 +88,8 @@ export default function AdminPanel() {
   // --- EXISTING STATES ---
   const [activeTab, setActiveTab] = useState('reports');
   const [reports, setReports] = useState([]);
+  const [reportsCursor, setReportsCursor] = useState(null);
+  const [loadingMoreReports, setLoadingMoreReports] = useState(false);
   const [bannedUsers, setBannedUsers] = useState([]);
   const [loading, setLoading] = useState(false);
   
@@ -180,11 +182,29 @@ export default function AdminPanel() {
     try {
       const response = await fetch(`${API_URL}/admin/get-reports?admin_id=${currentUserId}`, { headers: { 'ngrok-skip-browser-warning': 'true' }});
       const data = await response.json();
-      if (response.ok) setReports(data);
+      if (response.ok) {
+        setReports(data.reports);
+        setReportsCursor(data.next_cursor);
+      }
     } catch (e) { console.error(e); } 
     finally { setLoading(false); }
   };
 
+  // Sonraki sayfa (next_cursor ile)
+  const fetchMoreReports = async () => {
+    if (!reportsCursor || loadingMoreReports) return;
+    setLoadingMoreReports(true);
+    try {
+      const response = await fetch(`${API_URL}/admin/get-reports?admin_id=${currentUserId}&cursor=${encodeURIComponent(reportsCursor)}`, { headers: { 'ngrok-skip-browser-warning': 'true' }});
+      const data = await response.json();
+      if (response.ok) {
+        setReports(prev => [...prev, ...data.reports]);
+        setReportsCursor(data.next_cursor);
+      }
+    } catch (e) { console.error(e); } 
+    finally { setLoadingMoreReports(false); }
+  };
+
   const fetchBannedUsers = async () => {
     setLoading(true);
     try {
@@ -460,6 +480,13 @@ export default function AdminPanel() {
                     keyExtractor={item => (activeTab === 'reports' ? `rep_${item.report_id}` : `ban_${item.id}`)}
                     renderItem={activeTab === 'reports' ? renderReportItem : renderBannedUserItem}
                     contentContainerStyle={adminPanelStyles.listContent}
+                    onEndReached={activeTab === 'reports' ? fetchMoreReports : undefined}
+                    onEndReachedThreshold={0.5}
+                    ListFooterComponent={
+                        activeTab === 'reports' && loadingMoreReports
+                            ? <ActivityIndicator color={colors.textPrimary} style={{marginVertical: 20}} />
+                            : null
+                    }
                     ListEmptyComponent={
                         <Text style={adminPanelStyles.emptyText}>
                             {activeTab === 'reports' ? 'Bekleyen rapor yok.' : 'Banlanan kullanıcı yok.'}
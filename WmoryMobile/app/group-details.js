@@ -127,16 +127,19 @@ const fetchData = async () => {
 
     // 2. BACKGROUND NETWORK FETCH: Update data silently from server
     try {
-      const [groupRes, membersRes, reqRes] = await Promise.all([
-          fetch(`${API_URL}/get-group-details?group_id=${groupId}`, { headers: { 'ngrok-skip-browser-warning': 'true' }}),
-          fetch(`${API_URL}/get-group-members?group_id=${groupId}&current_user_id=${userId}`, { headers: { 'ngrok-skip-browser-warning': 'true' }}),
-          fetch(`${API_URL}/get-group-requests?group_id=${groupId}`, { headers: { 'ngrok-skip-browser-warning': 'true' }})
-      ]);
+      // One round trip: details, members and (for admins) pending requests
+      const snapshotRes = await fetch(
+          `${API_URL}/group-snapshot?group_id=${groupId}&user_id=${userId}&fields=details,members,requests`,
+          { headers: { 'ngrok-skip-browser-warning': 'true' }}
+      );
 
       const freshData = {};
-      if (groupRes.ok) freshData.details = await groupRes.json();
-      if (membersRes.ok) freshData.members = await membersRes.json();
-      if (reqRes.ok) freshData.requests = await reqRes.json();
+      if (snapshotRes.ok) {
+          const snapshot = await snapshotRes.json();
+          freshData.details = snapshot.details;
+          freshData.members = snapshot.members;
+          freshData.requests = snapshot.requests || []; // null for non-admins
+      }
 
       // --- SMART GROUP DETAILS COMPARISON ---
       if (freshData.details) {
@@ -26,11 +26,13 @@ import { LinearGradient } from 'expo-linear-gradient';
 import { useTheme } from '../context/ThemeContext';
 import { getMediaStyles } from '../styles/mediaStyles';
 import { saveDataToCache, loadDataFromCache, CACHE_KEYS } from '../utils/cacheHelper';
+import { subscribeToGroupEvents } from '../utils/groupEvents';
 
 const { width, height } = Dimensions.get('window');
 const defaultUserImage = require('../assets/no-pic.jpg'); 
 
 const COLUMN_OPTIONS = [2, 3, 4, 6, 8];
+const PHOTOS_PAGE_SIZE = 500; // Largest page the backend serves
 
 // --- ANDROID & IOS COMPATIBLE ZOOM COMPONENT (FIXED SCROLL) ---
 const ZoomableImage = ({ uri, onPress, onZoomChange }) => {
@@ -337,19 +339,29 @@ const fetchData = async () => {
 
   // 3. NETWORK LAYER: Fetch fresh data from API
   try {
-    const [photoRes, memberRes] = await Promise.all([
-        fetch(`${API_URL}/group-photos?group_id=${groupId}&user_id=${userId}`, { headers: { 'ngrok-skip-browser-warning': 'true' }}),
-        fetch(`${API_URL}/get-group-members?group_id=${groupId}&current_user_id=${userId}`, { headers: { 'ngrok-skip-browser-warning': 'true' }})
-    ]);
+    // One round trip for members and the first page of photos, then the rest of the listing page by page
+    const snapshotRes = await fetch(
+        `${API_URL}/group-snapshot?group_id=${groupId}&user_id=${userId}&fields=members,photos&limit=${PHOTOS_PAGE_SIZE}`,
+        { headers: { 'ngrok-skip-browser-warning': 'true' }}
+    );
 
     const freshData = {};
 
-    if (photoRes.ok) {
-      freshData.photos = await photoRes.json();
-    }
+    if (snapshotRes.ok) {
+      const snapshot = await snapshotRes.json();
+      freshData.members = snapshot.members;
+      freshData.photos = snapshot.photos;
 
-    if (memberRes.ok) {
-        freshData.members = await memberRes.json();
+      let nextCursor = snapshot.photos_next_cursor;
+      while (nextCursor) {
+        const pageRes = await fetch(
+            `${API_URL}/group-photos?group_id=${groupId}&user_id=${userId}&limit=${PHOTOS_PAGE_SIZE}&cursor=${encodeURIComponent(nextCursor)}`,
+            { headers: { 'ngrok-skip-browser-warning': 'true' }}
+        );
+        if (!pageRes.ok) break;
+        freshData.photos = freshData.photos.concat(await pageRes.json());
+        nextCursor = pageRes.headers.get('X-Next-Cursor');
+      }
     }
 
     // Update UI with fresh data
@@ -392,6 +404,64 @@ const fetchData = async () => {
     fetchData();
   }, []);
 
+  // --- LIVE UPDATES (SERVER-SENT EVENTS) ---
+  // New uploads fetch only the newest page, removals are applied in place,
+  // member changes and missed events reload the screen. Bursts are debounced into one request.
+  const pendingAdded = useRef(0);
+  const pendingReload = useRef(false);
+  const liveTimer = useRef(null);
+
+  const fetchNewPhotos = async (count) => {
+    try {
+      const res = await fetch(
+          `${API_URL}/group-photos?group_id=${groupId}&user_id=${userId}&limit=${Math.min(count + 20, PHOTOS_PAGE_SIZE)}`,
+          { headers: { 'ngrok-skip-browser-warning': 'true' }}
+      );
+      if (!res.ok) return;
+      const latest = await res.json();
+      setPhotos(prev => {
+        const known = new Set(prev.map(p => p.id.toString()));
+        const added = latest.filter(p => !known.has(p.id.toString()));
+        return added.length ? added.concat(prev) : prev;
+      });
+    } catch (error) {
+      console.log("Live update error:", error);
+    }
+  };
+
+  const scheduleLiveRefresh = (reloadAll) => {
+    pendingReload.current = pendingReload.current || reloadAll;
+    clearTimeout(liveTimer.current);
+    liveTimer.current = setTimeout(() => {
+      const count = pendingAdded.current;
+      const reload = pendingReload.current;
+      pendingAdded.current = 0;
+      pendingReload.current = false;
+      if (reload) fetchData();
+      else fetchNewPhotos(count);
+    }, 500);
+  };
+
+  useEffect(() => {
+    const unsubscribe = subscribeToGroupEvents(userId, (type, data) => {
+      if (type !== 'resync' && data.group_id?.toString() !== groupId?.toString()) return;
+
+      if (type === 'photo_removed') {
+        const removed = new Set(data.photo_ids.map(id => id.toString()));
+        setPhotos(prev => prev.filter(p => !removed.has(p.id.toString())));
+      } else if (type === 'photo_added') {
+        pendingAdded.current += data.count || 1;
+        scheduleLiveRefresh(false);
+      } else if (type === 'media_restored' || type === 'member_joined' || type === 'member_left' || type === 'resync') {
+        scheduleLiveRefresh(true);
+      }
+    });
+    return () => {
+      clearTimeout(liveTimer.current);
+      unsubscribe();
+    };
+  }, []);
+
   // --- TIMELINE GROUPING LOGIC (FİLTRELİ) ---
   const groupedPhotos = useMemo(() => {
     // 1. ADIM: Filtreleme
@@ -542,75 +612,96 @@ const fetchData = async () => {
 
     if (!result.canceled) {
       setUploading(true);
-      for (const asset of result.assets) {
-        await uploadSingleFile(asset);
+      // Batches of 100 (backend limit): one URL request, one confirm and one group notification per batch
+      for (let i = 0; i < result.assets.length; i += 100) {
+        const keepGoing = await uploadBatch(result.assets.slice(i, i + 100));
+        if (!keepGoing) break;
       }
       setUploading(false);
       fetchData(); 
     }
   };
 
-  const uploadSingleFile = async (asset) => {
-    try {
+  const getAssetType = (asset) => {
       const filename = asset.uri.split('/').pop();
-      let type = 'image/jpeg';
-      
       if (asset.type === 'video' || filename.endsWith('.mp4') || filename.endsWith('.mov')) {
-          type = 'video/mp4';
+          return 'video/mp4';
       }
+      return 'image/jpeg';
+  };
+
+  const uploadBatch = async (assets) => {
+    try {
+      const types = assets.map(getAssetType);
 
-      // Step 1: Get Presigned URL from Backend
-      const presignRes = await fetch(`${API_URL}/generate-upload-url`, {
+      // Step 1: Get all Presigned URLs from Backend in one request
+      const presignRes = await fetch(`${API_URL}/generate-upload-urls`, {
           method: 'POST',
           headers: { 'Content-Type': 'application/json' },
           body: JSON.stringify({ 
             user_id: userId,
             group_id: groupId,
-            file_type: type 
+            file_types: types 
         })
       });
       
-      if (!presignRes.ok) throw new Error("Could not get upload URL");
-      const { upload_url, object_key } = await presignRes.json();
-
-      // Step 2: Convert local file to Blob and Upload DIRECTLY to AWS S3
-      const fileData = await fetch(asset.uri);
-      const blob = await fileData.blob();
+      if (!presignRes.ok) throw new Error("Could not get upload URLs");
+      const { uploads } = await presignRes.json();
+
+      // Step 2: Convert local files to Blobs and Upload DIRECTLY to AWS S3
+      const uploadedKeys = [];
+      for (let i = 0; i < assets.length; i++) {
+        try {
+          const fileData = await fetch(assets[i].uri);
+          const blob = await fileData.blob();
+
+          const s3Res = await fetch(uploads[i].upload_url, {
+              method: 'PUT',
+              body: blob,
+              headers: { 'Content-Type': types[i] }
+          });
 
-      const s3Res = await fetch(upload_url, {
-          method: 'PUT',
-          body: blob,
-          headers: { 'Content-Type': type }
-      });
+          if (s3Res.ok) {
+            // Layout hints so the grid can be laid out before the images download
+            uploadedKeys.push({
+              file_name: uploads[i].object_key,
+              width: assets[i].width,
+              height: assets[i].height,
+              duration_ms: assets[i].duration
+            });
+          } else {
+            console.error("S3 Upload Failed:", s3Res.status);
+          }
+        } catch (error) {
+          console.error("Direct S3 Upload failed:", error); // Continue with the rest of the batch
+        }
+      }
 
-      if (!s3Res.ok) throw new Error("S3 Upload Failed");
+      if (uploadedKeys.length === 0) return true;
 
-      // Step 3: Confirm with Backend to save in MySQL
-      const fileSize = asset.fileSize || blob.size || 0;
-      const confirmRes = await fetch(`${API_URL}/confirm-upload`, {
+      // Step 3: Confirm the whole batch with Backend to save in MySQL
+      const confirmRes = await fetch(`${API_URL}/confirm-uploads`, {
           method: 'POST',
           headers: { 'Content-Type': 'application/json' },
           body: JSON.stringify({
               user_id: userId,
               group_id: groupId,
-              file_name: object_key,
-              file_size: fileSize
+              file_names: uploadedKeys
           })
       });
 
-      if (confirmRes.status === 403) {
-          const data = await confirmRes.json();
-          if (data.error && data.error.includes('LIMIT_EXCEEDED')) {
-              Alert.alert("Uyarı!", "Günlük sınır aşıldı.");
-          }
+      const data = await confirmRes.json();
+      const limitExceeded = (data.rejected || []).some(item => item.error === 'LIMIT_EXCEEDED_STORAGE');
+      if (limitExceeded) {
+          Alert.alert("Uyarı!", "Günlük sınır aşıldı.");
           return false;
       }
 
       return true; 
 
     } catch (error) {
-      console.error("Direct S3 Upload failed:", error);
-      return true; // Return true to continue queue even if one fails
+      console.error("Batch Upload failed:", error);
+      return true; // Return true to continue with the next batch even if one fails
     }
   };
 
@@ -799,12 +890,40 @@ const fetchData = async () => {
     }
   };
 
+  // --- ARCHIVED ORIGINALS (RESTORE ON DEMAND) ---
+  // Old originals live in cold storage: the thumbnail is shown until a restore finishes,
+  // then a media_restored event reloads the gallery with the original URL.
+  const isArchived = (item) => item.restore_status === 'archived' || item.restore_status === 'restoring';
+
+  const requestRestore = async (item) => {
+    try {
+      const res = await fetch(`${API_URL}/request-restore`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json', 'ngrok-skip-browser-warning': 'true' },
+          body: JSON.stringify({ user_id: userId, group_id: groupId, photo_ids: [item.id] })
+      });
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      const result = await res.json();
+      const statuses = {};
+      result.media.forEach(m => { statuses[m.id.toString()] = m.restore_status; });
+      setPhotos(prev => prev.map(p => statuses[p.id.toString()] ? { ...p, restore_status: statuses[p.id.toString()] } : p));
+      Alert.alert("Arşivden Geri Yükleniyor", "Orijinal dosya hazır olduğunda galeride otomatik olarak görünecek.");
+    } catch (error) {
+      console.log("Restore request error:", error);
+      Alert.alert("Hata", "Geri yükleme isteği gönderilemedi.");
+    }
+  };
+
   // --- YENİ EKLENEN: TEKLİ KAYDETME ---
   const handleSaveToGallery = async () => {
     setShowOptions(false); // Menüyü kapat
     const currentMedia = photos[currentIndex];
     
     if (!currentMedia) return;
+    if (isArchived(currentMedia)) {
+        requestRestore(currentMedia);
+        return;
+    }
 
     // İşlem başladığını hissettirmek için basit bir uyarı veya direkt işlem
     const success = await saveFileToGallery(currentMedia.url);
@@ -955,6 +1074,24 @@ const fetchData = async () => {
   };
 
   const renderFullScreenItem = ({ item }) => {
+    // 0. ARCHIVED (thumbnail until the original is restored)
+    if (isArchived(item)) {
+        return (
+          <View style={mediaStyles.fullScreenContent}>
+              <Image source={{ uri: item.thumbnail }} style={mediaStyles.fullImage} />
+              <View style={mediaStyles.archivedBanner}>
+                  {item.restore_status === 'restoring' ? (
+                      <Text style={mediaStyles.archivedText}>Orijinal arşivden geri yükleniyor...</Text>
+                  ) : (
+                      <TouchableOpacity onPress={() => requestRestore(item)}>
+                          <Text style={mediaStyles.archivedText}>Arşivde - Orijinali geri yükle</Text>
+                      </TouchableOpacity>
+                  )}
+              </View>
+          </View>
+        );
+    }
+
     // 1. VIDEO (No Zoom, just toggle controls)
     if (item.type === 'video') {
         return (
@@ -261,6 +261,19 @@ export const getMediaStyles = (colors) => {
     width: width,
     height: height * 0.6, 
   },
+  archivedBanner: {
+    position: 'absolute',
+    bottom: 140,
+    paddingHorizontal: 16,
+    paddingVertical: 10,
+    backgroundColor: 'rgba(0,0,0,0.6)',
+    borderRadius: 20,
+  },
+  archivedText: {
+    color: '#fff',
+    fontSize: 14,
+    fontWeight: '600',
+  },
   // Updated Footer for smooth animation support
   fullScreenFooter: {
     position: 'absolute',
@@ -0,0 +1,80 @@
+import API_URL from '../config';
+
+// --- LIVE GROUP EVENTS (SERVER-SENT EVENTS) ---
+// Streams /group-events over XMLHttpRequest (React Native has no EventSource) and reconnects with
+// Last-Event-ID, so events sent while the connection was down are replayed by the server.
+// Events: photo_added, photo_removed, media_restored, member_joined, member_left, request_pending, resync.
+
+const MIN_RETRY_MS = 3000;
+const MAX_RETRY_MS = 60000;
+
+export const subscribeToGroupEvents = (userId, onEvent) => {
+    let xhr = null;
+    let timer = null;
+    let closed = false;
+    let lastEventId = null;
+    let retryMs = MIN_RETRY_MS;
+
+    const dispatch = (block) => {
+        let type = 'message';
+        let id = null;
+        const dataLines = [];
+        block.split('\n').forEach((line) => {
+            if (line.startsWith(':')) return; // heartbeat
+            const separator = line.indexOf(':');
+            const field = separator === -1 ? line : line.slice(0, separator);
+            const value = separator === -1 ? '' : line.slice(separator + 1).replace(/^ /, '');
+            if (field === 'event') type = value;
+            else if (field === 'data') dataLines.push(value);
+            else if (field === 'id') id = value;
+            else if (field === 'retry' && !isNaN(parseInt(value, 10))) retryMs = parseInt(value, 10);
+        });
+        if (id !== null) lastEventId = id;
+        if (!dataLines.length) return;
+        try {
+            onEvent(type, JSON.parse(dataLines.join('\n')));
+        } catch (e) {
+            console.log('Group event error:', e);
+        }
+    };
+
+    const connect = () => {
+        if (closed) return;
+        let offset = 0;
+        let buffer = '';
+
+        xhr = new XMLHttpRequest();
+        xhr.open('GET', `${API_URL}/group-events?user_id=${userId}`);
+        xhr.setRequestHeader('Accept', 'text/event-stream');
+        xhr.setRequestHeader('ngrok-skip-browser-warning', 'true');
+        if (lastEventId) xhr.setRequestHeader('Last-Event-ID', lastEventId);
+
+        xhr.onprogress = () => {
+            // responseText grows as the stream arrives: parse only the new part
+            buffer += xhr.responseText.slice(offset);
+            offset = xhr.responseText.length;
+            const blocks = buffer.split('\n\n');
+            buffer = blocks.pop();
+            blocks.forEach(dispatch);
+        };
+
+        xhr.onloadend = () => {
+            if (closed) return;
+            // Normal end of a stream (the server closes it periodically) or a network error: reconnect
+            const delay = xhr.status === 200 ? MIN_RETRY_MS : retryMs;
+            retryMs = xhr.status === 200 ? MIN_RETRY_MS : Math.min(retryMs * 2, MAX_RETRY_MS);
+            timer = setTimeout(connect, delay);
+        };
+
+        xhr.send();
+    };
+
+    connect();
+
+    // Unsubscribe
+    return () => {
+        closed = true;
+        if (timer) clearTimeout(timer);
+        if (xhr) xhr.abort();
+    };
+};